@@ -0,0 +1,84 @@
+import asyncio
+import json
+import multiprocessing
+import threading
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Any, Optional
+import logging
+
+import instrumentation
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# CPU-bound analysis steps. They are plain module-level functions so a process pool can run them.
+
+
+def infer_field_types(documents: List[Dict]) -> Dict[str, List[str]]:
+    """Python type names seen per top-level field"""
+    field_types = {}
+    for doc in documents:
+        for field, value in doc.items():
+            if field not in field_types:
+                field_types[field] = []
+            value_type = type(value).__name__
+            if value_type not in field_types[field]:
+                field_types[field].append(value_type)
+    return field_types
+
+
+def profile_records(records: List[Dict]) -> Dict[str, Any]:
+    """Null/empty values, fields missing from some records and duplicate records in a sample"""
+    fields = set()
+    for record in records:
+        fields.update(record)
+    fields -= {"_id", "_key", "_type"}
+
+    null_count = sum(1 for record in records
+                     if any(record.get(field) in (None, "") for field in fields if field in record))
+    missing_fields = {}
+    for field in sorted(fields):
+        missing = sum(1 for record in records if field not in record)
+        if missing > 0:
+            missing_fields[field] = missing
+    fingerprints = Counter(
+        json.dumps({k: v for k, v in record.items() if k not in ("_id", "_key")}, sort_keys=True, default=str)
+        for record in records
+    )
+    return {
+        "null_count": null_count,
+        "missing_fields": missing_fields,
+        "duplicates": sum(count - 1 for count in fingerprints.values() if count > 1)
+    }
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _process_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn, not fork: the server process runs threads that fork would copy mid-operation
+            _pool = ProcessPoolExecutor(max_workers=Config.ANALYSIS_PROCESS_WORKERS,
+                                        mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+async def run_cpu(func, records: List[Dict], *args):
+    """Run a CPU-bound step on records in the process pool, or inline for samples too small
+    to be worth pickling (ANALYSIS_PROCESS_MIN_RECORDS) or when the pool is disabled"""
+    if Config.ANALYSIS_PROCESS_WORKERS <= 0 or len(records) < Config.ANALYSIS_PROCESS_MIN_RECORDS:
+        return func(records, *args)
+    with instrumentation.span(f"cpu.{func.__name__}", kind="cpu"):
+        return await asyncio.get_running_loop().run_in_executor(_process_pool(), func, records, *args)
+
+
+def shutdown():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
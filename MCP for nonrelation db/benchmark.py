@@ -0,0 +1,438 @@
+#!/usr/bin/env python3
+"""
+Benchmark harness for MCP Non-Relational Database Analyzer
+
+Seeds a MongoDB stand-in (mongomock, or a real mongod via --mongo-uri) and a
+Redis stand-in (fakeredis, or a real redis-server via --redis-uri) with
+synthetic hotel data from data_generator.py, then times every
+DatabaseAnalyzer / InsightGenerator path and the HTTP endpoints at each scale.
+Results are written as JSON so runs can be compared across commits:
+
+    python benchmark.py --scales 1000,100000
+    python benchmark.py --mongo-uri mongodb://localhost:27017 --scales 10000000
+    python benchmark.py --compare bench_results/<previous>.json
+
+Scales are numbers of bookings. 10M bookings needs a real mongod; mongomock
+keeps everything in process memory.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime
+
+from config import Config
+from data_generator import HotelDataGenerator, insert_stream
+from database_connectors import DatabaseConnector, MongoDBConnector, RedisConnector
+from database_analyzer import DatabaseAnalyzer
+from insight_generator import InsightGenerator
+
+BENCH_DATABASE = "mcp_benchmark"
+INSERT_BATCH_SIZE = 10000
+
+ANALYSIS_TYPES = ["schema", "data_quality", "performance", "business_insights", "comprehensive"]
+# Modules whose cold import time bounds API and worker start-up
+IMPORT_MODULES = ["main", "database_connectors", "database_analyzer"]
+
+HTTP_ENDPOINTS = [
+    ("GET", "/health", None),
+    ("GET", "/collections", None),
+    ("GET", "/schema", None),
+    ("POST", "/analyze", {"analysis_type": "performance"}),
+    ("GET", "/insights", None),
+    ("POST", "/chat", {"message": "Show me the database schema"}),
+]
+
+def seed_mongodb(database, bookings):
+    insert_stream(database, HotelDataGenerator(bookings).iter_documents(), INSERT_BATCH_SIZE)
+
+
+async def seed_redis(client, bookings):
+    async with client.pipeline(transaction=False) as pipe:
+        generator = HotelDataGenerator(min(bookings, 100000))
+        for collection, document in generator.booking_documents(0, generator.bookings):
+            if collection == "bookings":
+                pipe.hset(f"booking:{document['_id']}", mapping={
+                    "status": document["status"], "totalAmount": document["totalAmount"],
+                    "hotelId": str(document["hotelId"]),
+                })
+                pipe.zadd("bookings:by_amount", {str(document["_id"]): document["totalAmount"]})
+                if len(pipe) >= INSERT_BATCH_SIZE:
+                    await pipe.execute()
+        await pipe.execute()
+
+
+def patch_mongomock_commands(database):
+    """Answer dbStats and collStats on a mongomock database, which implements neither.
+
+    Sizes are BSON lengths of the stored documents, so the performance analysis has
+    the same inputs as on a real server (minus storage overhead)."""
+    import bson
+
+    def collection_stats(name):
+        sizes = [len(bson.encode(document)) for document in database[name].find()]
+        return {
+            "ns": f"{database.name}.{name}",
+            "count": len(sizes),
+            "size": sum(sizes),
+            "avgObjSize": sum(sizes) // len(sizes) if sizes else 0,
+            "storageSize": sum(sizes),
+            "nindexes": len(database[name].index_information()),
+        }
+
+    def command(command, value=None, **kwargs):
+        name = command if isinstance(command, str) else next(iter(command))
+        if name == "collStats":
+            return dict(collection_stats(value if isinstance(command, str) else command[name]), ok=1.0)
+        if name == "dbStats":
+            collections = [collection_stats(c) for c in database.list_collection_names()]
+            return {
+                "db": database.name,
+                "collections": len(collections),
+                "objects": sum(c["count"] for c in collections),
+                "dataSize": sum(c["size"] for c in collections),
+                "storageSize": sum(c["storageSize"] for c in collections),
+                "indexes": sum(c["nindexes"] for c in collections),
+                "indexSize": 0,
+                "ok": 1.0,
+            }
+        return original(command, **kwargs)
+
+    original = database.command
+    database.command = command
+
+
+def patch_fakeredis_info(client):
+    """Answer INFO on a fakeredis client, which does not implement it, with a quiet server's figures"""
+    import fakeredis
+
+    async def info(section=None, *args, **kwargs):
+        return {
+            "redis_version": f"fakeredis-{fakeredis.__version__}",
+            "connected_clients": 1,
+            "used_memory": 0,
+            "used_memory_human": "0B",
+            "maxmemory": 0,
+            "keyspace_hits": 0,
+            "keyspace_misses": 0,
+            "evicted_keys": 0,
+            "expired_keys": 0,
+            "total_commands_processed": 0,
+            "instantaneous_ops_per_sec": 0,
+            "db0": {"keys": await client.dbsize(), "expires": 0},
+        }
+
+    client.info = info
+
+
+async def connect_mongodb(db_connector, bookings, mongo_uri):
+    """Connect db_connector to a freshly seeded MongoDB (real or mongomock)."""
+    if mongo_uri:
+        import pymongo
+        client = pymongo.MongoClient(mongo_uri)
+        client.drop_database(BENCH_DATABASE)
+        seed_mongodb(client[BENCH_DATABASE], bookings)
+        client.close()
+        await db_connector.connect(db_type="mongodb", connection_string=mongo_uri, database_name=BENCH_DATABASE)
+        return
+    import mongomock
+    # mongomock rejects the comment option the query governor tags analyzer queries with
+    Config.ANALYSIS_QUERY_COMMENT = ""
+    connector = MongoDBConnector()
+    connector.client = mongomock.MongoClient()
+    connector.database = connector.client[BENCH_DATABASE]
+    patch_mongomock_commands(connector.database)
+    seed_mongodb(connector.database, bookings)
+    connector.connection_info = {
+        "type": "mongodb",
+        "connection_string": "mongomock://",
+        "database_name": BENCH_DATABASE,
+        "collections": connector.database.list_collection_names(),
+    }
+    db_connector.connector = connector
+    db_connector.connection_info = connector.connection_info
+    db_connector.connection_id = uuid.uuid4().hex
+
+
+async def connect_redis(db_connector, bookings, redis_uri):
+    """Connect db_connector to a freshly seeded Redis (real or fakeredis)."""
+    if redis_uri:
+        await db_connector.connect(db_type="redis", connection_string=redis_uri)
+        await db_connector.connector.client.flushdb()
+        await seed_redis(db_connector.connector.client, bookings)
+        return
+    import fakeredis
+    connector = RedisConnector()
+    connector.client = fakeredis.FakeAsyncRedis()
+    patch_fakeredis_info(connector.client)
+    await seed_redis(connector.client, bookings)
+    connector.connection_info = {
+        "type": "redis",
+        "connection_string": "fakeredis://",
+        "collections": await connector.list_collections(),
+        "info": {},
+    }
+    db_connector.connector = connector
+    db_connector.connection_info = connector.connection_info
+    db_connector.connection_id = uuid.uuid4().hex
+
+
+def find_error(payload, path=""):
+    """First "error" value anywhere in a result payload, prefixed with where it was found.
+
+    Analyses report failures as {"error": ...} sections (also nested ones, e.g. the
+    sub-analyses of "comprehensive" or HTTP 200 responses), which must not be timed as successes."""
+    if isinstance(payload, dict):
+        if payload.get("error"):
+            return f"{path}: {payload['error']}" if path else str(payload["error"])
+        items = payload.items()
+    elif isinstance(payload, list):
+        items = enumerate(payload)
+    else:
+        return None
+    for key, value in items:
+        error = find_error(value, f"{path}.{key}" if path else str(key))
+        if error:
+            return error
+    return None
+
+
+async def time_async(fn, repeat):
+    """Run fn repeat times; returns (durations, error) where error is the first failure seen."""
+    durations = []
+    error = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        try:
+            result = await fn()
+            error = error or find_error(result)
+        except Exception as e:
+            error = error or f"{type(e).__name__}: {e}"
+        durations.append(time.perf_counter() - started)
+    return durations, error
+
+
+def time_http(client, method, path, body, repeat):
+    durations = []
+    error = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = client.request(method, path, json=body)
+        durations.append(time.perf_counter() - started)
+        if response.status_code >= 400:
+            error = error or f"HTTP {response.status_code}: {response.text[:200]}"
+        elif response.headers.get("content-type", "").startswith("application/json"):
+            error = error or find_error(response.json())
+    return durations, error
+
+
+def summarize_run(backend, scale, path, durations, error):
+    """Timings of a path; a failed path gets no timings so it cannot pass for a fast one."""
+    return {
+        "backend": backend,
+        "scale": scale,
+        "path": path,
+        "runs": [] if error else [round(d, 6) for d in durations],
+        "median_seconds": None if error else round(statistics.median(durations), 6),
+        "min_seconds": None if error else round(min(durations), 6),
+        "error": error,
+    }
+
+
+def print_result(result):
+    scale = f"{result['scale']:>10,}" if result["scale"] else f"{'':>10}"
+    if result["error"]:
+        print(f"  {result['backend']:8} {scale} {result['path']:32} FAILED  ({result['error'][:80]})")
+    else:
+        print(f"  {result['backend']:8} {scale} {result['path']:32} {result['median_seconds']:.4f}s")
+
+
+async def benchmark_backend(backend, scale, args):
+    db_connector = DatabaseConnector()
+    seed_started = time.perf_counter()
+    if backend == "mongodb":
+        await connect_mongodb(db_connector, scale, args.mongo_uri)
+    else:
+        await connect_redis(db_connector, scale, args.redis_uri)
+    results = [summarize_run(backend, scale, "seed", [time.perf_counter() - seed_started], None)]
+
+    analyzer = DatabaseAnalyzer()
+    analyzer.set_connector(db_connector)
+    insight_generator = InsightGenerator()
+    insight_generator.set_connector(db_connector)
+    insight_generator.set_analyzer(analyzer)
+
+    # Bypass the analysis cache so every run measures the database work
+    paths = [(f"analyzer.{t}", lambda t=t: analyzer.analyze(t, use_cache=False)) for t in ANALYSIS_TYPES]
+    paths += [
+        ("insights.generate_insights", lambda: insight_generator.generate_insights(use_cache=False)),
+        # Reads business_insights through the analysis cache; clear it so the query is timed
+        ("insights.hotel_specific",
+         lambda: (analyzer.clear_cache(), insight_generator.generate_hotel_specific_insights())[1]),
+    ]
+    for name, fn in paths:
+        durations, error = await time_async(fn, args.repeat)
+        results.append(summarize_run(backend, scale, name, durations, error))
+        print_result(results[-1])
+
+    if not args.skip_http:
+        results.extend(await asyncio.to_thread(benchmark_http, backend, scale, db_connector, args.repeat))
+
+    await db_connector.disconnect()
+    return results
+
+
+def benchmark_http(backend, scale, db_connector, repeat):
+    from fastapi.testclient import TestClient
+    import main
+
+    # Point the app's global connector at the seeded backend
+    main.db_connector.connector = db_connector.connector
+    main.db_connector.connection_info = db_connector.connection_info
+    main.db_connector.connection_id = db_connector.connection_id
+    results = []
+    with TestClient(main.app) as client:
+        for method, path, body in HTTP_ENDPOINTS:
+            durations, error = time_http(client, method, path, body, repeat)
+            name = f"http.{method} {path}"
+            results.append(summarize_run(backend, scale, name, durations, error))
+            print_result(results[-1])
+    main.db_connector.connector = None
+    main.db_connector.connection_info = {}
+    main.db_connector.connection_id = None
+    return results
+
+
+def parse_importtime(stderr):
+    """Cumulative import seconds per module from `python -X importtime` output, keyed by
+    nesting depth (0 = imported by the -c statement, 1 = imported by those, ...)."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        name = name[1:]
+        depth = (len(name) - len(name.lstrip(" "))) // 2
+        modules.setdefault(depth, {})[name.strip()] = int(cumulative) / 1e6
+    return modules
+
+
+def benchmark_import_time(repeat, modules=IMPORT_MODULES):
+    """Cold-import each module in a fresh interpreter and record cumulative import time."""
+    results = []
+    for module in modules:
+        durations, breakdown, error = [], {}, None
+        for _ in range(repeat):
+            proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                                  capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+            if proc.returncode != 0:
+                error = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "import failed"
+                break
+            depths = parse_importtime(proc.stderr)
+            durations.append(depths.get(0, {}).get(module, 0.0))
+            breakdown = depths.get(1, {})
+        result = summarize_run("process", 0, f"import.{module}", durations or [0.0], error)
+        if breakdown:
+            # Direct dependencies of the module that cost the most
+            result["slowest_imports"] = dict(sorted(breakdown.items(), key=lambda item: -item[1])[:5])
+        results.append(result)
+        print_result(result)
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+def compare(current, baseline_path, threshold):
+    """Print per-path median ratios against a previous results file; returns regressions.
+    A path that fails now but succeeded in the baseline counts as a regression."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    previous = {(r["backend"], r["scale"], r["path"]): r for r in baseline["results"]}
+    regressions = []
+    print(f"\nComparison against {baseline.get('commit')} ({baseline_path}):")
+    for result in current["results"]:
+        before = previous.get((result["backend"], result["scale"], result["path"]))
+        if not before or not before["median_seconds"]:
+            continue
+        if result["error"]:
+            regressions.append(result)
+            print(f"  {result['backend']:8} {result['scale']:>10,} {result['path']:32} "
+                  f"{before['median_seconds']:.4f}s -> FAILED  REGRESSION")
+            continue
+        ratio = result["median_seconds"] / before["median_seconds"]
+        marker = ""
+        if ratio > 1 + threshold:
+            marker = "  REGRESSION"
+            regressions.append(result)
+        print(f"  {result['backend']:8} {result['scale']:>10,} {result['path']:32} "
+              f"{before['median_seconds']:.4f}s -> {result['median_seconds']:.4f}s  x{ratio:.2f}{marker}")
+    return regressions
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", default="1000,100000", help="comma-separated booking counts")
+    parser.add_argument("--backends", default="mongodb,redis", help="comma-separated backends to benchmark")
+    parser.add_argument("--mongo-uri", default=os.getenv("BENCH_MONGO_URI"), help="real mongod instead of mongomock")
+    parser.add_argument("--redis-uri", default=os.getenv("BENCH_REDIS_URI"), help="real redis instead of fakeredis")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per path")
+    parser.add_argument("--skip-http", action="store_true", help="skip HTTP endpoint timings")
+    parser.add_argument("--skip-import", action="store_true", help="skip cold-import timings")
+    parser.add_argument("--output-dir", default="bench_results")
+    parser.add_argument("--compare", help="previous results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="relative slowdown flagged as a regression")
+    return parser.parse_args()
+
+
+async def main():
+    args = parse_args()
+    scales = [int(s) for s in args.scales.split(",") if s]
+    backends = [b.strip() for b in args.backends.split(",") if b.strip()]
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "mongo": args.mongo_uri or "mongomock",
+        "redis": args.redis_uri or "fakeredis",
+        "results": [],
+    }
+    if not args.skip_import:
+        print("Measuring cold import time...")
+        report["results"].extend(benchmark_import_time(args.repeat))
+    for scale in scales:
+        for backend in backends:
+            print(f"Benchmarking {backend} with {scale:,} bookings...")
+            report["results"].extend(await benchmark_backend(backend, scale, args))
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    output_path = os.path.join(args.output_dir, f"bench_{report['commit']}_{int(time.time())}.json")
+    with open(output_path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output_path}")
+
+    regressions = compare(report, args.compare, args.threshold) if args.compare else []
+    failed = [r for r in report["results"] if r["error"]]
+    if failed:
+        print(f"\n{len(failed)} path(s) FAILED and have no timings:", file=sys.stderr)
+        for result in failed:
+            print(f"  {result['backend']} {result['scale']:,} {result['path']}: {result['error'][:200]}",
+                  file=sys.stderr)
+    if regressions or failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -6,6 +6,8 @@ import logging
 from datetime import datetime
 import uuid
 
+from database_analyzer import ABORTING_ERRORS, DatabaseAnalyzer
+
 logger = logging.getLogger(__name__)
 
 class ChatInterface:
@@ -71,6 +73,8 @@ class ChatInterface:
             response["session_id"] = session_id
             return response
             
+        except ABORTING_ERRORS:
+            raise
         except Exception as e:
             error_response = {
                 "error": f"Error processing message: {str(e)}",
@@ -262,6 +266,8 @@ class ChatInterface:
                 "data": schema
             }
             
+        except ABORTING_ERRORS:
+            raise
         except Exception as e:
             return {
                 "response": f"Sorry, I encountered an error while analyzing the schema: {str(e)}",
@@ -314,6 +320,8 @@ class ChatInterface:
                 "data": quality
             }
             
+        except ABORTING_ERRORS:
+            raise
         except Exception as e:
             return {
                 "response": f"Sorry, I encountered an error while analyzing data quality: {str(e)}",
@@ -355,6 +363,8 @@ class ChatInterface:
                 "data": performance
             }
             
+        except ABORTING_ERRORS:
+            raise
         except Exception as e:
             return {
                 "response": f"Sorry, I encountered an error while analyzing performance: {str(e)}",
@@ -425,6 +435,8 @@ class ChatInterface:
                 "data": insights
             }
             
+        except ABORTING_ERRORS:
+            raise
         except Exception as e:
             return {
                 "response": f"Sorry, I encountered an error while generating insights: {str(e)}",
@@ -485,6 +497,8 @@ class ChatInterface:
                 "data": hotel_insights
             }
             
+        except ABORTING_ERRORS:
+            raise
         except Exception as e:
             return {
                 "response": f"Sorry, I encountered an error while generating hotel insights: {str(e)}",
@@ -528,6 +542,8 @@ class ChatInterface:
                 ]
             }
             
+        except ABORTING_ERRORS:
+            raise
         except Exception as e:
             return {
                 "response": f"Sorry, I encountered an error while processing your data query: {str(e)}",
@@ -584,6 +600,8 @@ class ChatInterface:
                 ]
             }
             
+        except ABORTING_ERRORS:
+            raise
         except Exception as e:
             return {
                 "response": f"Sorry, I encountered an error while performing the analysis: {str(e)}",
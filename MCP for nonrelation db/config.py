@@ -1,9 +1,14 @@
 import os
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from dotenv import load_dotenv
 
 load_dotenv()
 
+def _optional_number(name: str, cast=float) -> Optional[float]:
+    """Numeric setting that keeps the driver default when unset"""
+    value = os.getenv(name, "")
+    return cast(value) if value else None
+
 class Config:
     """Configuration class for the MCP application"""
     
@@ -11,6 +16,13 @@ class Config:
     HOST = os.getenv("HOST", "0.0.0.0")
     PORT = int(os.getenv("PORT", 8000))
     DEBUG = os.getenv("DEBUG", "False").lower() == "true"
+    WORKERS = int(os.getenv("WORKERS", 1))  # Server processes; above 1 the shared state store is used
+    # SQLite file shared by the workers for the connection settings and analysis results
+    # (defaults to a file in the temp directory when WORKERS > 1)
+    SHARED_STATE_PATH = os.getenv("SHARED_STATE_PATH", "")
+    # Credentials are never written to the shared store; workers adopting a connection take the
+    # password from here (and secret additional_params from DATABASE_<PARAM>, e.g. DATABASE_API_KEY)
+    DATABASE_PASSWORD = os.getenv("DATABASE_PASSWORD", "")
     
     # Database configuration
     DEFAULT_DB_TYPE = os.getenv("DEFAULT_DB_TYPE", "mongodb")
@@ -28,6 +40,56 @@ class Config:
     # Analysis configuration
     MAX_SAMPLE_SIZE = int(os.getenv("MAX_SAMPLE_SIZE", 1000))
     ANALYSIS_CACHE_TTL = int(os.getenv("ANALYSIS_CACHE_TTL", 3600))  # 1 hour
+    # Process pool for CPU-bound steps (schema inference, sample profiling); 0 runs them inline
+    ANALYSIS_PROCESS_WORKERS = int(os.getenv("ANALYSIS_PROCESS_WORKERS", os.cpu_count() or 1))
+    ANALYSIS_PROCESS_MIN_RECORDS = int(os.getenv("ANALYSIS_PROCESS_MIN_RECORDS", 1000))  # Smaller samples run inline
+    # Query governor: per-request limits on the analyzer's queries; requests may ask for less, never more
+    ANALYSIS_TIMEOUT_SECONDS = float(os.getenv("ANALYSIS_TIMEOUT_SECONDS", 60))  # Shared by all queries of a request
+    ANALYSIS_MAX_DOCS_SCANNED = int(os.getenv("ANALYSIS_MAX_DOCS_SCANNED", 1000000))  # Per collection and query
+    ANALYSIS_BATCH_SIZE = int(os.getenv("ANALYSIS_BATCH_SIZE", 1000))
+    # Comment prefix that tags analyzer queries for killOp; empty for servers before MongoDB 4.4
+    ANALYSIS_QUERY_COMMENT = os.getenv("ANALYSIS_QUERY_COMMENT", "mcp-analyzer")
+    # Scratch MongoDB for index-advisor simulations; simulation is refused without one
+    INDEX_ADVISOR_SCRATCH_URI = os.getenv("INDEX_ADVISOR_SCRATCH_URI", "")
+    
+    # Ad-hoc query streaming (/query); requests may ask for less, never more
+    QUERY_BATCH_SIZE = int(os.getenv("QUERY_BATCH_SIZE", 500))
+    QUERY_MAX_RESULTS = int(os.getenv("QUERY_MAX_RESULTS", 10000))
+    QUERY_TIMEOUT_MS = int(os.getenv("QUERY_TIMEOUT_MS", 30000))
+    # Batches buffered ahead of a slow client before the driver cursor is paused
+    QUERY_BUFFER_BATCHES = int(os.getenv("QUERY_BUFFER_BATCHES", 4))
+    # Concurrent /query streams per backend (each holds a thread while its client reads) and streams
+    # waiting for one; they run on their own <backend>_stream executor
+    QUERY_STREAM_MAX_WORKERS = int(os.getenv("QUERY_STREAM_MAX_WORKERS", 4))
+    QUERY_STREAM_MAX_QUEUE = int(os.getenv("QUERY_STREAM_MAX_QUEUE", 4))
+    
+    # Connection health monitoring
+    HEALTH_CHECK_INTERVAL = float(os.getenv("HEALTH_CHECK_INTERVAL", 10))  # seconds between pings
+    HEALTH_CHECK_TIMEOUT = float(os.getenv("HEALTH_CHECK_TIMEOUT", 2))
+    CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", 3))  # failed pings before failing fast
+    RECONNECT_MAX_BACKOFF = float(os.getenv("RECONNECT_MAX_BACKOFF", 60))
+    
+    # Connection pools; unset values keep each driver's default and /connect can override them
+    POOL_MAX_SIZE = _optional_number("POOL_MAX_SIZE", int)
+    POOL_MIN_SIZE = _optional_number("POOL_MIN_SIZE", int)
+    POOL_MAX_IDLE_SECONDS = _optional_number("POOL_MAX_IDLE_SECONDS")
+    CONNECT_TIMEOUT_SECONDS = _optional_number("CONNECT_TIMEOUT_SECONDS")
+    SOCKET_TIMEOUT_SECONDS = _optional_number("SOCKET_TIMEOUT_SECONDS")
+    READ_PREFERENCE = os.getenv("READ_PREFERENCE", "")  # e.g. secondaryPreferred (MongoDB)
+    COMPRESSORS = os.getenv("COMPRESSORS", "")  # e.g. zstd,snappy (MongoDB), lz4 (Cassandra), gzip (Elasticsearch)
+    
+    # Analytics reads (MongoDB): where analyzer and /query reads go, so they stay off the primary
+    ANALYTICS_URI = os.getenv("ANALYTICS_URI", "")  # separate analytics node/cluster; defaults to the main connection
+    ANALYTICS_READ_PREFERENCE = os.getenv("ANALYTICS_READ_PREFERENCE", "secondaryPreferred")
+    ANALYTICS_READ_PREFERENCE_TAGS = os.getenv("ANALYTICS_READ_PREFERENCE_TAGS", "")  # e.g. nodeType:ANALYTICS;dc:east
+    ANALYTICS_MAX_STALENESS_SECONDS = _optional_number("ANALYTICS_MAX_STALENESS_SECONDS", int)  # at least 90
+    ANALYTICS_READ_CONCERN = os.getenv("ANALYTICS_READ_CONCERN", "")  # e.g. local, available, majority
+    ANALYTICS_ALLOW_DISK_USE = os.getenv("ANALYTICS_ALLOW_DISK_USE", "True").lower() == "true"
+    
+    # Thread pools for blocking driver calls, one per backend; EXECUTOR_MAX_WORKERS_<BACKEND>
+    # and EXECUTOR_MAX_QUEUE_<BACKEND> (e.g. EXECUTOR_MAX_WORKERS_MONGODB) override these
+    EXECUTOR_MAX_WORKERS = int(os.getenv("EXECUTOR_MAX_WORKERS", 16))
+    EXECUTOR_MAX_QUEUE = int(os.getenv("EXECUTOR_MAX_QUEUE", 64))  # Calls waiting for a thread before 503s
     
     # Chat configuration
     MAX_SESSION_DURATION = int(os.getenv("MAX_SESSION_DURATION", 86400))  # 24 hours
@@ -77,6 +139,51 @@ class Config:
         
         return configs.get(db_type.lower(), {})
     
+    @classmethod
+    def get_pool_settings(cls) -> Dict[str, Any]:
+        """Pool settings from the environment, without the unset ones"""
+        settings = {
+            "max_pool_size": cls.POOL_MAX_SIZE,
+            "min_pool_size": cls.POOL_MIN_SIZE,
+            "max_idle_seconds": cls.POOL_MAX_IDLE_SECONDS,
+            "connect_timeout_seconds": cls.CONNECT_TIMEOUT_SECONDS,
+            "socket_timeout_seconds": cls.SOCKET_TIMEOUT_SECONDS,
+            "read_preference": cls.READ_PREFERENCE,
+            "compressors": [c.strip() for c in cls.COMPRESSORS.split(",") if c.strip()]
+        }
+        return {key: value for key, value in settings.items() if value not in (None, "", [])}
+    
+    @classmethod
+    def get_analytics_settings(cls) -> Dict[str, Any]:
+        """Analytics read settings from the environment, without the unset ones"""
+        # Tag sets are tried in order: "a:1,b:2;c:3" means {a: 1, b: 2}, then {c: 3}
+        tag_sets = []
+        for tag_set in cls.ANALYTICS_READ_PREFERENCE_TAGS.split(";"):
+            pairs = [pair.split(":", 1) for pair in tag_set.split(",") if ":" in pair]
+            if pairs:
+                tag_sets.append({key.strip(): value.strip() for key, value in pairs})
+        settings = {
+            "uri": cls.ANALYTICS_URI,
+            "read_preference": cls.ANALYTICS_READ_PREFERENCE,
+            "tag_sets": tag_sets,
+            "max_staleness_seconds": cls.ANALYTICS_MAX_STALENESS_SECONDS,
+            "read_concern": cls.ANALYTICS_READ_CONCERN,
+            "allow_disk_use": cls.ANALYTICS_ALLOW_DISK_USE
+        }
+        return {key: value for key, value in settings.items() if value not in (None, "", [])}
+    
+    @classmethod
+    def get_executor_settings(cls, name: str) -> Dict[str, int]:
+        """Thread count and queue limit of one executor (QUERY_STREAM_* for <backend>_stream executors)"""
+        suffix = name.upper()
+        stream = name.endswith("_stream")
+        max_workers = cls.QUERY_STREAM_MAX_WORKERS if stream else cls.EXECUTOR_MAX_WORKERS
+        max_queue = cls.QUERY_STREAM_MAX_QUEUE if stream else cls.EXECUTOR_MAX_QUEUE
+        return {
+            "max_workers": max(1, int(os.getenv(f"EXECUTOR_MAX_WORKERS_{suffix}", max_workers))),
+            "max_queue": max(0, int(os.getenv(f"EXECUTOR_MAX_QUEUE_{suffix}", max_queue)))
+        }
+    
     @classmethod
     def validate_config(cls) -> bool:
         """Validate the configuration"""
@@ -99,6 +206,8 @@ class Config:
             "data_quality": "Data quality assessment and validation",
             "performance": "Database performance and optimization analysis",
             "business_insights": "Business intelligence and insights",
+            "profiling": "Query plans, slow operations and index usage (MongoDB)",
+            "index_advice": "Compound index suggestions from observed query shapes (MongoDB)",
             "comprehensive": "Complete analysis including all types"
         }
     
@@ -0,0 +1,454 @@
+#!/usr/bin/env python3
+"""
+Synthetic hotel dataset generator and bulk loader
+
+Generates the collections from database_seed.js (hotels, roomTypes, rooms,
+customers, bookings, payments, reviews) with the same document shape, at any
+scale, as a stream. Documents are loaded with unordered insert_many batches,
+optionally from several worker processes, or written as NDJSON for mongoimport:
+
+    python data_generator.py --bookings 1000000 --uri mongodb://localhost:27017 --workers 4
+    python data_generator.py --bookings 1000000 --out ./dataset
+
+Output is deterministic for a given --seed, so runs are reproducible.
+"""
+
+import argparse
+import bisect
+import json
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+from bson import ObjectId, json_util
+
+# Fixed 4-byte prefixes keep ids deterministic and distinct per collection
+ID_PREFIXES = {
+    "hotels": 0x1001, "roomTypes": 0x1002, "rooms": 0x1003, "customers": 0x1004,
+    "bookings": 0x1005, "payments": 0x1006, "reviews": 0x1007,
+}
+
+REFERENCE_COLLECTIONS = ["hotels", "roomTypes", "rooms", "customers"]
+BOOKING_COLLECTIONS = ["bookings", "payments", "reviews"]
+
+# Same indexes as database_seed.js for the generated collections
+INDEXES = {
+    "hotels": [[("address.city", 1)], [("rating", -1)]],
+    "rooms": [[("hotelId", 1), ("roomNumber", 1)], [("status", 1)]],
+    "customers": [[("contact.email", 1)], [("loyaltyProgram.tier", 1)]],
+    "bookings": [[("customerId", 1)], [("hotelId", 1), ("checkInDate", 1)], [("hotelId", 1), ("status", 1)],
+                 [("checkInDate", 1), ("checkOutDate", 1)]],
+    "payments": [[("bookingId", 1)], [("customerId", 1)], [("paymentDate", -1)], [("status", 1)]],
+    "reviews": [[("hotelId", 1), ("overallRating", -1)], [("customerId", 1)], [("reviewDate", -1)]],
+}
+
+CITIES = [
+    ("New York", "NY", "USA"), ("Miami", "FL", "USA"), ("Aspen", "CO", "USA"), ("Chicago", "IL", "USA"),
+    ("San Francisco", "CA", "USA"), ("Seattle", "WA", "USA"), ("Boston", "MA", "USA"), ("Austin", "TX", "USA"),
+    ("London", "", "UK"), ("Paris", "", "France"), ("Tokyo", "", "Japan"), ("Sydney", "NSW", "Australia"),
+]
+HOTEL_AMENITIES = ["WiFi", "Pool", "Spa", "Gym", "Restaurant", "Bar", "Valet Parking", "Concierge",
+                   "Room Service", "Business Center", "Beach Access", "Tennis Court", "Hot Tub"]
+ROOM_TYPES = [
+    ("Standard Single", 1, "Single", 250, 199.99),
+    ("Standard Double", 2, "Queen", 320, 279.99),
+    ("Deluxe Suite", 3, "King", 550, 459.99),
+    ("Executive Suite", 4, "King", 750, 699.99),
+    ("Presidential Suite", 6, "King", 1500, 1999.99),
+]
+ROOM_AMENITIES = ["WiFi", "TV", "Air Conditioning", "Mini Bar", "Safe", "Coffee Maker", "Bathtub", "Balcony"]
+FIRST_NAMES = ["James", "Maria", "Robert", "Linda", "Wei", "Aisha", "Carlos", "Emma", "Yuki", "Olivia",
+               "Noah", "Sofia", "Liam", "Fatima", "Lucas", "Priya"]
+LAST_NAMES = ["Anderson", "Garcia", "Smith", "Chen", "Khan", "Rodriguez", "Müller", "Tanaka", "Brown",
+              "Silva", "Patel", "Johnson", "Rossi", "Nguyen"]
+LOYALTY_TIERS = ["Bronze", "Silver", "Gold", "Platinum"]
+LOYALTY_WEIGHTS = [50, 30, 15, 5]
+BOOKING_STATUSES = ["confirmed", "completed", "cancelled", "pending", "no-show"]
+BOOKING_STATUS_WEIGHTS = [35, 45, 12, 6, 2]
+BOOKING_SOURCES = ["website", "mobile_app", "phone", "travel_agent", "walk_in"]
+PAYMENT_METHODS = ["Credit Card", "Debit Card", "PayPal", "Bank Transfer"]
+CARD_TYPES = ["Visa", "Mastercard", "American Express"]
+SPECIAL_REQUESTS = ["Late checkout", "Early check-in", "Extra pillows", "High floor", "Quiet room",
+                    "Airport transfer", "Anniversary celebration", "Crib"]
+# Relative check-in demand per month (summer and December peaks)
+MONTH_WEIGHTS = [6, 6, 8, 8, 9, 11, 13, 13, 9, 8, 7, 10]
+
+DATASET_START = datetime(2023, 1, 1)
+DATASET_YEARS = 3
+
+
+def make_id(collection, index):
+    return ObjectId(f"{ID_PREFIXES[collection]:08x}{index:016x}")
+
+
+class HotelDataGenerator:
+    """Deterministic, streaming generator for the hotel management dataset.
+
+    Reference collections are sized from the booking count. Bookings are
+    generated by index from a per-shard RNG, so any [start, end) range can be
+    produced independently, e.g. by separate loader processes.
+    """
+
+    def __init__(self, bookings, seed=42, hotels=None, customers=None):
+        self.bookings = bookings
+        self.seed = seed
+        self.hotel_count = hotels or max(3, bookings // 2000)
+        self.customer_count = customers or max(10, bookings // 4)
+        rng = random.Random(seed)
+        self.hotel_room_counts = [rng.randint(20, 120) for _ in range(self.hotel_count)]
+        self.hotel_room_offsets = [0]
+        for count in self.hotel_room_counts:
+            self.hotel_room_offsets.append(self.hotel_room_offsets[-1] + count)
+        self.room_count = self.hotel_room_offsets[-1]
+        # Hotel popularity is skewed so a few hotels get most of the bookings
+        self.hotel_weights_cumulative = []
+        total = 0.0
+        for i in range(self.hotel_count):
+            total += 1.0 / (i + 1) ** 0.8
+            self.hotel_weights_cumulative.append(total)
+
+    def counts(self):
+        return {
+            "hotels": self.hotel_count,
+            "roomTypes": len(ROOM_TYPES),
+            "rooms": self.room_count,
+            "customers": self.customer_count,
+            "bookings": self.bookings,
+            "payments": self.bookings,
+            "reviews": None,
+        }
+
+    def _rng(self, *parts):
+        # String seeds are hashed with SHA-512, so this is stable across processes
+        return random.Random(":".join(str(p) for p in (self.seed,) + parts))
+
+    def hotels(self):
+        rng = self._rng("hotels")
+        for i in range(self.hotel_count):
+            city, state, country = rng.choice(CITIES)
+            yield {
+                "_id": make_id("hotels", i),
+                "name": f"{rng.choice(LAST_NAMES)} {rng.choice(['Grand', 'Plaza', 'Resort', 'Lodge', 'Suites'])} {i}",
+                "address": {
+                    "street": f"{rng.randint(1, 9999)} {rng.choice(['Main', 'Ocean', 'Park', 'Royal'])} Avenue",
+                    "city": city,
+                    "state": state,
+                    "zipCode": f"{rng.randint(10000, 99999)}",
+                    "country": country,
+                },
+                "contact": {
+                    "phone": f"+1-{rng.randint(200, 999)}-555-{rng.randint(0, 9999):04d}",
+                    "email": f"info@hotel{i}.example.com",
+                    "website": f"www.hotel{i}.example.com",
+                },
+                "rating": rng.choices([2, 3, 4, 5], weights=[5, 25, 45, 25])[0],
+                "amenities": rng.sample(HOTEL_AMENITIES, rng.randint(4, 10)),
+                "totalRooms": self.hotel_room_counts[i],
+                "description": f"Hotel {i} in {city}",
+                "images": [f"hotel{i}_main.jpg", f"hotel{i}_lobby.jpg"],
+                "established": datetime(rng.randint(1950, 2020), rng.randint(1, 12), rng.randint(1, 28)),
+                "manager": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+                "status": "active" if rng.random() < 0.97 else "renovation",
+            }
+
+    def room_types(self):
+        for i, (name, occupancy, bed, size, price) in enumerate(ROOM_TYPES):
+            yield {
+                "_id": make_id("roomTypes", i),
+                "name": name,
+                "description": f"{name} room",
+                "maxOccupancy": occupancy,
+                "bedType": bed,
+                "size": size,
+                "amenities": ROOM_AMENITIES[:4 + i],
+                "basePrice": price,
+                "images": [f"{name.lower().replace(' ', '_')}.jpg"],
+            }
+
+    def _room_type_index(self, room_index):
+        # Most rooms are standard; suites are rare
+        return min(len(ROOM_TYPES) - 1, int(-math.log(1 - (room_index * 0.618034) % 1) * 0.9))
+
+    def rooms(self):
+        rng = self._rng("rooms")
+        for hotel in range(self.hotel_count):
+            for n in range(self.hotel_room_counts[hotel]):
+                room_index = self.hotel_room_offsets[hotel] + n
+                yield {
+                    "_id": make_id("rooms", room_index),
+                    "hotelId": make_id("hotels", hotel),
+                    "roomNumber": f"{n // 20 + 1}{n % 20 + 1:02d}",
+                    "floor": n // 20 + 1,
+                    "roomTypeId": make_id("roomTypes", self._room_type_index(room_index)),
+                    "status": rng.choices(["available", "occupied", "maintenance"], weights=[60, 35, 5])[0],
+                    "lastCleaned": DATASET_START + timedelta(days=rng.randint(0, 365 * DATASET_YEARS)),
+                    "lastMaintenance": DATASET_START + timedelta(days=rng.randint(0, 365 * DATASET_YEARS)),
+                    "features": rng.sample(["City View", "Ocean View", "Non-Smoking", "Accessible", "Corner"], 2),
+                    "notes": "",
+                }
+
+    def customers(self):
+        rng = self._rng("customers")
+        for i in range(self.customer_count):
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            city, state, country = rng.choice(CITIES)
+            yield {
+                "_id": make_id("customers", i),
+                "personalInfo": {
+                    "firstName": first,
+                    "lastName": last,
+                    "dateOfBirth": datetime(rng.randint(1945, 2004), rng.randint(1, 12), rng.randint(1, 28)),
+                    "gender": rng.choice(["Male", "Female"]),
+                    "nationality": country,
+                },
+                "contact": {
+                    "email": f"{first.lower()}.{last.lower()}{i}@email.example.com",
+                    "phone": f"+1-555-{rng.randint(0, 9999):04d}",
+                    "address": {"street": f"{rng.randint(1, 999)} Oak Street", "city": city, "state": state,
+                                "zipCode": f"{rng.randint(10000, 99999)}", "country": country},
+                },
+                "preferences": {
+                    "roomType": "Non-Smoking",
+                    "bedType": rng.choice(["King", "Queen", "Twin"]),
+                    "specialRequests": rng.sample(SPECIAL_REQUESTS, rng.randint(0, 2)),
+                },
+                "loyaltyProgram": {
+                    "memberId": f"LP{i:08d}",
+                    "tier": rng.choices(LOYALTY_TIERS, weights=LOYALTY_WEIGHTS)[0],
+                    "points": int(rng.paretovariate(1.5) * 1000),
+                    "joinDate": DATASET_START - timedelta(days=rng.randint(0, 3650)),
+                },
+                "registrationDate": DATASET_START - timedelta(days=rng.randint(0, 3650)),
+                "isActive": rng.random() < 0.95,
+            }
+
+    def _check_in_date(self, rng):
+        year = DATASET_START.year + rng.randrange(DATASET_YEARS)
+        month = rng.choices(range(1, 13), weights=MONTH_WEIGHTS)[0]
+        return datetime(year, month, rng.randint(1, 28), 15, 0)
+
+    def booking_documents(self, start, end):
+        """Yield (collection, document) for bookings [start, end) plus their payments and reviews."""
+        rng = self._rng("bookings", start)
+        for i in range(start, end):
+            hotel = bisect.bisect_left(self.hotel_weights_cumulative,
+                                       rng.random() * self.hotel_weights_cumulative[-1])
+            room = self.hotel_room_offsets[hotel] + rng.randrange(self.hotel_room_counts[hotel])
+            room_type = ROOM_TYPES[self._room_type_index(room)]
+            # A small pool of frequent guests accounts for a third of the bookings
+            if rng.random() < 0.3:
+                customer = rng.randrange(max(1, self.customer_count // 20))
+            else:
+                customer = rng.randrange(self.customer_count)
+            check_in = self._check_in_date(rng)
+            nights = min(21, 1 + int(rng.expovariate(1 / 2.5)))
+            check_out = check_in + timedelta(days=nights, hours=-4)
+            # Lead time is roughly exponential with a 30-day mean
+            booking_date = check_in - timedelta(days=rng.expovariate(1 / 30), minutes=rng.randint(0, 1440))
+            status = rng.choices(BOOKING_STATUSES, weights=BOOKING_STATUS_WEIGHTS)[0]
+            guests = rng.randint(1, room_type[1])
+            total = round(room_type[4] * nights * rng.uniform(0.85, 1.25), 2)
+            payment_method = rng.choice(PAYMENT_METHODS)
+            booking_id = make_id("bookings", i)
+            customer_id = make_id("customers", customer)
+            hotel_id = make_id("hotels", hotel)
+            yield "bookings", {
+                "_id": booking_id,
+                "bookingReference": f"BK{check_in.year}{i:010d}",
+                "customerId": customer_id,
+                "hotelId": hotel_id,
+                "roomId": make_id("rooms", room),
+                "checkInDate": check_in,
+                "checkOutDate": check_out,
+                "numberOfGuests": guests,
+                "guestDetails": [
+                    {"firstName": rng.choice(FIRST_NAMES), "lastName": rng.choice(LAST_NAMES),
+                     "age": rng.randint(18, 80), "isMainGuest": g == 0}
+                    for g in range(guests)
+                ],
+                "bookingDate": booking_date,
+                "status": status,
+                "totalAmount": total,
+                "paymentStatus": "refunded" if status == "cancelled" else ("pending" if status == "pending" else "paid"),
+                "paymentMethod": payment_method,
+                "specialRequests": rng.sample(SPECIAL_REQUESTS, rng.randint(0, 3)),
+                "source": rng.choices(BOOKING_SOURCES, weights=[45, 25, 12, 15, 3])[0],
+                "notes": "",
+                "cancellationPolicy": "Free cancellation until 24 hours before check-in",
+            }
+            fees = round(total * 0.03, 2)
+            yield "payments", {
+                "_id": make_id("payments", i),
+                "bookingId": booking_id,
+                "customerId": customer_id,
+                "paymentReference": f"PAY{check_in.year}{i:010d}",
+                "amount": total,
+                "currency": "USD",
+                "paymentMethod": payment_method,
+                "cardDetails": {"cardType": rng.choice(CARD_TYPES), "lastFourDigits": f"{rng.randint(0, 9999):04d}",
+                                "expiryMonth": rng.randint(1, 12), "expiryYear": rng.randint(2025, 2030)}
+                if "Card" in payment_method else None,
+                "paymentDate": booking_date + timedelta(minutes=rng.randint(1, 30)),
+                "status": "refunded" if status == "cancelled" else ("pending" if status == "pending" else "completed"),
+                "transactionId": f"TXN_{i:012d}",
+                "paymentGateway": rng.choice(["Stripe", "PayPal", "Adyen"]),
+                "fees": fees,
+                "netAmount": round(total - fees, 2),
+                "refunds": [{"amount": total, "date": booking_date + timedelta(days=1)}] if status == "cancelled" else [],
+            }
+            # Roughly a third of completed stays leave a review shortly after checkout
+            if status == "completed" and rng.random() < 0.35:
+                overall = rng.choices([1, 2, 3, 4, 5], weights=[3, 5, 15, 40, 37])[0]
+                yield "reviews", {
+                    "_id": make_id("reviews", i),
+                    "bookingId": booking_id,
+                    "customerId": customer_id,
+                    "hotelId": hotel_id,
+                    "overallRating": overall,
+                    "ratings": {k: max(1, min(5, overall + rng.randint(-1, 1)))
+                                for k in ("cleanliness", "service", "location", "value", "amenities")},
+                    "title": "Great stay" if overall >= 4 else "Could be better",
+                    "comment": "Synthetic review text.",
+                    "reviewDate": check_out + timedelta(days=rng.expovariate(1 / 3)),
+                    "verified": rng.random() < 0.9,
+                    "helpful": int(rng.expovariate(1 / 4)),
+                    "reported": 0,
+                }
+
+    def reference_documents(self):
+        """Yield (collection, document) for every non-booking collection."""
+        for collection, documents in (("hotels", self.hotels()), ("roomTypes", self.room_types()),
+                                      ("rooms", self.rooms()), ("customers", self.customers())):
+            for document in documents:
+                yield collection, document
+
+    def iter_documents(self):
+        yield from self.reference_documents()
+        yield from self.booking_documents(0, self.bookings)
+
+
+def insert_stream(database, documents, batch_size=10000):
+    """Insert (collection, document) pairs with unordered insert_many batches; returns counts."""
+    batches = {}
+    counts = {}
+    for collection, document in documents:
+        batch = batches.setdefault(collection, [])
+        batch.append(document)
+        if len(batch) >= batch_size:
+            database[collection].insert_many(batch, ordered=False, bypass_document_validation=True)
+            counts[collection] = counts.get(collection, 0) + len(batch)
+            batch.clear()
+    for collection, batch in batches.items():
+        if batch:
+            database[collection].insert_many(batch, ordered=False, bypass_document_validation=True)
+            counts[collection] = counts.get(collection, 0) + len(batch)
+    return counts
+
+
+def _load_booking_shard(uri, database_name, bookings, seed, start, end, batch_size):
+    from pymongo import MongoClient
+    client = MongoClient(uri, w=1)
+    try:
+        generator = HotelDataGenerator(bookings, seed=seed)
+        return insert_stream(client[database_name], generator.booking_documents(start, end), batch_size)
+    finally:
+        client.close()
+
+
+def create_indexes(database):
+    for collection, indexes in INDEXES.items():
+        for keys in indexes:
+            database[collection].create_index(keys)
+
+
+def bulk_load(uri, database_name, bookings, seed=42, batch_size=10000, workers=1, drop=False, indexes=True):
+    """Generate and load a dataset into MongoDB; returns per-collection counts and throughput."""
+    from pymongo import MongoClient
+    client = MongoClient(uri)
+    database = client[database_name]
+    if drop:
+        client.drop_database(database_name)
+    generator = HotelDataGenerator(bookings, seed=seed)
+    started = time.perf_counter()
+    counts = insert_stream(database, generator.reference_documents(), batch_size)
+
+    # Bookings (with payments and reviews) are sharded by index range across processes
+    shard_size = max(batch_size, math.ceil(bookings / max(workers, 1)))
+    shards = [(start, min(start + shard_size, bookings)) for start in range(0, bookings, shard_size)]
+    if workers > 1 and len(shards) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_load_booking_shard, uri, database_name, bookings, seed, start, end, batch_size)
+                       for start, end in shards]
+            shard_counts = [future.result() for future in futures]
+    else:
+        shard_counts = [insert_stream(database, generator.booking_documents(start, end), batch_size)
+                        for start, end in shards]
+    for shard in shard_counts:
+        for collection, count in shard.items():
+            counts[collection] = counts.get(collection, 0) + count
+    load_seconds = time.perf_counter() - started
+
+    index_seconds = 0.0
+    if indexes:
+        index_started = time.perf_counter()
+        create_indexes(database)
+        index_seconds = time.perf_counter() - index_started
+    client.close()
+
+    total = sum(counts.values())
+    return {
+        "counts": counts,
+        "documents": total,
+        "load_seconds": round(load_seconds, 3),
+        "index_seconds": round(index_seconds, 3),
+        "documents_per_second": round(total / load_seconds, 1) if load_seconds else None,
+    }
+
+
+def write_ndjson(generator, out_dir):
+    """Write one extended-JSON file per collection, loadable with mongoimport."""
+    os.makedirs(out_dir, exist_ok=True)
+    files = {}
+    try:
+        for collection, document in generator.iter_documents():
+            if collection not in files:
+                files[collection] = open(os.path.join(out_dir, f"{collection}.ndjson"), "w")
+            files[collection].write(json_util.dumps(document, json_options=json_util.CANONICAL_JSON_OPTIONS))
+            files[collection].write("\n")
+    finally:
+        for f in files.values():
+            f.close()
+    return sorted(files)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bookings", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--uri", default=os.getenv("DEFAULT_CONNECTION_STRING", "mongodb://localhost:27017"))
+    parser.add_argument("--database", default=os.getenv("DEFAULT_DATABASE_NAME") or "hotel_management")
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--drop", action="store_true", help="drop the database before loading")
+    parser.add_argument("--no-indexes", action="store_true", help="skip creating the seed indexes")
+    parser.add_argument("--out", help="write NDJSON files to this directory instead of loading")
+    args = parser.parse_args()
+
+    if args.out:
+        collections = write_ndjson(HotelDataGenerator(args.bookings, seed=args.seed), args.out)
+        print(f"Wrote {len(collections)} collections to {args.out}. Load with:")
+        for collection in collections:
+            print(f"  mongoimport --uri {args.uri}/{args.database} --collection {collection} "
+                  f"--file {os.path.join(args.out, collection + '.ndjson')} --numInsertionWorkers {args.workers}")
+        return
+
+    stats = bulk_load(args.uri, args.database, args.bookings, seed=args.seed, batch_size=args.batch_size,
+                      workers=args.workers, drop=args.drop, indexes=not args.no_indexes)
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
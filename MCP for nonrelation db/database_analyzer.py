@@ -1,27 +1,101 @@
 import asyncio
 import json
-import pandas as pd
-import numpy as np
 from typing import Dict, List, Any, Optional, Union
 import logging
 from datetime import datetime, timedelta
 import re
+import time
+from collections import Counter, OrderedDict
+
+import analysis_workers
+import executors
+import instrumentation
+import query_governor
+import query_profiler
+import serialization
+import shared_state
+from config import Config
+from database_connectors import load_driver
+from index_advisor import IndexAdvisor
+from serialization import truncate_document
 
 logger = logging.getLogger(__name__)
 
+# Errors that end the whole analysis request instead of becoming an {"error": ...} section
+ABORTING_ERRORS = (query_governor.QueryBudgetExceeded, executors.ExecutorSaturated, asyncio.CancelledError)
+
+# Documents with a null or empty-string value in any top-level field
+_TOP_LEVEL_VALUES = {"$map": {"input": {"$objectToArray": "$$ROOT"}, "as": "field", "in": "$$field.v"}}
+NULL_OR_EMPTY_FILTER = {"$expr": {"$or": [{"$in": [None, _TOP_LEVEL_VALUES]}, {"$in": ["", _TOP_LEVEL_VALUES]}]}}
+
 class DatabaseAnalyzer:
     """Analyzes non-relational databases and provides insights"""
     
     def __init__(self):
         self.db_connector = None
-        self.analysis_cache = {}
+        self.analysis_cache = OrderedDict()  # (connection id, type, filters) -> (expires_at, result)
+        self.cache_ttl = Config.ANALYSIS_CACHE_TTL
+        self.max_cache_entries = 128
+        self.shared_store = None  # Second cache level shared with the other worker processes
+    
+    def set_shared_store(self, store):
+        """Share analysis results with the other workers through a shared_state.SharedStore"""
+        self.shared_store = store
     
     def set_connector(self, connector):
         """Set the database connector"""
         self.db_connector = connector
+        self.clear_cache()
+    
+    def clear_cache(self):
+        """Drop cached analysis results (e.g. after connecting to another database)"""
+        self.analysis_cache.clear()
+    
+    def _cache_key(self, analysis_type: str, filters: Optional[Dict[str, Any]]) -> tuple:
+        # The connection id changes on every connect; id() of a connector can be reused by the next one
+        connection_id = getattr(self.db_connector, "connection_id", None)
+        return (connection_id, analysis_type, json.dumps(filters or {}, sort_keys=True, default=str))
+    
+    def _shared_key(self, analysis_type: str, filters: Optional[Dict[str, Any]]) -> Optional[str]:
+        """Key in the shared store; None when results cannot be shared"""
+        connection_id = getattr(self.db_connector, "connection_id", None)
+        if self.shared_store is None or not connection_id:
+            return None
+        return f"{connection_id}:{analysis_type}:{json.dumps(filters or {}, sort_keys=True, default=str)}"
+    
+    def _shared_get(self, shared_key: Optional[str]):
+        """(seconds left, result) cached by any worker, else None"""
+        if shared_key is None:
+            return None
+        try:
+            entry = self.shared_store.get(shared_state.ANALYSIS_NAMESPACE, shared_key)
+        except Exception as e:
+            logger.warning(f"Reading the shared analysis cache failed: {str(e)}")
+            return None
+        if entry is None:
+            return None
+        value, expires_at = entry
+        return (expires_at - time.time() if expires_at else self.cache_ttl), json.loads(value)
+    
+    def _shared_set(self, shared_key: Optional[str], result: Dict[str, Any]):
+        if shared_key is None:
+            return
+        try:
+            self.shared_store.set(shared_state.ANALYSIS_NAMESPACE, shared_key, serialization.dumps(result),
+                                  ttl=self.cache_ttl)
+        except Exception as e:
+            logger.warning(f"Writing the shared analysis cache failed: {str(e)}")
+    
+    def _cache_put(self, key: tuple, result: Dict[str, Any], ttl: float):
+        self.analysis_cache[key] = (time.monotonic() + ttl, result)
+        self.analysis_cache.move_to_end(key)
+        while len(self.analysis_cache) > self.max_cache_entries:
+            self.analysis_cache.popitem(last=False)
     
-    async def analyze(self, analysis_type: str, filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        """Perform database analysis based on type"""
+    async def analyze(self, analysis_type: str, filters: Optional[Dict[str, Any]] = None,
+                      use_cache: bool = True) -> Dict[str, Any]:
+        """Perform database analysis based on type; results are cached for ANALYSIS_CACHE_TTL seconds,
+        in this process and, with a shared store, for all workers"""
         
         if not self.db_connector or not self.db_connector.is_connected():
             raise RuntimeError("No database connected")
@@ -31,94 +105,129 @@ class DatabaseAnalyzer:
             "data_quality": self.analyze_data_quality,
             "performance": self.analyze_performance,
             "business_insights": self.analyze_business_insights,
+            "profiling": self.analyze_profiling,
+            "index_advice": self.analyze_index_advice,
             "comprehensive": self.comprehensive_analysis
         }
         
         if analysis_type not in analysis_functions:
             raise ValueError(f"Unsupported analysis type: {analysis_type}")
         
-        return await analysis_functions[analysis_type](filters)
+        key = self._cache_key(analysis_type, filters)
+        cached = self.analysis_cache.get(key)
+        if use_cache and cached and cached[0] > time.monotonic():
+            self.analysis_cache.move_to_end(key)
+            return cached[1]
+        
+        shared_key = self._shared_key(analysis_type, filters) if self.cache_ttl > 0 else None
+        if use_cache:
+            shared = self._shared_get(shared_key)
+            if shared is not None:
+                self._cache_put(key, shared[1], shared[0])
+                return shared[1]
+        
+        with query_governor.budget() as budget:
+            remaining = budget.remaining_seconds()
+            try:
+                result = await asyncio.wait_for(analysis_functions[analysis_type](filters), remaining)
+            except asyncio.TimeoutError:
+                await self._kill_operations(budget)
+                raise query_governor.QueryBudgetExceeded(
+                    f"{analysis_type} analysis exceeded its {budget.timeout_seconds:g} s time budget"
+                ) from None
+            except asyncio.CancelledError:
+                # The client went away; stop the queries still running on the server
+                await self._kill_operations(budget)
+                raise
+        
+        # Counts and aggregations that stopped at max_docs_scanned cover only part of the data
+        if isinstance(result, dict) and "error" not in result:
+            result["capped"] = bool(budget.capped)
+            if budget.capped:
+                result["capped_collections"] = sorted(budget.capped)
+                result["max_docs_scanned"] = budget.max_docs_scanned
+        
+        # Failed analyses are not cached so the next request retries
+        if self.cache_ttl > 0 and not (isinstance(result, dict) and "error" in result):
+            self._cache_put(key, result, self.cache_ttl)
+            self._shared_set(shared_key, result)
+        return result
     
+    @instrumentation.staged("schema")
     async def analyze_schema(self, filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Analyze database schema"""
         try:
-            db_type = self.db_connector.get_connection_info().get("type")
-            
-            if db_type == "mongodb":
-                return await self._analyze_mongodb_schema(filters)
-            elif db_type == "redis":
-                return await self._analyze_redis_schema(filters)
-            elif db_type == "cassandra":
-                return await self._analyze_cassandra_schema(filters)
-            elif db_type == "elasticsearch":
-                return await self._analyze_elasticsearch_schema(filters)
-            else:
-                raise ValueError(f"Schema analysis not implemented for {db_type}")
-                
+            return await self._strategy("schema")(filters)
+        except ABORTING_ERRORS:
+            raise
         except Exception as e:
             logger.error(f"Schema analysis failed: {str(e)}")
             return {"error": str(e)}
     
+    @instrumentation.staged("data_quality")
     async def analyze_data_quality(self, filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Analyze data quality"""
         try:
-            db_type = self.db_connector.get_connection_info().get("type")
-            
-            if db_type == "mongodb":
-                return await self._analyze_mongodb_data_quality(filters)
-            elif db_type == "redis":
-                return await self._analyze_redis_data_quality(filters)
-            elif db_type == "cassandra":
-                return await self._analyze_cassandra_data_quality(filters)
-            elif db_type == "elasticsearch":
-                return await self._analyze_elasticsearch_data_quality(filters)
-            else:
-                raise ValueError(f"Data quality analysis not implemented for {db_type}")
-                
+            return await self._strategy("data_quality")(filters)
+        except ABORTING_ERRORS:
+            raise
         except Exception as e:
             logger.error(f"Data quality analysis failed: {str(e)}")
             return {"error": str(e)}
     
+    @instrumentation.staged("performance")
     async def analyze_performance(self, filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Analyze database performance"""
         try:
-            db_type = self.db_connector.get_connection_info().get("type")
-            
-            if db_type == "mongodb":
-                return await self._analyze_mongodb_performance(filters)
-            elif db_type == "redis":
-                return await self._analyze_redis_performance(filters)
-            elif db_type == "cassandra":
-                return await self._analyze_cassandra_performance(filters)
-            elif db_type == "elasticsearch":
-                return await self._analyze_elasticsearch_performance(filters)
-            else:
-                raise ValueError(f"Performance analysis not implemented for {db_type}")
-                
+            return await self._strategy("performance")(filters)
+        except ABORTING_ERRORS:
+            raise
         except Exception as e:
             logger.error(f"Performance analysis failed: {str(e)}")
             return {"error": str(e)}
     
+    @instrumentation.staged("business_insights")
     async def analyze_business_insights(self, filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Analyze business insights"""
+        try:
+            return await self._strategy("business_insights")(filters)
+        except ABORTING_ERRORS:
+            raise
+        except Exception as e:
+            logger.error(f"Business insights analysis failed: {str(e)}")
+            return {"error": str(e)}
+    
+    @instrumentation.staged("profiling")
+    async def analyze_profiling(self, filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Profile queries: slow operations, query plans and index usage"""
         try:
             db_type = self.db_connector.get_connection_info().get("type")
             
-            if db_type == "mongodb":
-                return await self._analyze_mongodb_business_insights(filters)
-            elif db_type == "redis":
-                return await self._analyze_redis_business_insights(filters)
-            elif db_type == "cassandra":
-                return await self._analyze_cassandra_business_insights(filters)
-            elif db_type == "elasticsearch":
-                return await self._analyze_elasticsearch_business_insights(filters)
-            else:
-                raise ValueError(f"Business insights analysis not implemented for {db_type}")
-                
+            if not self.db_connector.get_capabilities().get("query_profiling"):
+                return {"message": f"Query profiling is not available for {db_type}"}
+            return await self._strategy("profiling")(filters)
+        except ABORTING_ERRORS:
+            raise
         except Exception as e:
-            logger.error(f"Business insights analysis failed: {str(e)}")
+            logger.error(f"Profiling analysis failed: {str(e)}")
             return {"error": str(e)}
     
+    @instrumentation.staged("index_advice")
+    async def analyze_index_advice(self, filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Suggest compound indexes from observed query shapes"""
+        try:
+            db_type = self.db_connector.get_connection_info().get("type")
+            
+            if not self.db_connector.get_capabilities().get("index_advice"):
+                return {"message": f"Index advice is not available for {db_type}"}
+            return await self._strategy("index_advice")(filters)
+        except ABORTING_ERRORS:
+            raise
+        except Exception as e:
+            logger.error(f"Index advice failed: {str(e)}")
+            return {"error": str(e)}
+    
+    @instrumentation.staged("comprehensive")
     async def comprehensive_analysis(self, filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Perform comprehensive analysis"""
         try:
@@ -132,31 +241,23 @@ class DatabaseAnalyzer:
             
             return results
             
+        except ABORTING_ERRORS:
+            raise
         except Exception as e:
             logger.error(f"Comprehensive analysis failed: {str(e)}")
             return {"error": str(e)}
     
-    async def get_schema(self) -> Dict[str, Any]:
+    async def get_schema(self, include_samples: bool = False) -> Dict[str, Any]:
         """Get database schema information"""
-        return await self.analyze_schema()
+        return await self.analyze("schema", {"include_samples": include_samples})
     
     async def get_collections(self) -> List[str]:
         """Get list of collections/tables"""
         try:
-            connection_info = self.db_connector.get_connection_info()
-            db_type = connection_info.get("type")
-            
-            if db_type == "mongodb":
-                return connection_info.get("collections", [])
-            elif db_type == "redis":
-                return connection_info.get("keys", [])
-            elif db_type == "cassandra":
-                return connection_info.get("tables", [])
-            elif db_type == "elasticsearch":
-                return connection_info.get("indices", [])
-            else:
-                return []
-                
+            connector = await self.db_connector.get_client()
+            return self.db_connector.get_connection_info().get(connector.collections_field, [])
+        except ABORTING_ERRORS:
+            raise
         except Exception as e:
             logger.error(f"Failed to get collections: {str(e)}")
             return []
@@ -165,8 +266,10 @@ class DatabaseAnalyzer:
     async def _analyze_mongodb_schema(self, filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Analyze MongoDB schema"""
         try:
+            filters = filters or {}
+            sample_size = int(filters.get("sample_size", 10))
             connector = await self.db_connector.get_client()
-            database = connector.database
+            database = connector.analytics_database
             
             schema_analysis = {
                 "database_name": database.name,
@@ -175,9 +278,7 @@ class DatabaseAnalyzer:
                 "total_documents": 0
             }
             
-            collections = await asyncio.get_event_loop().run_in_executor(
-                None, database.list_collection_names
-            )
+            collections = await self._run("list_collection_names", database.list_collection_names)
             
             schema_analysis["total_collections"] = len(collections)
             
@@ -185,30 +286,37 @@ class DatabaseAnalyzer:
                 collection = database[collection_name]
                 
                 # Get collection stats
-                stats = await asyncio.get_event_loop().run_in_executor(
-                    None, collection.stats
-                )
+                stats = await self._run("collStats", self._mongodb_collection_stats, database, collection_name)
                 
                 # Sample documents to understand schema
-                sample_docs = await asyncio.get_event_loop().run_in_executor(
-                    None, lambda: list(collection.find().limit(10))
+                self._record_query(database, collection_name, "find")
+                sample_docs = await self._run(
+                    "find", lambda: list(collection.find(**query_governor.current_budget().find_options(sample_size)))
                 )
                 
                 # Analyze field types
-                field_types = self._analyze_document_fields(sample_docs)
+                field_types = await analysis_workers.run_cpu(analysis_workers.infer_field_types, sample_docs)
                 
                 schema_analysis["collections"][collection_name] = {
                     "document_count": stats.get("count", 0),
                     "size_bytes": stats.get("size", 0),
                     "avg_document_size": stats.get("avgObjSize", 0),
-                    "field_types": field_types,
-                    "sample_documents": sample_docs[:3]  # First 3 docs as samples
+                    "field_types": field_types
                 }
                 
+                # Raw samples are opt-in and truncated; they dominate payload size otherwise
+                if filters.get("include_samples"):
+                    schema_analysis["collections"][collection_name]["sample_documents"] = [
+                        truncate_document(doc, max_string=int(filters.get("max_string_length", 200)))
+                        for doc in sample_docs[:int(filters.get("max_samples", 3))]
+                    ]
+                
                 schema_analysis["total_documents"] += stats.get("count", 0)
             
             return schema_analysis
             
+        except ABORTING_ERRORS:
+            raise
         except Exception as e:
             logger.error(f"MongoDB schema analysis failed: {str(e)}")
             return {"error": str(e)}
@@ -217,7 +325,7 @@ class DatabaseAnalyzer:
         """Analyze MongoDB data quality"""
         try:
             connector = await self.db_connector.get_client()
-            database = connector.database
+            database = connector.analytics_database
             
             quality_analysis = {
                 "collections": {},
@@ -225,9 +333,7 @@ class DatabaseAnalyzer:
                 "issues": []
             }
             
-            collections = await asyncio.get_event_loop().run_in_executor(
-                None, database.list_collection_names
-            )
+            collections = await self._run("list_collection_names", database.list_collection_names)
             
             total_score = 0
             collection_count = 0
@@ -235,23 +341,17 @@ class DatabaseAnalyzer:
             for collection_name in collections:
                 collection = database[collection_name]
                 
-                # Check for null values
-                null_count = await asyncio.get_event_loop().run_in_executor(
-                    None, lambda: collection.count_documents({"$or": [{"$expr": {"$eq": ["$", None]}}, {"$expr": {"$eq": ["$", ""]}}]})
-                )
+                # Check for null values (the analyzer's own probes are not logged as application queries)
+                null_count = await self._run("count_documents", lambda: query_governor.count_documents(collection, NULL_OR_EMPTY_FILTER))
                 
                 # Check for duplicate documents
-                total_docs = await asyncio.get_event_loop().run_in_executor(
-                    None, lambda: collection.count_documents({})
-                )
+                total_docs = await self._run("count_documents", lambda: query_governor.count_documents(collection, {}))
                 
                 # Check for missing required fields (example for hotel data)
                 missing_fields = {}
                 hotel_fields = ["name", "address", "rating", "price"]
                 for field in hotel_fields:
-                    missing_count = await asyncio.get_event_loop().run_in_executor(
-                        None, lambda f: collection.count_documents({f: {"$exists": False}}), field
-                    )
+                    missing_count = await self._run("count_documents", lambda f: query_governor.count_documents(collection, {f: {"$exists": False}}), field)
                     if missing_count > 0:
                         missing_fields[field] = missing_count
                 
@@ -265,6 +365,7 @@ class DatabaseAnalyzer:
                     "null_values": null_count,
                     "missing_fields": missing_fields,
                     "quality_score": quality_score,
+                    "capped": collection_name in query_governor.current_budget().capped,
                     "issues": []
                 }
                 
@@ -286,6 +387,8 @@ class DatabaseAnalyzer:
             
             return quality_analysis
             
+        except ABORTING_ERRORS:
+            raise
         except Exception as e:
             logger.error(f"MongoDB data quality analysis failed: {str(e)}")
             return {"error": str(e)}
@@ -294,7 +397,7 @@ class DatabaseAnalyzer:
         """Analyze MongoDB performance"""
         try:
             connector = await self.db_connector.get_client()
-            database = connector.database
+            database = connector.analytics_database
             
             performance_analysis = {
                 "database_stats": {},
@@ -303,9 +406,7 @@ class DatabaseAnalyzer:
             }
             
             # Get database stats
-            db_stats = await asyncio.get_event_loop().run_in_executor(
-                None, database.command, "dbStats"
-            )
+            db_stats = await self._run("dbStats", self._mongodb_command, database, "dbStats")
             
             performance_analysis["database_stats"] = {
                 "collections": db_stats.get("collections", 0),
@@ -315,23 +416,16 @@ class DatabaseAnalyzer:
                 "index_size": db_stats.get("indexSize", 0)
             }
             
-            collections = await asyncio.get_event_loop().run_in_executor(
-                None, database.list_collection_names
-            )
+            collections = await self._run("list_collection_names", database.list_collection_names)
             
             for collection_name in collections:
                 collection = database[collection_name]
                 
                 # Get collection stats
-                stats = await asyncio.get_event_loop().run_in_executor(
-                    None, collection.stats
-                )
+                stats = await self._run("collStats", self._mongodb_collection_stats, database, collection_name)
                 
                 # Get index information
-                indexes = await asyncio.get_event_loop().run_in_executor(
-                    None, collection.list_indexes
-                )
-                index_list = list(indexes)
+                index_list = await self._run("list_indexes", lambda: list(collection.list_indexes()))
                 
                 performance_analysis["collections"][collection_name] = {
                     "document_count": stats.get("count", 0),
@@ -353,8 +447,23 @@ class DatabaseAnalyzer:
                     "Consider adding indexes for frequently queried fields"
                 )
             
+            # Compound index suggestions from the query shapes seen so far (opt-in: adds a $sample
+            # and a system.profile read)
+            if (filters or {}).get("advise_indexes"):
+                advice = await self._analyze_mongodb_index_advice({"simulate": False})
+                performance_analysis["index_advice"] = advice
+                performance_analysis["recommendations"].extend(advice.get("recommendations", []))
+            
+            # Evidence-based recommendations from query plans and index usage
+            if (filters or {}).get("profile"):
+                profiling = await self._analyze_mongodb_profiling(filters)
+                performance_analysis["profiling"] = profiling
+                performance_analysis["recommendations"].extend(profiling.get("recommendations", []))
+            
             return performance_analysis
             
+        except ABORTING_ERRORS:
+            raise
         except Exception as e:
             logger.error(f"MongoDB performance analysis failed: {str(e)}")
             return {"error": str(e)}
@@ -363,7 +472,7 @@ class DatabaseAnalyzer:
         """Analyze MongoDB business insights (hotel management focus)"""
         try:
             connector = await self.db_connector.get_client()
-            database = connector.database
+            database = connector.analytics_database
             
             insights = {
                 "hotel_insights": {},
@@ -373,9 +482,7 @@ class DatabaseAnalyzer:
                 "recommendations": []
             }
             
-            collections = await asyncio.get_event_loop().run_in_executor(
-                None, database.list_collection_names
-            )
+            collections = await self._run("list_collection_names", database.list_collection_names)
             
             # Analyze hotels collection
             if "hotels" in collections:
@@ -385,9 +492,8 @@ class DatabaseAnalyzer:
                 pipeline = [
                     {"$group": {"_id": None, "avg_rating": {"$avg": "$rating"}, "count": {"$sum": 1}}}
                 ]
-                rating_stats = await asyncio.get_event_loop().run_in_executor(
-                    None, lambda: list(hotels_collection.aggregate(pipeline))
-                )
+                self._record_query(database, "hotels", "aggregate", pipeline=pipeline)
+                rating_stats = await self._run("aggregate", lambda: self._aggregate(hotels_collection, connector, pipeline))
                 
                 if rating_stats:
                     insights["hotel_insights"]["average_rating"] = rating_stats[0].get("avg_rating", 0)
@@ -397,9 +503,8 @@ class DatabaseAnalyzer:
                 pipeline = [
                     {"$group": {"_id": None, "min_price": {"$min": "$price"}, "max_price": {"$max": "$price"}, "avg_price": {"$avg": "$price"}}}
                 ]
-                price_stats = await asyncio.get_event_loop().run_in_executor(
-                    None, lambda: list(hotels_collection.aggregate(pipeline))
-                )
+                self._record_query(database, "hotels", "aggregate", pipeline=pipeline)
+                price_stats = await self._run("aggregate", lambda: self._aggregate(hotels_collection, connector, pipeline))
                 
                 if price_stats:
                     insights["hotel_insights"]["price_range"] = {
@@ -416,22 +521,21 @@ class DatabaseAnalyzer:
                 pipeline = [
                     {"$group": {"_id": "$status", "count": {"$sum": 1}}}
                 ]
-                booking_status = await asyncio.get_event_loop().run_in_executor(
-                    None, lambda: list(bookings_collection.aggregate(pipeline))
-                )
+                self._record_query(database, "bookings", "aggregate", pipeline=pipeline)
+                booking_status = await self._run("aggregate", lambda: self._aggregate(bookings_collection, connector, pipeline))
                 
                 insights["booking_insights"]["status_distribution"] = {
                     status["_id"]: status["count"] for status in booking_status
                 }
                 
-                # Revenue analysis
+                # Revenue analysis (seeded data names the amount totalAmount, like the sampled analysis accepts)
+                amount = {"$ifNull": ["$total_amount", "$totalAmount"]}
                 pipeline = [
                     {"$match": {"status": "confirmed"}},
-                    {"$group": {"_id": None, "total_revenue": {"$sum": "$total_amount"}, "avg_amount": {"$avg": "$total_amount"}}}
+                    {"$group": {"_id": None, "total_revenue": {"$sum": amount}, "avg_amount": {"$avg": amount}}}
                 ]
-                revenue_stats = await asyncio.get_event_loop().run_in_executor(
-                    None, lambda: list(bookings_collection.aggregate(pipeline))
-                )
+                self._record_query(database, "bookings", "aggregate", pipeline=pipeline)
+                revenue_stats = await self._run("aggregate", lambda: self._aggregate(bookings_collection, connector, pipeline))
                 
                 if revenue_stats:
                     insights["revenue_insights"]["total_revenue"] = revenue_stats[0].get("total_revenue", 0)
@@ -450,71 +554,494 @@ class DatabaseAnalyzer:
             
             return insights
             
+        except ABORTING_ERRORS:
+            raise
         except Exception as e:
             logger.error(f"MongoDB business insights analysis failed: {str(e)}")
             return {"error": str(e)}
     
+    async def _analyze_mongodb_profiling(self, filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Profile MongoDB: system.profile, $currentOp, $indexStats and explain() of logged queries"""
+        try:
+            filters = filters or {}
+            connector = await self.db_connector.get_client()
+            database = connector.database
+            
+            profiling = {
+                "profiler": {},
+                "slow_operations": [],
+                "current_operations": [],
+                "index_usage": {},
+                "query_plans": [],
+                "summary": {},
+                "recommendations": [],
+                "errors": []
+            }
+            
+            # Profiler level 1 records operations slower than slow_ms into system.profile
+            try:
+                if filters.get("enable_profiler"):
+                    await self._run("profile", lambda: database.command("profile", 1, slowms=int(filters.get("slow_ms", 100))))
+                status = await self._run("profile", lambda: database.command("profile", -1))
+                profiling["profiler"] = {"level": status.get("was", 0), "slow_ms": status.get("slowms")}
+                if profiling["profiler"]["level"] > 0:
+                    profiling["slow_operations"] = await self._run(
+                        "system_profile", query_profiler.read_system_profile, database, int(filters.get("profile_limit", 100))
+                    )
+            except ABORTING_ERRORS:
+                raise
+            except Exception as e:
+                profiling["errors"].append(f"system.profile: {str(e)}")
+            
+            try:
+                profiling["current_operations"] = await self._run(
+                    "currentOp", query_profiler.read_current_ops, connector.client, int(filters.get("min_op_seconds", 1))
+                )
+            except ABORTING_ERRORS:
+                raise
+            except Exception as e:
+                profiling["errors"].append(f"$currentOp: {str(e)}")
+            
+            collections = await self._run("list_collection_names", database.list_collection_names)
+            for collection_name in collections:
+                if collection_name.startswith("system."):
+                    continue
+                try:
+                    stats = await self._run("indexStats", query_profiler.read_index_stats, database[collection_name])
+                except ABORTING_ERRORS:
+                    raise
+                except Exception as e:
+                    profiling["errors"].append(f"$indexStats on {collection_name}: {str(e)}")
+                    continue
+                total_ops = sum(stat["ops"] for stat in stats)
+                for stat in stats:
+                    stat["hit_share"] = round(stat["ops"] / total_ops, 4) if total_ops else 0.0
+                profiling["index_usage"][collection_name] = {
+                    "indexes": stats,
+                    "total_ops": total_ops,
+                    "unused": [stat["name"] for stat in stats if stat["ops"] == 0 and stat["name"] != "_id_"]
+                }
+            
+            # Explain the query shapes the analyzer (and chat, through it) has issued. executionStats
+            # runs each query, so this goes to the analytics node; the profiler, $currentOp and
+            # $indexStats above describe the primary's own workload and stay there.
+            max_explain = int(filters.get("max_explain", 50))
+            for query in query_profiler.query_log.queries(database.name)[-max_explain:]:
+                entry = {"query": query}
+                try:
+                    explain = await self._run("explain", query_profiler.explain_query, connector.analytics_database, query)
+                    entry["plan"] = query_profiler.summarize_explain(explain)
+                except ABORTING_ERRORS:
+                    raise
+                except Exception as e:
+                    entry["error"] = str(e)
+                profiling["query_plans"].append(entry)
+            
+            plans = [entry["plan"] for entry in profiling["query_plans"] if "plan" in entry]
+            indexed = [plan for plan in plans if plan["indexes_used"]]
+            profiling["summary"] = {
+                "queries_explained": len(plans),
+                "collscans": sum(1 for plan in plans if plan["collscan"]),
+                "index_hit_ratio": round(len(indexed) / len(plans), 4) if plans else None,
+                "max_examined_to_returned": max((plan["examined_to_returned"] for plan in plans), default=None),
+                "slow_operations": len(profiling["slow_operations"]),
+                "unused_indexes": sum(len(usage["unused"]) for usage in profiling["index_usage"].values())
+            }
+            profiling["recommendations"] = query_profiler.build_recommendations(
+                profiling["query_plans"], profiling["slow_operations"],
+                {name: usage["indexes"] for name, usage in profiling["index_usage"].items()}
+            )
+            if profiling["profiler"].get("level") == 0:
+                profiling["recommendations"].append(
+                    "The profiler is off; re-run with {\"enable_profiler\": true} to capture slow operations"
+                )
+            
+            return profiling
+            
+        except ABORTING_ERRORS:
+            raise
+        except Exception as e:
+            logger.error(f"MongoDB profiling failed: {str(e)}")
+            return {"error": str(e)}
+    
+    async def _analyze_mongodb_index_advice(self, filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Cluster logged and profiled query shapes into ESR-ordered index suggestions"""
+        try:
+            filters = filters or {}
+            connector = await self.db_connector.get_client()
+            database = connector.database
+            advisor = IndexAdvisor(
+                sample_size=int(filters.get("sample_size", Config.MAX_SAMPLE_SIZE)),
+                max_suggestions=int(filters.get("max_suggestions", 20))
+            )
+            
+            profiled = []
+            if filters.get("include_profiler", True):
+                try:
+                    profiled = await self._run(
+                        "system_profile", query_profiler.read_system_profile, database, int(filters.get("profile_limit", 500))
+                    )
+                except ABORTING_ERRORS:
+                    raise
+                except Exception as e:
+                    logger.info(f"system.profile unavailable for index advice: {str(e)}")
+            
+            scratch_client = None
+            scratch_database = None
+            if filters.get("simulate"):
+                scratch_uri = filters.get("scratch_uri") or Config.INDEX_ADVISOR_SCRATCH_URI
+                # Simulation copies samples and builds indexes; never do that on the analyzed server
+                if not scratch_uri:
+                    raise ValueError("Index simulation needs a scratch server: set INDEX_ADVISOR_SCRATCH_URI "
+                                     "or pass scratch_uri")
+                scratch_client = load_driver("pymongo").MongoClient(scratch_uri)
+                scratch_database = scratch_client[f"{database.name}_index_advisor"]
+            try:
+                # Cardinality samples and index listings are read from the analytics node
+                return await self._run(
+                    "index_advice", lambda: advisor.advise(connector.analytics_database, profiled,
+                                                           bool(filters.get("simulate")), scratch_database)
+                )
+            finally:
+                if scratch_client:
+                    scratch_client.close()
+            
+        except ABORTING_ERRORS:
+            raise
+        except Exception as e:
+            logger.error(f"MongoDB index advice failed: {str(e)}")
+            return {"error": str(e)}
+    
     # Helper methods
-    def _analyze_document_fields(self, documents: List[Dict]) -> Dict[str, List[str]]:
-        """Analyze field types in documents"""
-        field_types = {}
-        
-        for doc in documents:
-            for field, value in doc.items():
-                if field not in field_types:
-                    field_types[field] = []
-                
-                value_type = type(value).__name__
-                if value_type not in field_types[field]:
-                    field_types[field].append(value_type)
+    def _strategy(self, analysis: str):
+        """Pick the implementation of an analysis for the connected backend.
         
-        return field_types
+        A backend-specific method (_analyze_<db_type>_<analysis>) is used when one exists;
+        otherwise the sampled strategy runs on the connector's generic data access, using
+        server-side aggregation and counts where the connector's capabilities allow."""
+        db_type = self.db_connector.get_connection_info().get("type")
+        specific = getattr(self, f"_analyze_{db_type}_{analysis}", None)
+        if specific is not None:
+            return specific
+        sampled = getattr(self, f"_analyze_sampled_{analysis}", None)
+        if sampled is None:
+            raise ValueError(f"{analysis} analysis not implemented for {db_type}")
+        return sampled
     
-    # Placeholder methods for other database types
-    async def _analyze_redis_schema(self, filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        """Analyze Redis schema"""
-        return {"message": "Redis schema analysis not yet implemented"}
+    def _mongodb_collection_stats(self, database, collection_name: str) -> Dict[str, Any]:
+        """collStats for a collection (Collection.stats() was removed in PyMongo 4)"""
+        try:
+            return self._mongodb_command(database, "collStats", collection_name)
+        except ABORTING_ERRORS:
+            raise
+        except Exception as e:
+            logger.warning(f"collStats unavailable for {collection_name}: {str(e)}")
+            return {"count": database[collection_name].estimated_document_count(
+                **query_governor.current_budget().count_options())}
     
-    async def _analyze_redis_data_quality(self, filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        """Analyze Redis data quality"""
-        return {"message": "Redis data quality analysis not yet implemented"}
+    def _mongodb_command(self, database, *args, **kwargs) -> Dict[str, Any]:
+        """Database.command on the handle's read preference (commands otherwise always go to the primary),
+        limited by the query budget"""
+        return database.command(*args, read_preference=database.read_preference,
+                                **query_governor.current_budget().command_options(), **kwargs)
     
-    async def _analyze_redis_performance(self, filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        """Analyze Redis performance"""
-        return {"message": "Redis performance analysis not yet implemented"}
+    def _aggregate(self, collection, connector, pipeline: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Run an analysis aggregation under the query budget, with the scan cap and allowDiskUse (blocking)"""
+        return query_governor.aggregate(collection, pipeline, **connector.aggregate_options)
     
-    async def _analyze_redis_business_insights(self, filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        """Analyze Redis business insights"""
-        return {"message": "Redis business insights analysis not yet implemented"}
+    async def _kill_operations(self, budget: query_governor.QueryBudget):
+        """Kill the server-side operations of a cancelled or timed-out analysis (best effort)"""
+        if not budget.comment:
+            return
+        try:
+            connector = await self.db_connector.get_client()
+            killed = await connector.kill_operations(budget.comment)
+            if killed:
+                logger.info(f"Killed {killed} server-side operation(s) tagged {budget.comment}")
+        except ABORTING_ERRORS:
+            raise
+        except Exception as e:
+            logger.warning(f"Could not kill operations tagged {budget.comment}: {str(e)}")
     
-    async def _analyze_cassandra_schema(self, filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        """Analyze Cassandra schema"""
-        return {"message": "Cassandra schema analysis not yet implemented"}
+    def _record_query(self, database, collection_name: str, kind: str, **query):
+        """Remember a query shape so profiling can explain() it later"""
+        query_profiler.query_log.record(database.name, collection_name, kind, **query)
     
-    async def _analyze_cassandra_data_quality(self, filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        """Analyze Cassandra data quality"""
-        return {"message": "Cassandra data quality analysis not yet implemented"}
+    async def _run(self, operation: str, func, *args):
+        """Run a blocking driver call in the executor, recorded as a database span"""
+        backend = self.db_connector.get_connection_info().get("type", "unknown")
+        # Do not start another query once the request's time budget is spent
+        query_governor.current_budget().remaining_seconds()
+        return await instrumentation.run_in_executor(backend, operation, func, *args)
     
-    async def _analyze_cassandra_performance(self, filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        """Analyze Cassandra performance"""
-        return {"message": "Cassandra performance analysis not yet implemented"}
+    async def _field_summary(self, connector, collection: str, records: List[Dict], field: str,
+                             numeric: bool = False, where: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Value counts or numeric stats for a field over the records matching where (field equality):
+        on the server when the backend aggregates natively, otherwise estimated from the sampled records.
+        estimated_from_sample is the number of records sampled, before where is applied."""
+        if connector.capabilities.get("native_aggregation"):
+            return await connector.aggregate_field(collection, field, numeric, where)
+        matching = [record for record in records
+                    if all(record.get(key) == value for key, value in (where or {}).items())]
+        values = [record.get(field) for record in matching if record.get(field) is not None]
+        if numeric:
+            numbers = [value for value in values if isinstance(value, (int, float)) and not isinstance(value, bool)]
+            if not numbers:
+                return {}
+            return {
+                "min": min(numbers),
+                "max": max(numbers),
+                "avg": sum(numbers) / len(numbers),
+                "sum": sum(numbers),
+                "count": len(numbers),
+                "estimated_from_sample": len(records)
+            }
+        counts = Counter(str(value) for value in values)
+        return {"values": dict(counts.most_common(50)), "estimated_from_sample": len(records)}
     
-    async def _analyze_cassandra_business_insights(self, filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        """Analyze Cassandra business insights"""
-        return {"message": "Cassandra business insights analysis not yet implemented"}
+    async def _find_collection(self, connector, collections: List[str], name_hint: str, sample_size: int,
+                               fields: List[str]) -> Optional[tuple]:
+        """First collection named like name_hint whose sample has one of fields; (name, records, field)"""
+        for collection in collections:
+            if name_hint not in collection.lower():
+                continue
+            records = await connector.sample_records(collection, sample_size)
+            for field in fields:
+                if any(field in record for record in records):
+                    return collection, records, field
+        return None
     
-    async def _analyze_elasticsearch_schema(self, filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        """Analyze Elasticsearch schema"""
-        return {"message": "Elasticsearch schema analysis not yet implemented"}
+    # Sampled strategies for backends without a specialised implementation
+    async def _analyze_sampled_schema(self, filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Infer the schema from sampled records of each collection"""
+        try:
+            filters = filters or {}
+            sample_size = int(filters.get("sample_size", 10))
+            connector = await self.db_connector.get_client()
+            connection_info = self.db_connector.get_connection_info()
+            
+            collections = await connector.list_collections()
+            schema_analysis = {
+                "database_name": connection_info.get("database_name") or connection_info.get("keyspace")
+                or connection_info.get("connection_string"),
+                "collections": {},
+                "total_collections": len(collections),
+                "total_documents": 0,
+                "sampling": connector.capabilities.get("sampling")
+            }
+            
+            for collection_name in collections:
+                sample_docs = await connector.sample_records(collection_name, sample_size)
+                document_count = await connector.count_records(collection_name)
+                
+                schema_analysis["collections"][collection_name] = {
+                    "document_count": document_count,
+                    "sampled_documents": len(sample_docs),
+                    "field_types": await analysis_workers.run_cpu(analysis_workers.infer_field_types, sample_docs)
+                }
+                
+                if filters.get("include_samples"):
+                    schema_analysis["collections"][collection_name]["sample_documents"] = [
+                        truncate_document(doc, max_string=int(filters.get("max_string_length", 200)))
+                        for doc in sample_docs[:int(filters.get("max_samples", 3))]
+                    ]
+                
+                schema_analysis["total_documents"] += document_count or 0
+            
+            return schema_analysis
+            
+        except ABORTING_ERRORS:
+            raise
+        except Exception as e:
+            logger.error(f"Sampled schema analysis failed: {str(e)}")
+            return {"error": str(e)}
     
-    async def _analyze_elasticsearch_data_quality(self, filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        """Analyze Elasticsearch data quality"""
-        return {"message": "Elasticsearch data quality analysis not yet implemented"}
+    async def _analyze_sampled_data_quality(self, filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Estimate completeness and duplication from sampled records"""
+        try:
+            filters = filters or {}
+            sample_size = int(filters.get("sample_size", 100))
+            connector = await self.db_connector.get_client()
+            
+            quality_analysis = {
+                "collections": {},
+                "overall_score": 0,
+                "issues": [],
+                "sampling": connector.capabilities.get("sampling")
+            }
+            
+            total_score = 0
+            collection_count = 0
+            
+            for collection_name in await connector.list_collections():
+                records = await connector.sample_records(collection_name, sample_size)
+                if not records:
+                    continue
+                
+                profile = await analysis_workers.run_cpu(analysis_workers.profile_records, records)
+                null_count = profile["null_count"]
+                missing_fields = profile["missing_fields"]
+                duplicates = profile["duplicates"]
+                
+                quality_score = max(0, 100 - (null_count / len(records)) * 100 - len(missing_fields) * 10
+                                    - (duplicates / len(records)) * 100)
+                
+                quality_analysis["collections"][collection_name] = {
+                    "sampled_documents": len(records),
+                    "null_values": null_count,
+                    "missing_fields": missing_fields,
+                    "duplicates": duplicates,
+                    "quality_score": quality_score,
+                    "issues": []
+                }
+                
+                issues = quality_analysis["collections"][collection_name]["issues"]
+                if null_count > 0:
+                    issues.append(f"Found {null_count} of {len(records)} sampled records with null/empty values")
+                if missing_fields:
+                    issues.append(f"Fields missing from some records: {missing_fields}")
+                if duplicates > 0:
+                    issues.append(f"Found {duplicates} duplicate records in the sample")
+                
+                total_score += quality_score
+                collection_count += 1
+            
+            if collection_count > 0:
+                quality_analysis["overall_score"] = total_score / collection_count
+            
+            return quality_analysis
+            
+        except ABORTING_ERRORS:
+            raise
+        except Exception as e:
+            logger.error(f"Sampled data quality analysis failed: {str(e)}")
+            return {"error": str(e)}
     
-    async def _analyze_elasticsearch_performance(self, filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        """Analyze Elasticsearch performance"""
-        return {"message": "Elasticsearch performance analysis not yet implemented"}
+    async def _analyze_sampled_performance(self, filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Server health figures plus per-collection counts where the backend counts cheaply"""
+        try:
+            connector = await self.db_connector.get_client()
+            capabilities = connector.capabilities
+            
+            try:
+                server_stats = await connector.server_stats()
+            except ABORTING_ERRORS:
+                raise
+            except Exception as e:
+                logger.warning(f"Server stats unavailable: {str(e)}")
+                server_stats = {"error": str(e)}
+            
+            performance_analysis = {
+                "server_stats": server_stats,
+                "collections": {},
+                "capabilities": dict(capabilities),
+                "recommendations": []
+            }
+            
+            collections = await connector.list_collections()
+            for collection_name in collections:
+                # Counting without exact_count means a full scan; skip it here
+                performance_analysis["collections"][collection_name] = {
+                    "document_count": await connector.count_records(collection_name)
+                    if capabilities.get("exact_count") else None
+                }
+            
+            stats = performance_analysis["server_stats"]
+            recommendations = performance_analysis["recommendations"]
+            if stats.get("keyspace_hit_ratio") is not None and stats["keyspace_hit_ratio"] < 0.8:
+                recommendations.append(
+                    f"Keyspace hit ratio is {stats['keyspace_hit_ratio']:.0%}; review key expiry and cache-aside lookups"
+                )
+            if stats.get("evicted_keys"):
+                recommendations.append(
+                    f"{stats['evicted_keys']} keys were evicted; raise maxmemory or tighten TTLs"
+                )
+            if stats.get("status") in ("yellow", "red"):
+                recommendations.append(
+                    f"Cluster status is {stats['status']} with {stats.get('unassigned_shards', 0)} unassigned shards"
+                )
+            if not capabilities.get("native_aggregation"):
+                recommendations.append(
+                    "This backend has no server-side aggregation; business insights are estimated from samples"
+                )
+            
+            return performance_analysis
+            
+        except ABORTING_ERRORS:
+            raise
+        except Exception as e:
+            logger.error(f"Sampled performance analysis failed: {str(e)}")
+            return {"error": str(e)}
     
-    async def _analyze_elasticsearch_business_insights(self, filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        """Analyze Elasticsearch business insights"""
-        return {"message": "Elasticsearch business insights analysis not yet implemented"} 
\ No newline at end of file
+    async def _analyze_sampled_business_insights(self, filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Hotel business insights from server-side aggregation when available, else from samples"""
+        try:
+            filters = filters or {}
+            sample_size = int(filters.get("sample_size", Config.MAX_SAMPLE_SIZE))
+            connector = await self.db_connector.get_client()
+            
+            insights = {
+                "hotel_insights": {},
+                "booking_insights": {},
+                "customer_insights": {},
+                "revenue_insights": {},
+                "recommendations": []
+            }
+            
+            collections = await connector.list_collections()
+            
+            hotels = await self._find_collection(connector, collections, "hotel", sample_size, ["rating"])
+            if hotels:
+                collection_name, records, field = hotels
+                rating = await self._field_summary(connector, collection_name, records, field, numeric=True)
+                if rating:
+                    insights["hotel_insights"]["average_rating"] = rating.get("avg", 0)
+                    insights["hotel_insights"]["total_hotels"] = rating.get("count", 0)
+                price = next((f for f in ("price", "basePrice", "pricePerNight") if any(f in r for r in records)), None)
+                if price:
+                    price_stats = await self._field_summary(connector, collection_name, records, price, numeric=True)
+                    insights["hotel_insights"]["price_range"] = {
+                        "min": price_stats.get("min", 0),
+                        "max": price_stats.get("max", 0),
+                        "average": price_stats.get("avg", 0)
+                    }
+            
+            bookings = await self._find_collection(connector, collections, "booking", sample_size, ["status"])
+            if bookings:
+                collection_name, records, field = bookings
+                status = await self._field_summary(connector, collection_name, records, field)
+                insights["booking_insights"]["status_distribution"] = status.get("values", {})
+                amount = next((f for f in ("total_amount", "totalAmount") if any(f in r for r in records)), None)
+                if amount:
+                    # Only confirmed bookings earn revenue, as in the MongoDB analysis
+                    revenue = await self._field_summary(connector, collection_name, records, amount, numeric=True,
+                                                        where={field: "confirmed"})
+                    insights["revenue_insights"]["total_revenue"] = revenue.get("sum", 0)
+                    insights["revenue_insights"]["average_booking_amount"] = revenue.get("avg", 0)
+                    if "estimated_from_sample" in revenue:
+                        # Scale the confirmed revenue per sampled booking up to the whole collection
+                        # when it can be counted
+                        total = await connector.count_records(collection_name)
+                        if total:
+                            insights["revenue_insights"]["total_revenue"] = (
+                                revenue["sum"] / revenue["estimated_from_sample"] * total
+                            )
+                        insights["revenue_insights"]["estimated_from_sample"] = revenue["estimated_from_sample"]
+            
+            if insights["hotel_insights"].get("average_rating", 0) < 4.0:
+                insights["recommendations"].append(
+                    "Consider improving hotel ratings through better service and amenities"
+                )
+            
+            if insights["booking_insights"].get("status_distribution", {}).get("cancelled", 0) > 0:
+                insights["recommendations"].append(
+                    "High cancellation rate detected. Review booking policies and customer service"
+                )
+            
+            return insights
+            
+        except ABORTING_ERRORS:
+            raise
+        except Exception as e:
+            logger.error(f"Sampled business insights analysis failed: {str(e)}")
+            return {"error": str(e)}
@@ -1,43 +1,298 @@
 import asyncio
+import functools
+import importlib
+import importlib.util
 import json
-from typing import Dict, Any, Optional, Union
+import queue
+import threading
+import uuid
+from typing import AsyncIterator, Dict, List, Any, Optional, Union
 import logging
 from abc import ABC, abstractmethod
 
-# Database drivers
-try:
-    import pymongo
-    from pymongo import MongoClient
-    MONGODB_AVAILABLE = True
-except ImportError:
-    MONGODB_AVAILABLE = False
+import executors
+import instrumentation
+import query_governor
+import query_profiler
+from config import Config
 
-try:
-    import redis
-    import redis.asyncio as redis_async
-    REDIS_AVAILABLE = True
-except ImportError:
-    REDIS_AVAILABLE = False
+# Database drivers are imported on first use, so the API (and each worker restart)
+# only pays for the client library of the database it actually connects to
+def _driver_installed(module: str) -> bool:
+    try:
+        return importlib.util.find_spec(module) is not None
+    except (ImportError, ValueError):
+        return False
 
-try:
-    from cassandra.cluster import Cluster
-    from cassandra.auth import PlainTextAuthProvider
-    CASSANDRA_AVAILABLE = True
-except ImportError:
-    CASSANDRA_AVAILABLE = False
+MONGODB_AVAILABLE = _driver_installed("pymongo")
+REDIS_AVAILABLE = _driver_installed("redis")
+CASSANDRA_AVAILABLE = _driver_installed("cassandra")
+ELASTICSEARCH_AVAILABLE = _driver_installed("elasticsearch")
 
-try:
-    from elasticsearch import AsyncElasticsearch
-    ELASTICSEARCH_AVAILABLE = True
-except ImportError:
-    ELASTICSEARCH_AVAILABLE = False
+@functools.lru_cache(maxsize=None)
+def load_driver(module: str):
+    """Import a driver module the first time a connector needs it"""
+    return importlib.import_module(module)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# db_type -> connector class, filled by @register_connector
+CONNECTOR_REGISTRY: Dict[str, type] = {}
+
+def register_connector(cls):
+    """Class decorator that makes a connector available under its db_type"""
+    CONNECTOR_REGISTRY[cls.db_type] = cls
+    return cls
+
+def get_connector_class(db_type: str):
+    """Look up the connector registered for a database type"""
+    connector_class = CONNECTOR_REGISTRY.get((db_type or "").lower())
+    if connector_class is None:
+        raise ValueError(f"Unsupported database type: {db_type}")
+    return connector_class
+
+def available_backends() -> Dict[str, Any]:
+    """Registered backends with their capabilities and whether their driver is installed"""
+    return {
+        db_type: {
+            "driver": connector_class.driver_module,
+            "installed": _driver_installed(connector_class.driver_module),
+            "capabilities": dict(connector_class.capabilities)
+        }
+        for db_type, connector_class in CONNECTOR_REGISTRY.items()
+    }
+
+class PoolStats:
+    """Connection pool counters fed by driver pool events (thread-safe)"""
+    
+    def __init__(self, backend: str):
+        self.backend = backend
+        self.open = 0
+        self.in_use = 0
+        self.waiting = 0
+        self.max_in_use = 0
+        self.created = 0
+        self.checkouts = 0
+        self.checkout_failures = 0
+        self.wait_seconds = 0.0
+        self._lock = threading.Lock()
+    
+    def connection_created(self):
+        with self._lock:
+            self.open += 1
+            self.created += 1
+    
+    def connection_closed(self):
+        with self._lock:
+            self.open = max(0, self.open - 1)
+    
+    def checkout_started(self):
+        with self._lock:
+            self.waiting += 1
+    
+    def checked_out(self, wait_seconds: Optional[float]):
+        with self._lock:
+            self.waiting = max(0, self.waiting - 1)
+            self.in_use += 1
+            self.max_in_use = max(self.max_in_use, self.in_use)
+            self.checkouts += 1
+            self.wait_seconds += wait_seconds or 0.0
+        if wait_seconds is not None:
+            instrumentation.POOL_CHECKOUT_WAIT_SECONDS.observe(wait_seconds, backend=self.backend)
+    
+    def checkout_failed(self):
+        with self._lock:
+            self.waiting = max(0, self.waiting - 1)
+            self.checkout_failures += 1
+    
+    def checked_in(self):
+        with self._lock:
+            self.in_use = max(0, self.in_use - 1)
+    
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "open": self.open,
+                "in_use": self.in_use,
+                "idle": max(0, self.open - self.in_use),
+                "waiting": self.waiting,
+                "max_in_use": self.max_in_use,
+                "created": self.created,
+                "checkouts": self.checkouts,
+                "checkout_failures": self.checkout_failures,
+                "avg_checkout_wait_ms": round(self.wait_seconds / self.checkouts * 1000, 3) if self.checkouts else None
+            }
+
+@functools.lru_cache(maxsize=None)
+def _mongo_pool_listener_class():
+    """ConnectionPoolListener subclass, built once pymongo is loaded"""
+    monitoring = load_driver("pymongo.monitoring")
+    
+    class MongoPoolListener(monitoring.ConnectionPoolListener):
+        def __init__(self, stats: PoolStats):
+            self.stats = stats
+        
+        # Pool lifecycle events carry nothing we report
+        def pool_created(self, event):
+            pass
+        
+        def pool_ready(self, event):
+            pass
+        
+        def pool_cleared(self, event):
+            pass
+        
+        def pool_closed(self, event):
+            pass
+        
+        def connection_ready(self, event):
+            pass
+        
+        def connection_created(self, event):
+            self.stats.connection_created()
+        
+        def connection_closed(self, event):
+            self.stats.connection_closed()
+        
+        def connection_check_out_started(self, event):
+            self.stats.checkout_started()
+        
+        def connection_check_out_failed(self, event):
+            self.stats.checkout_failed()
+        
+        def connection_checked_out(self, event):
+            self.stats.checked_out(getattr(event, "duration", None))
+        
+        def connection_checked_in(self, event):
+            self.stats.checked_in()
+    
+    return MongoPoolListener
+
+_STREAM_DONE = object()
+
+async def stream_blocking_batches(backend: str, open_cursor, batch_size: int,
+                                  max_results: int) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Iterate a blocking driver cursor on an executor thread and yield lists of records.
+    
+    The thread fills a bounded buffer and blocks while it is full, so a slow consumer holds
+    the cursor back instead of results piling up in memory. Closing the iterator (e.g. when
+    the client disconnects) stops the thread and closes the cursor."""
+    loop = asyncio.get_running_loop()
+    buffer = queue.Queue(maxsize=max(Config.QUERY_BUFFER_BATCHES, 1))
+    ready = asyncio.Event()
+    stop = threading.Event()
+    
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+            except queue.Full:
+                continue
+            loop.call_soon_threadsafe(ready.set)
+            return True
+        return False
+    
+    def produce():
+        cursor = None
+        try:
+            cursor = open_cursor()
+            batch = []
+            count = 0
+            for record in cursor:
+                batch.append(record)
+                count += 1
+                if len(batch) >= batch_size or count >= max_results:
+                    if not put(batch):
+                        return
+                    batch = []
+                if count >= max_results:
+                    break
+            if batch and not put(batch):
+                return
+            put(_STREAM_DONE)
+        except Exception as e:
+            put(e)
+        finally:
+            close = getattr(cursor, "close", None)
+            if close:
+                close()
+    
+    def wake(task):
+        if not task.cancelled() and task.exception():
+            logger.error(f"{backend} query stream failed: {str(task.exception())}")
+        ready.set()
+    
+    # Not the backend's executor: a few slow readers would otherwise starve analyses of threads
+    producer = asyncio.ensure_future(instrumentation.run_in_executor(
+        backend, "query_stream", produce, executor=executors.stream_executor_for(backend)
+    ))
+    producer.add_done_callback(wake)
+    try:
+        while True:
+            try:
+                item = buffer.get_nowait()
+            except queue.Empty:
+                ready.clear()
+                if buffer.empty():
+                    if producer.done():
+                        producer.result()
+                        return
+                    await ready.wait()
+                continue
+            if item is _STREAM_DONE:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+
 class BaseConnector(ABC):
     """Abstract base class for database connectors"""
     
+    db_type = ""
+    driver_module = ""
+    # Key of connection_info that lists the collections/tables/indices
+    collections_field = "collections"
+    # What the backend does server-side; the analyzer picks its execution strategy from these.
+    #   native_aggregation: group/sum/avg run on the server
+    #   sampling: "server" (random sample on the server), "scan" (cursor walk) or "limit" (first rows)
+    #   async_driver: driver calls are awaitable instead of running in the executor
+    #   streaming_cursor: results can be consumed in batches
+    #   exact_count: cheap exact per-collection counts
+    #   query_profiling / index_advice: query plans and index suggestions are available
+    #   read_routing: analysis reads can go to secondaries or a separate analytics connection
+    capabilities: Dict[str, Any] = {
+        "native_aggregation": False,
+        "sampling": "limit",
+        "async_driver": False,
+        "streaming_cursor": False,
+        "exact_count": False,
+        "query_profiling": False,
+        "index_advice": False,
+        "read_routing": False
+    }
+    
+    @classmethod
+    def connect_arguments(cls, database_name: Optional[str] = None, keyspace: Optional[str] = None,
+                          username: Optional[str] = None, password: Optional[str] = None) -> Dict[str, Any]:
+        """Map the generic /connect fields onto this connector's connect() arguments"""
+        return {"username": username, "password": password}
+    
+    @classmethod
+    def pool_options(cls, pool: Dict[str, Any]) -> Dict[str, Any]:
+        """Map generic pool settings (max_pool_size, connect_timeout_seconds, ...) onto driver options"""
+        return {}
+    
+    def pool_stats(self) -> Dict[str, Any]:
+        """Pool configuration and utilization; backends without pool counters report the settings only"""
+        return {
+            "backend": self.db_type,
+            "settings": getattr(self, "pool_settings", {}),
+            "driver_options": self.pool_options(getattr(self, "pool_settings", {}))
+        }
+    
     @abstractmethod
     async def connect(self, **kwargs) -> Dict[str, Any]:
         """Connect to the database"""
@@ -57,17 +312,182 @@ class BaseConnector(ABC):
     async def get_info(self) -> Dict[str, Any]:
         """Get database information"""
         pass
+    
+    # Generic data access used by the analyzer's sampled strategies
+    async def list_collections(self) -> List[str]:
+        """Names of the collections (tables, indices, key prefixes) to analyze"""
+        raise NotImplementedError
+    
+    async def sample_records(self, collection: str, size: int) -> List[Dict[str, Any]]:
+        """Up to size records of a collection, as dictionaries"""
+        raise NotImplementedError
+    
+    async def count_records(self, collection: str) -> Optional[int]:
+        """Record count, or None when counting would need a full scan"""
+        return None
+    
+    async def aggregate_field(self, collection: str, field: str, numeric: bool = False,
+                              where: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Server-side value counts, or min/max/avg/sum for numeric fields (native_aggregation only),
+        over the records whose fields equal the values in where"""
+        raise NotImplementedError
+    
+    async def server_stats(self) -> Dict[str, Any]:
+        """Backend health and load figures for performance analysis"""
+        return {}
+    
+    async def kill_operations(self, comment: str) -> int:
+        """Kill server-side operations tagged with comment; returns how many were killed"""
+        return 0
+    
+    async def execute_query(self, query: Dict[str, Any], batch_size: int, max_results: int,
+                            timeout_ms: int) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Run a read-only query, yielding result batches of at most batch_size records"""
+        raise NotImplementedError(f"Query execution not implemented for {self.db_type}")
+        yield []
+
+MONGO_WRITE_STAGES = ("$out", "$merge")
+
+def _pipeline_writes(pipeline: Any) -> bool:
+    """True if the pipeline or one of its sub-pipelines ($facet, $lookup, $unionWith) writes data"""
+    if not isinstance(pipeline, list):
+        raise ValueError("A pipeline must be a list of stages")
+    for step in pipeline:
+        if not isinstance(step, dict):
+            raise ValueError("Pipeline stages must be objects")
+        for stage, spec in step.items():
+            if stage in MONGO_WRITE_STAGES:
+                return True
+            if stage == "$facet" and isinstance(spec, dict):
+                if any(_pipeline_writes(sub_pipeline) for sub_pipeline in spec.values()):
+                    return True
+            elif stage in ("$lookup", "$unionWith") and isinstance(spec, dict) and "pipeline" in spec:
+                if _pipeline_writes(spec["pipeline"]):
+                    return True
+    return False
 
+@register_connector
 class MongoDBConnector(BaseConnector):
     """MongoDB connector"""
     
+    db_type = "mongodb"
+    driver_module = "pymongo"
+    capabilities = {
+        "native_aggregation": True,
+        "sampling": "server",
+        "async_driver": False,
+        "streaming_cursor": True,
+        "exact_count": True,
+        "query_profiling": True,
+        "index_advice": True,
+        "read_routing": True
+    }
+    
+    @classmethod
+    def connect_arguments(cls, database_name: Optional[str] = None, keyspace: Optional[str] = None,
+                          username: Optional[str] = None, password: Optional[str] = None) -> Dict[str, Any]:
+        return {"database_name": database_name, "username": username, "password": password}
+    
+    @classmethod
+    def pool_options(cls, pool: Dict[str, Any]) -> Dict[str, Any]:
+        options = {}
+        if pool.get("max_pool_size") is not None:
+            options["maxPoolSize"] = int(pool["max_pool_size"])
+        if pool.get("min_pool_size") is not None:
+            options["minPoolSize"] = int(pool["min_pool_size"])
+        if pool.get("max_idle_seconds") is not None:
+            options["maxIdleTimeMS"] = int(pool["max_idle_seconds"] * 1000)
+        if pool.get("connect_timeout_seconds") is not None:
+            options["connectTimeoutMS"] = int(pool["connect_timeout_seconds"] * 1000)
+        if pool.get("socket_timeout_seconds") is not None:
+            options["socketTimeoutMS"] = int(pool["socket_timeout_seconds"] * 1000)
+        if pool.get("read_preference"):
+            options["readPreference"] = pool["read_preference"]
+        compressors = [c for c in pool.get("compressors", []) if c in ("zstd", "snappy", "zlib")]
+        if compressors:
+            # zstd and snappy need their compression packages; pymongo skips (with a warning) unavailable ones
+            options["compressors"] = ",".join(compressors)
+        return options
+    
     def __init__(self):
         self.client = None
         self.database = None
+        self.analytics_client = None
+        self._analytics_database = None
+        self.analytics_settings = {}
         self.connection_info = {}
+        self.pool_settings = {}
+        self.pool_counters = PoolStats("mongodb")
+    
+    @property
+    def analytics_database(self):
+        """Database handle for analysis reads; the primary handle when no routing is configured"""
+        return self._analytics_database if self._analytics_database is not None else self.database
+    
+    @property
+    def aggregate_options(self) -> Dict[str, Any]:
+        """Options for analysis aggregations, so large $group/$sort stages may spill to disk"""
+        return {"allowDiskUse": True} if self.analytics_settings.get("allow_disk_use") else {}
+    
+    def _open_analytics(self, database_name: str, mongo_kwargs: Dict[str, Any]):
+        """Analytics client (for a separate ANALYTICS_URI) and database handle with the analytics read options"""
+        settings = self.analytics_settings
+        pymongo = load_driver("pymongo")
+        client = None
+        base_client = self.client
+        if settings.get("uri"):
+            # Same pool/timeout options, but the analytics read preference below instead of the main one
+            options = {key: value for key, value in mongo_kwargs.items() if key != "readPreference"}
+            client = pymongo.MongoClient(settings["uri"], **options)
+            base_client = client
+        
+        read_options = {}
+        mode = settings.get("read_preference")
+        if mode:
+            read_preferences = load_driver("pymongo.read_preferences")
+            modes = {
+                "primary": read_preferences.Primary,
+                "primaryPreferred": read_preferences.PrimaryPreferred,
+                "secondary": read_preferences.Secondary,
+                "secondaryPreferred": read_preferences.SecondaryPreferred,
+                "nearest": read_preferences.Nearest
+            }
+            if mode not in modes:
+                raise ValueError(f"Unknown read preference: {mode}")
+            if mode == "primary":
+                # Tags and staleness only apply to modes that may read from secondaries
+                read_options["read_preference"] = modes[mode]()
+            else:
+                max_staleness = settings.get("max_staleness_seconds")
+                read_options["read_preference"] = modes[mode](
+                    tag_sets=settings.get("tag_sets") or None,
+                    max_staleness=int(max_staleness) if max_staleness is not None else -1
+                )
+        if settings.get("read_concern"):
+            read_options["read_concern"] = load_driver("pymongo.read_concern").ReadConcern(settings["read_concern"])
+        
+        database = base_client[database_name]
+        if read_options:
+            database = database.with_options(**read_options)
+        return client, database
+    
+    def analytics_info(self) -> Dict[str, Any]:
+        """Where analysis reads go, without the analytics connection string"""
+        database = self.analytics_database
+        read_preference = getattr(database, "read_preference", None)
+        read_concern = getattr(database, "read_concern", None)
+        return {
+            "separate_connection": self.analytics_client is not None,
+            "read_preference": getattr(read_preference, "mongos_mode", None),
+            "tag_sets": getattr(read_preference, "tag_sets", None),
+            "max_staleness_seconds": getattr(read_preference, "max_staleness", None),
+            "read_concern": getattr(read_concern, "level", None),
+            "allow_disk_use": bool(self.aggregate_options)
+        }
     
     async def connect(self, connection_string: str, database_name: str, 
                      username: Optional[str] = None, password: Optional[str] = None,
+                     pool: Optional[Dict[str, Any]] = None, analytics: Optional[Dict[str, Any]] = None,
                      **kwargs) -> Dict[str, Any]:
         try:
             if not MONGODB_AVAILABLE:
@@ -75,14 +495,20 @@ class MongoDBConnector(BaseConnector):
             
             # Use the connection string as provided (it already includes auth if needed)
             # Handle SSL parameter separately
-            mongo_kwargs = {}
+            self.pool_settings = dict(pool or {})
+            mongo_kwargs = self.pool_options(self.pool_settings)
             if 'ssl' in kwargs:
                 mongo_kwargs['ssl'] = kwargs['ssl']
             if 'auth_source' in kwargs:
                 mongo_kwargs['authSource'] = kwargs['auth_source']
             
-            self.client = MongoClient(connection_string, **mongo_kwargs)
+            pymongo = load_driver("pymongo")
+            self.client = pymongo.MongoClient(connection_string,
+                                              event_listeners=[_mongo_pool_listener_class()(self.pool_counters)],
+                                              **mongo_kwargs)
             self.database = self.client[database_name]
+            self.analytics_settings = dict(analytics or {})
+            self.analytics_client, self._analytics_database = self._open_analytics(database_name, mongo_kwargs)
             
             # Test connection
             await self.test_connection()
@@ -92,7 +518,8 @@ class MongoDBConnector(BaseConnector):
                 "connection_string": connection_string,
                 "database_name": database_name,
                 "collections": await self.get_collections(),
-                "stats": await self.get_database_stats()
+                "stats": await self.get_database_stats(),
+                "analytics": self.analytics_info()
             }
             
             return self.connection_info
@@ -102,6 +529,10 @@ class MongoDBConnector(BaseConnector):
             raise
     
     async def disconnect(self):
+        if self.analytics_client:
+            self.analytics_client.close()
+            self.analytics_client = None
+        self._analytics_database = None
         if self.client:
             self.client.close()
             self.client = None
@@ -111,7 +542,8 @@ class MongoDBConnector(BaseConnector):
     async def test_connection(self) -> bool:
         try:
             # Ping the database
-            self.client.admin.command('ping')
+            await instrumentation.run_in_executor("mongodb", "ping", self.client.admin.command, 'ping',
+                                                  executor=executors.executor_for(executors.CONTROL))
             return True
         except Exception as e:
             logger.error(f"MongoDB connection test failed: {str(e)}")
@@ -123,8 +555,8 @@ class MongoDBConnector(BaseConnector):
     async def get_collections(self) -> list:
         """Get list of collections"""
         try:
-            return await asyncio.get_event_loop().run_in_executor(
-                None, lambda: self.database.list_collection_names()
+            return await instrumentation.run_in_executor(
+                "mongodb", "list_collection_names", self.database.list_collection_names
             )
         except Exception as e:
             logger.error(f"Failed to get collections: {str(e)}")
@@ -133,25 +565,232 @@ class MongoDBConnector(BaseConnector):
     async def get_database_stats(self) -> Dict[str, Any]:
         """Get database statistics"""
         try:
-            return await asyncio.get_event_loop().run_in_executor(
-                None, lambda: self.database.command("dbStats")
+            return await instrumentation.run_in_executor(
+                "mongodb", "dbStats", self.database.command, "dbStats"
             )
         except Exception as e:
             logger.error(f"Failed to get database stats: {str(e)}")
             return {}
+    
+    def pool_stats(self) -> Dict[str, Any]:
+        stats = super().pool_stats()
+        stats.update(self.pool_counters.snapshot())
+        # maxPoolSize applies per server; 100 is the pymongo default
+        max_size = stats["driver_options"].get("maxPoolSize", 100)
+        stats["max_pool_size"] = max_size
+        stats["utilization"] = round(stats["in_use"] / max_size, 4) if max_size else None
+        return stats
+    
+    async def list_collections(self) -> List[str]:
+        return await self.get_collections()
+    
+    async def sample_records(self, collection: str, size: int) -> List[Dict[str, Any]]:
+        return await instrumentation.run_in_executor(
+            "mongodb", "sample",
+            lambda: list(self.analytics_database[collection].aggregate(
+                [{"$sample": {"size": size}}], **query_governor.current_budget().aggregate_options(),
+                **self.aggregate_options))
+        )
+    
+    async def count_records(self, collection: str) -> Optional[int]:
+        return await instrumentation.run_in_executor(
+            "mongodb", "estimated_document_count",
+            lambda: self.analytics_database[collection].estimated_document_count(
+                **query_governor.current_budget().count_options())
+        )
+    
+    async def aggregate_field(self, collection: str, field: str, numeric: bool = False,
+                              where: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        match = [{"$match": where}] if where else []
+        if numeric:
+            pipeline = match + [{"$group": {"_id": None, "min": {"$min": f"${field}"}, "max": {"$max": f"${field}"},
+                                            "avg": {"$avg": f"${field}"}, "sum": {"$sum": f"${field}"},
+                                            "count": {"$sum": 1}}}]
+            result = await instrumentation.run_in_executor(
+                "mongodb", "aggregate",
+                lambda: self._aggregate_governed(collection, pipeline)
+            )
+            return {key: value for key, value in result[0].items() if key != "_id"} if result else {}
+        pipeline = match + [{"$group": {"_id": f"${field}", "count": {"$sum": 1}}}, {"$sort": {"count": -1}},
+                            {"$limit": 50}]
+        result = await instrumentation.run_in_executor(
+            "mongodb", "aggregate",
+            lambda: self._aggregate_governed(collection, pipeline)
+        )
+        return {"values": {str(group["_id"]): group["count"] for group in result}}
+    
+    def _aggregate_governed(self, collection: str, pipeline: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Analysis aggregation under the query budget: scan cap, maxTimeMS and comment (blocking)"""
+        return query_governor.aggregate(self.analytics_database[collection], pipeline, **self.aggregate_options)
+    
+    async def kill_operations(self, comment: str) -> int:
+        """killOp the tagged operations on the primary and, when analysis reads go elsewhere, on the
+        analytics node. Server selection may land on a different secondary than the one running the
+        query; maxTimeMS still bounds those."""
+        if not comment:
+            return 0
+        admins = [self.client.admin]
+        analytics = self.analytics_database
+        if analytics is not self.database:
+            admins.append(analytics.client.admin.with_options(read_preference=analytics.read_preference))
+        killed = 0
+        for admin in admins:
+            try:
+                killed += await instrumentation.run_in_executor(
+                    "mongodb", "killOp", query_governor.kill_tagged_operations, admin, comment,
+                    executor=executors.executor_for(executors.CONTROL)
+                )
+            except Exception as e:
+                logger.warning(f"Killing operations tagged {comment} failed: {str(e)}")
+        return killed
+    
+    async def execute_query(self, query: Dict[str, Any], batch_size: int, max_results: int,
+                            timeout_ms: int) -> AsyncIterator[List[Dict[str, Any]]]:
+        """find (filter/projection/sort/limit) or aggregate (pipeline) on one collection"""
+        collection_name = query.get("collection")
+        if not collection_name:
+            raise ValueError("MongoDB queries need a collection")
+        collection = self.analytics_database[collection_name]
+        limit = max_results if query.get("limit") is None else int(query["limit"])
+        if limit < 1:
+            raise ValueError("limit must be at least 1")
+        limit = min(limit, max_results)
+        
+        pipeline = query.get("pipeline")
+        if pipeline is not None:
+            if _pipeline_writes(pipeline):
+                raise ValueError("Pipelines with $out or $merge are not allowed, also not in sub-pipelines")
+            query_profiler.query_log.record(self.database.name, collection_name, "aggregate", pipeline=pipeline)
+            
+            def open_cursor():
+                return collection.aggregate(list(pipeline) + [{"$limit": limit}],
+                                            maxTimeMS=timeout_ms, batchSize=batch_size, **self.aggregate_options)
+        else:
+            filter, projection, sort = query.get("filter") or {}, query.get("projection"), query.get("sort")
+            query_profiler.query_log.record(self.database.name, collection_name, "find",
+                                            filter=filter, sort=sort, projection=projection)
+            
+            def open_cursor():
+                return collection.find(filter, projection, sort=list(sort.items()) if sort else None,
+                                       limit=limit, max_time_ms=timeout_ms, batch_size=batch_size)
+        
+        async for batch in stream_blocking_batches("mongodb", open_cursor, batch_size, limit):
+            yield batch
 
+# Redis has no collections; keys are grouped by the prefix before the first separator
+REDIS_KEY_SEPARATOR = ":"
+REDIS_UNPREFIXED = "(unprefixed)"
+
+def _redis_decode(value: Any) -> Any:
+    if isinstance(value, bytes):
+        try:
+            return value.decode("utf-8")
+        except UnicodeDecodeError:
+            return value
+    return value
+
+def _redis_scalar(value: Any) -> Any:
+    """Decode a stored string, turning numbers and JSON back into Python values"""
+    value = _redis_decode(value)
+    if not isinstance(value, str):
+        return value
+    # Only canonical numbers; ids such as "000123" stay strings
+    for parse in (int, float):
+        try:
+            number = parse(value)
+        except ValueError:
+            continue
+        if str(number) == value:
+            return number
+    if value[:1] in ("{", "["):
+        try:
+            return json.loads(value)
+        except ValueError:
+            pass
+    return value
+
+# Commands /query may run against Redis; everything else could modify data or block the server
+READ_ONLY_REDIS_COMMANDS = {
+    "GET", "MGET", "STRLEN", "EXISTS", "TYPE", "TTL", "PTTL",
+    "HGET", "HMGET", "HGETALL", "HKEYS", "HVALS", "HLEN",
+    "LRANGE", "LLEN", "LINDEX", "SMEMBERS", "SISMEMBER", "SCARD", "SRANDMEMBER",
+    "ZRANGE", "ZREVRANGE", "ZRANGEBYSCORE", "ZREVRANGEBYSCORE", "ZSCORE", "ZCARD", "ZCOUNT", "ZRANK",
+    "XRANGE", "XREVRANGE", "XLEN", "DBSIZE"
+}
+# Whole-hash and whole-set reads are done incrementally with HSCAN/SSCAN, up to max_results
+REDIS_SCANNED_COMMANDS = {"HGETALL": "hscan_iter", "HKEYS": "hscan_iter", "HVALS": "hscan_iter",
+                          "SMEMBERS": "sscan_iter"}
+# Range reads are narrowed to max_results on the server: index ranges (with the length command that
+# resolves negative indexes), score ranges by LIMIT and stream ranges by COUNT
+REDIS_INDEX_RANGE_COMMANDS = {"LRANGE": "llen", "ZRANGE": "zcard", "ZREVRANGE": "zcard"}
+REDIS_LIMIT_COMMANDS = {"ZRANGEBYSCORE", "ZREVRANGEBYSCORE"}
+REDIS_COUNT_COMMANDS = {"XRANGE", "XREVRANGE"}
+# Multi-key reads return one value per argument after the first skipped ones
+REDIS_MULTI_KEY_COMMANDS = {"MGET": 0, "HMGET": 1}
+
+def _redis_option_index(args: List[Any], option: str) -> Optional[int]:
+    return next((i for i, arg in enumerate(args) if isinstance(arg, str) and arg.upper() == option), None)
+
+def _redis_bounded_option(args: List[Any], option: str, value_offset: int, max_results: int) -> List[Any]:
+    """args with the count after option (LIMIT offset count / COUNT count) at most max_results, added if missing"""
+    args = list(args)
+    index = _redis_option_index(args, option)
+    if index is None:
+        return args + ([option, 0, max_results] if value_offset == 2 else [option, max_results])
+    position = index + value_offset
+    if position >= len(args):
+        raise ValueError(f"{option} needs {value_offset} argument(s)")
+    count = int(args[position])
+    # A negative LIMIT count means "all"
+    args[position] = max_results if count < 0 else min(count, max_results)
+    return args
+
+@register_connector
 class RedisConnector(BaseConnector):
     """Redis connector"""
     
+    db_type = "redis"
+    driver_module = "redis"
+    capabilities = {
+        "native_aggregation": False,
+        "sampling": "scan",
+        "async_driver": True,
+        "streaming_cursor": True,
+        "exact_count": False,
+        "query_profiling": False,
+        "index_advice": False,
+        "read_routing": False
+    }
+    # Upper bound on keys walked by SCAN when listing prefixes or counting a prefix
+    max_scan_keys = 100000
+    
+    @classmethod
+    def pool_options(cls, pool: Dict[str, Any]) -> Dict[str, Any]:
+        # redis-py opens connections on demand and has no minimum size or idle timeout
+        options = {}
+        if pool.get("max_pool_size") is not None:
+            options["max_connections"] = int(pool["max_pool_size"])
+        if pool.get("connect_timeout_seconds") is not None:
+            options["socket_connect_timeout"] = pool["connect_timeout_seconds"]
+        if pool.get("socket_timeout_seconds") is not None:
+            options["socket_timeout"] = pool["socket_timeout_seconds"]
+        return options
+    
     def __init__(self):
         self.client = None
         self.connection_info = {}
+        self.pool_settings = {}
     
-    async def connect(self, connection_string: str, **kwargs) -> Dict[str, Any]:
+    async def connect(self, connection_string: str, pool: Optional[Dict[str, Any]] = None,
+                      **kwargs) -> Dict[str, Any]:
         try:
             if not REDIS_AVAILABLE:
                 raise ImportError("redis is not installed")
             
+            redis_async = load_driver("redis.asyncio")
+            self.pool_settings = dict(pool or {})
+            kwargs = {**self.pool_options(self.pool_settings), **kwargs}
+            
             # Parse connection string
             if connection_string.startswith("redis://"):
                 self.client = redis_async.from_url(connection_string, **kwargs)
@@ -163,10 +802,12 @@ class RedisConnector(BaseConnector):
             # Test connection
             await self.test_connection()
             
+            # KEYS * blocks the server on large keyspaces; list prefixes with SCAN instead
             self.connection_info = {
                 "type": "redis",
                 "connection_string": connection_string,
-                "keys": await self.get_keys(),
+                "collections": await self.list_collections(),
+                "key_count": await instrumentation.timed("redis", "dbsize", self.client.dbsize()),
                 "info": await self.get_redis_info()
             }
             
@@ -184,7 +825,7 @@ class RedisConnector(BaseConnector):
     
     async def test_connection(self) -> bool:
         try:
-            await self.client.ping()
+            await instrumentation.timed("redis", "ping", self.client.ping())
             return True
         except Exception as e:
             logger.error(f"Redis connection test failed: {str(e)}")
@@ -193,10 +834,18 @@ class RedisConnector(BaseConnector):
     async def get_info(self) -> Dict[str, Any]:
         return self.connection_info
     
-    async def get_keys(self) -> list:
-        """Get all keys"""
+    async def get_keys(self, match: str = "*", limit: Optional[int] = None) -> list:
+        """Keys matching a pattern, walked incrementally with SCAN"""
+        keys = []
+        limit = limit or self.max_scan_keys
         try:
-            return await self.client.keys("*")
+            with instrumentation.span("redis.scan", kind="db") as current:
+                async for key in self.client.scan_iter(match=match, count=1000):
+                    keys.append(_redis_decode(key))
+                    if len(keys) >= limit:
+                        break
+                current.docs_returned = len(keys)
+            return keys
         except Exception as e:
             logger.error(f"Failed to get keys: {str(e)}")
             return []
@@ -204,7 +853,7 @@ class RedisConnector(BaseConnector):
     async def get_redis_info(self) -> Dict[str, Any]:
         """Get Redis server information"""
         try:
-            info = await self.client.info()
+            info = await instrumentation.timed("redis", "info", self.client.info())
             return {
                 "version": info.get("redis_version"),
                 "connected_clients": info.get("connected_clients"),
@@ -214,19 +863,261 @@ class RedisConnector(BaseConnector):
         except Exception as e:
             logger.error(f"Failed to get Redis info: {str(e)}")
             return {}
+    
+    def pool_stats(self) -> Dict[str, Any]:
+        stats = super().pool_stats()
+        pool = getattr(self.client, "connection_pool", None)
+        if pool is None:
+            return stats
+        available = len(getattr(pool, "_available_connections", []))
+        in_use = len(getattr(pool, "_in_use_connections", []))
+        max_size = getattr(pool, "max_connections", None)
+        stats.update({
+            "open": available + in_use,
+            "in_use": in_use,
+            "idle": available,
+            "created": getattr(pool, "_created_connections", available + in_use),
+            "max_pool_size": max_size,
+            "utilization": round(in_use / max_size, 4) if max_size else None
+        })
+        return stats
+    
+    def _prefix_pattern(self, collection: str) -> str:
+        return "*" if collection == REDIS_UNPREFIXED else f"{collection}{REDIS_KEY_SEPARATOR}*"
+    
+    def _in_collection(self, key: str, collection: str) -> bool:
+        return collection != REDIS_UNPREFIXED or REDIS_KEY_SEPARATOR not in key
+    
+    async def list_collections(self) -> List[str]:
+        prefixes = set()
+        for key in await self.get_keys():
+            prefixes.add(key.split(REDIS_KEY_SEPARATOR, 1)[0] if REDIS_KEY_SEPARATOR in key else REDIS_UNPREFIXED)
+        return sorted(prefixes)
+    
+    async def sample_records(self, collection: str, size: int) -> List[Dict[str, Any]]:
+        keys = []
+        with instrumentation.span("redis.scan", kind="db"):
+            async for key in self.client.scan_iter(match=self._prefix_pattern(collection), count=max(size, 100)):
+                key = _redis_decode(key)
+                if self._in_collection(key, collection):
+                    keys.append(key)
+                    if len(keys) >= size:
+                        break
+        return await self._fetch_records(keys)
+    
+    async def _fetch_records(self, keys: List[str]) -> List[Dict[str, Any]]:
+        """Values of the given keys as records, whatever their Redis type"""
+        if not keys:
+            return []
+        
+        # One round trip for the key types, one for the values
+        async with self.client.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.type(key)
+            types = [_redis_decode(t) for t in await instrumentation.timed("redis", "type", pipe.execute())]
+        async with self.client.pipeline(transaction=False) as pipe:
+            for key, key_type in zip(keys, types):
+                if key_type == "hash":
+                    pipe.hgetall(key)
+                elif key_type == "list":
+                    pipe.lrange(key, 0, 49)
+                elif key_type == "set":
+                    pipe.srandmember(key, 50)
+                elif key_type == "zset":
+                    pipe.zrange(key, 0, 49, withscores=True)
+                else:
+                    pipe.get(key)
+            values = await instrumentation.timed("redis", "fetch", pipe.execute())
+        
+        records = []
+        for key, key_type, value in zip(keys, types, values):
+            if key_type == "hash":
+                record = {_redis_decode(field): _redis_scalar(item) for field, item in value.items()}
+            elif key_type == "zset":
+                record = {"value": [[_redis_decode(member), score] for member, score in value]}
+            elif key_type in ("list", "set"):
+                record = {"value": [_redis_scalar(item) for item in value or []]}
+            else:
+                parsed = _redis_scalar(value)
+                record = dict(parsed) if isinstance(parsed, dict) else {"value": parsed}
+            record["_key"] = key
+            record["_type"] = key_type
+            records.append(record)
+        return records
+    
+    async def count_records(self, collection: str) -> Optional[int]:
+        keys = await self.get_keys(self._prefix_pattern(collection))
+        if len(keys) >= self.max_scan_keys:
+            return None
+        return sum(1 for key in keys if self._in_collection(key, collection))
+    
+    async def server_stats(self) -> Dict[str, Any]:
+        info = await instrumentation.timed("redis", "info", self.client.info())
+        hits = info.get("keyspace_hits", 0)
+        misses = info.get("keyspace_misses", 0)
+        return {
+            "version": info.get("redis_version"),
+            "used_memory_bytes": info.get("used_memory"),
+            "max_memory_bytes": info.get("maxmemory"),
+            "fragmentation_ratio": info.get("mem_fragmentation_ratio"),
+            "connected_clients": info.get("connected_clients"),
+            "ops_per_second": info.get("instantaneous_ops_per_sec"),
+            "keyspace_hit_ratio": round(hits / (hits + misses), 4) if hits + misses else None,
+            "evicted_keys": info.get("evicted_keys", 0),
+            "expired_keys": info.get("expired_keys", 0)
+        }
+    
+    async def execute_query(self, query: Dict[str, Any], batch_size: int, max_results: int,
+                            timeout_ms: int) -> AsyncIterator[List[Dict[str, Any]]]:
+        """A read-only command ({"command", "args"}) or a SCAN over matching keys ({"match"})"""
+        deadline = asyncio.get_running_loop().time() + timeout_ms / 1000
+        
+        if "command" in query:
+            command = str(query["command"]).upper()
+            if command not in READ_ONLY_REDIS_COMMANDS:
+                raise ValueError(f"Redis command {command} is not allowed; use one of {sorted(READ_ONLY_REDIS_COMMANDS)}")
+            args = query.get("args", [])
+            if command in REDIS_SCANNED_COMMANDS and len(args) == 1:
+                async for batch in self._scan_command(command, args[0], batch_size, max_results, deadline, timeout_ms):
+                    yield batch
+                return
+            args = await self._bounded_args(command, args, max_results)
+            result = await instrumentation.timed("redis", command.lower(), asyncio.wait_for(
+                self.client.execute_command(command, *args), timeout_ms / 1000
+            ))
+            if isinstance(result, dict):
+                records = [{_redis_decode(field): _redis_scalar(value)
+                            for field, value in list(result.items())[:max_results]}]
+            elif isinstance(result, (list, tuple)):
+                records = [{"value": [_redis_scalar(part) for part in item] if isinstance(item, (list, tuple))
+                            else _redis_scalar(item)} for item in result[:max_results]]
+            elif result is None:
+                records = []
+            else:
+                records = [{"value": _redis_scalar(result)}]
+            for start in range(0, len(records), batch_size):
+                yield records[start:start + batch_size]
+            return
+        
+        if "match" not in query:
+            raise ValueError("Redis queries need a command or a match pattern")
+        keys = []
+        sent = 0
+        async for key in self.client.scan_iter(match=query["match"], count=batch_size):
+            if asyncio.get_running_loop().time() > deadline:
+                raise asyncio.TimeoutError(f"Query exceeded {timeout_ms} ms")
+            keys.append(_redis_decode(key))
+            if len(keys) >= min(batch_size, max_results - sent):
+                yield await self._fetch_records(keys)
+                sent += len(keys)
+                keys = []
+                if sent >= max_results:
+                    return
+        if keys:
+            yield await self._fetch_records(keys)
+    
+    async def _bounded_args(self, command: str, args: List[Any], max_results: int) -> List[Any]:
+        """Arguments of a read command narrowed so the server replies with at most max_results items"""
+        if not isinstance(args, list):
+            raise ValueError("Redis args must be a list")
+        if command in REDIS_INDEX_RANGE_COMMANDS:
+            if command == "ZRANGE" and any(_redis_option_index(args, option) is not None
+                                           for option in ("BYSCORE", "BYLEX")):
+                return _redis_bounded_option(args, "LIMIT", 2, max_results)
+            if len(args) < 3:
+                raise ValueError(f"{command} needs a key, a start and a stop index")
+            start, stop = int(args[1]), int(args[2])
+            if start < 0 or stop < 0:
+                length = await getattr(self.client, REDIS_INDEX_RANGE_COMMANDS[command])(args[0])
+                start = max(0, length + start) if start < 0 else start
+                stop = length + stop if stop < 0 else stop
+            return [args[0], start, min(stop, start + max_results - 1)] + list(args[3:])
+        if command in REDIS_LIMIT_COMMANDS:
+            return _redis_bounded_option(args, "LIMIT", 2, max_results)
+        if command in REDIS_COUNT_COMMANDS:
+            return _redis_bounded_option(args, "COUNT", 1, max_results)
+        if command in REDIS_MULTI_KEY_COMMANDS:
+            return list(args[:REDIS_MULTI_KEY_COMMANDS[command] + max_results])
+        if command == "SRANDMEMBER" and len(args) > 1:
+            # A negative count allows repeats; keep the sign
+            count = int(args[1])
+            return [args[0], max(-max_results, min(count, max_results))] + list(args[2:])
+        return args
+    
+    async def _scan_command(self, command: str, key: Any, batch_size: int, max_results: int,
+                            deadline: float, timeout_ms: int) -> AsyncIterator[List[Dict[str, Any]]]:
+        """HGETALL/HKEYS/HVALS/SMEMBERS through HSCAN/SSCAN, stopping after max_results items.
+        HGETALL keeps its shape: one record with at most max_results fields."""
+        fields = {}
+        batch = []
+        read = 0
+        async for item in getattr(self.client, REDIS_SCANNED_COMMANDS[command])(key, count=batch_size):
+            if asyncio.get_running_loop().time() > deadline:
+                raise asyncio.TimeoutError(f"Query exceeded {timeout_ms} ms")
+            if command == "SMEMBERS":
+                batch.append({"value": _redis_scalar(item)})
+            elif command == "HGETALL":
+                fields[_redis_decode(item[0])] = _redis_scalar(item[1])
+            elif command == "HKEYS":
+                batch.append({"value": _redis_decode(item[0])})
+            else:
+                batch.append({"value": _redis_scalar(item[1])})
+            read += 1
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+            if read >= max_results:
+                break
+        if batch:
+            yield batch
+        if fields:
+            yield [fields]
 
+@register_connector
 class CassandraConnector(BaseConnector):
     """Cassandra connector"""
     
+    db_type = "cassandra"
+    driver_module = "cassandra"
+    collections_field = "tables"
+    # COUNT(*) and GROUP BY on non-key columns are full-cluster scans, so they are not used
+    capabilities = {
+        "native_aggregation": False,
+        "sampling": "limit",
+        "async_driver": False,
+        "streaming_cursor": True,
+        "exact_count": False,
+        "query_profiling": False,
+        "index_advice": False,
+        "read_routing": False
+    }
+    
+    @classmethod
+    def connect_arguments(cls, database_name: Optional[str] = None, keyspace: Optional[str] = None,
+                          username: Optional[str] = None, password: Optional[str] = None) -> Dict[str, Any]:
+        return {"keyspace": keyspace or database_name, "username": username, "password": password}
+    
     def __init__(self):
         self.cluster = None
         self.session = None
         self.keyspace = None
         self.connection_info = {}
+        self.pool_settings = {}
+    
+    @classmethod
+    def pool_options(cls, pool: Dict[str, Any]) -> Dict[str, Any]:
+        # Protocol v3+ multiplexes requests over one connection per host, so pool sizes do not apply
+        options = {}
+        if pool.get("connect_timeout_seconds") is not None:
+            options["connect_timeout"] = pool["connect_timeout_seconds"]
+        compression = [c for c in pool.get("compressors", []) if c in ("lz4", "snappy")]
+        if compression:
+            options["compression"] = compression[0]
+        return options
     
     async def connect(self, connection_string: str, keyspace: str,
                      username: Optional[str] = None, password: Optional[str] = None,
-                     **kwargs) -> Dict[str, Any]:
+                     pool: Optional[Dict[str, Any]] = None, **kwargs) -> Dict[str, Any]:
         try:
             if not CASSANDRA_AVAILABLE:
                 raise ImportError("cassandra-driver is not installed")
@@ -234,15 +1125,22 @@ class CassandraConnector(BaseConnector):
             # Parse connection string (host:port format)
             hosts = connection_string.split(",")
             
+            cassandra_cluster = load_driver("cassandra.cluster")
+            cassandra_auth = load_driver("cassandra.auth")
+            
             # Create auth provider if credentials provided
             auth_provider = None
             if username and password:
-                auth_provider = PlainTextAuthProvider(username=username, password=password)
+                auth_provider = cassandra_auth.PlainTextAuthProvider(username=username, password=password)
             
-            self.cluster = Cluster(contact_points=hosts, auth_provider=auth_provider, **kwargs)
-            self.session = await asyncio.get_event_loop().run_in_executor(
-                None, self.cluster.connect, keyspace
+            self.pool_settings = dict(pool or {})
+            cluster_kwargs = {**self.pool_options(self.pool_settings), **kwargs}
+            self.cluster = cassandra_cluster.Cluster(contact_points=hosts, auth_provider=auth_provider, **cluster_kwargs)
+            self.session = await instrumentation.run_in_executor(
+                "cassandra", "connect", self.cluster.connect, keyspace
             )
+            if self.pool_settings.get("socket_timeout_seconds") is not None:
+                self.session.default_timeout = self.pool_settings["socket_timeout_seconds"]
             self.keyspace = keyspace
             
             # Test connection
@@ -263,18 +1161,20 @@ class CassandraConnector(BaseConnector):
             raise
     
     async def disconnect(self):
+        control = executors.executor_for(executors.CONTROL)
         if self.session:
-            await asyncio.get_event_loop().run_in_executor(None, self.session.shutdown)
+            await instrumentation.run_in_executor("cassandra", "shutdown", self.session.shutdown, executor=control)
         if self.cluster:
-            await asyncio.get_event_loop().run_in_executor(None, self.cluster.shutdown)
+            await instrumentation.run_in_executor("cassandra", "shutdown", self.cluster.shutdown, executor=control)
         self.session = None
         self.cluster = None
         self.connection_info = {}
     
     async def test_connection(self) -> bool:
         try:
-            await asyncio.get_event_loop().run_in_executor(
-                None, lambda: self.session.execute("SELECT release_version FROM system.local")
+            await instrumentation.run_in_executor(
+                "cassandra", "ping", lambda: self.session.execute("SELECT release_version FROM system.local"),
+                executor=executors.executor_for(executors.CONTROL)
             )
             return True
         except Exception as e:
@@ -287,8 +1187,8 @@ class CassandraConnector(BaseConnector):
     async def get_tables(self) -> list:
         """Get list of tables"""
         try:
-            result = await asyncio.get_event_loop().run_in_executor(
-                None, lambda: self.session.execute(
+            result = await instrumentation.run_in_executor(
+                "cassandra", "list_tables", lambda: self.session.execute(
                     "SELECT table_name FROM system_schema.tables WHERE keyspace_name = %s",
                     (self.keyspace,)
                 )
@@ -301,8 +1201,8 @@ class CassandraConnector(BaseConnector):
     async def get_cluster_info(self) -> Dict[str, Any]:
         """Get cluster information"""
         try:
-            result = await asyncio.get_event_loop().run_in_executor(
-                None, lambda: self.session.execute("SELECT release_version FROM system.local")
+            result = await instrumentation.run_in_executor(
+                "cassandra", "cluster_info", lambda: self.session.execute("SELECT release_version FROM system.local")
             )
             return {
                 "version": result.one().release_version if result.one() else "Unknown"
@@ -310,20 +1210,110 @@ class CassandraConnector(BaseConnector):
         except Exception as e:
             logger.error(f"Failed to get cluster info: {str(e)}")
             return {}
+    
+    def pool_stats(self) -> Dict[str, Any]:
+        stats = super().pool_stats()
+        if self.session is None:
+            return stats
+        # {host: {"open_count": ..., "in_flights": [...], ...}} from the driver's host pools
+        hosts = {str(host): state for host, state in self.session.get_pool_state().items()}
+        stats["hosts"] = hosts
+        stats["open"] = sum(state.get("open_count", 0) for state in hosts.values())
+        stats["in_flight_requests"] = sum(sum(state.get("in_flights", [])) for state in hosts.values())
+        return stats
+    
+    async def list_collections(self) -> List[str]:
+        return await self.get_tables()
+    
+    async def sample_records(self, collection: str, size: int) -> List[Dict[str, Any]]:
+        # Rows come back in token order, so this is the first rows of the ring rather than a random sample
+        result = await instrumentation.run_in_executor(
+            "cassandra", "sample", lambda: list(self.session.execute(
+                f'SELECT * FROM "{self.keyspace}"."{collection}" LIMIT %s', (int(size),)
+            ))
+        )
+        return [row._asdict() if hasattr(row, "_asdict") else dict(row) for row in result]
+    
+    async def server_stats(self) -> Dict[str, Any]:
+        local = await instrumentation.run_in_executor(
+            "cassandra", "system_local", lambda: self.session.execute(
+                "SELECT release_version, cluster_name, data_center FROM system.local"
+            ).one()
+        )
+        peers = await instrumentation.run_in_executor(
+            "cassandra", "system_peers", lambda: list(self.session.execute("SELECT peer FROM system.peers"))
+        )
+        return {
+            "version": local.release_version if local else None,
+            "cluster_name": local.cluster_name if local else None,
+            "data_center": local.data_center if local else None,
+            "nodes": len(peers) + 1
+        }
+    
+    async def execute_query(self, query: Dict[str, Any], batch_size: int, max_results: int,
+                            timeout_ms: int) -> AsyncIterator[List[Dict[str, Any]]]:
+        """A CQL SELECT ({"cql", "params"}), paged by the driver batch_size rows at a time"""
+        cql = (query.get("cql") or "").strip()
+        if not cql.lower().startswith("select"):
+            raise ValueError("Only CQL SELECT statements can be run")
+        
+        def open_cursor():
+            statement = load_driver("cassandra.query").SimpleStatement(cql, fetch_size=batch_size)
+            rows = self.session.execute(statement, query.get("params"), timeout=timeout_ms / 1000)
+            return (row._asdict() if hasattr(row, "_asdict") else dict(row) for row in rows)
+        
+        async for batch in stream_blocking_batches("cassandra", open_cursor, batch_size, max_results):
+            yield batch
 
+@register_connector
 class ElasticsearchConnector(BaseConnector):
     """Elasticsearch connector"""
     
+    db_type = "elasticsearch"
+    driver_module = "elasticsearch"
+    collections_field = "indices"
+    capabilities = {
+        "native_aggregation": True,
+        "sampling": "server",
+        "async_driver": True,
+        "streaming_cursor": True,
+        "exact_count": True,
+        "query_profiling": False,
+        "index_advice": False,
+        "read_routing": False
+    }
+    
+    @classmethod
+    def connect_arguments(cls, database_name: Optional[str] = None, keyspace: Optional[str] = None,
+                          username: Optional[str] = None, password: Optional[str] = None) -> Dict[str, Any]:
+        return {}
+    
+    @classmethod
+    def pool_options(cls, pool: Dict[str, Any]) -> Dict[str, Any]:
+        options = {}
+        if pool.get("max_pool_size") is not None:
+            options["connections_per_node"] = int(pool["max_pool_size"])
+        if pool.get("socket_timeout_seconds") is not None:
+            options["request_timeout"] = pool["socket_timeout_seconds"]
+        if "gzip" in pool.get("compressors", []):
+            options["http_compress"] = True
+        return options
+    
     def __init__(self):
         self.client = None
         self.connection_info = {}
+        self.pool_settings = {}
     
-    async def connect(self, connection_string: str, **kwargs) -> Dict[str, Any]:
+    async def connect(self, connection_string: str, pool: Optional[Dict[str, Any]] = None,
+                      **kwargs) -> Dict[str, Any]:
         try:
             if not ELASTICSEARCH_AVAILABLE:
                 raise ImportError("elasticsearch is not installed")
             
-            self.client = AsyncElasticsearch([connection_string], **kwargs)
+            elasticsearch = load_driver("elasticsearch")
+            self.pool_settings = dict(pool or {})
+            kwargs = {**self.pool_options(self.pool_settings), **kwargs}
+            self.client = elasticsearch.AsyncElasticsearch([connection_string], **kwargs)
             
             # Test connection
             await self.test_connection()
@@ -349,7 +1339,7 @@ class ElasticsearchConnector(BaseConnector):
     
     async def test_connection(self) -> bool:
         try:
-            await self.client.ping()
+            await instrumentation.timed("elasticsearch", "ping", self.client.ping())
             return True
         except Exception as e:
             logger.error(f"Elasticsearch connection test failed: {str(e)}")
@@ -361,7 +1351,7 @@ class ElasticsearchConnector(BaseConnector):
     async def get_indices(self) -> list:
         """Get list of indices"""
         try:
-            indices = await self.client.cat.indices(format="json")
+            indices = await instrumentation.timed("elasticsearch", "cat_indices", self.client.cat.indices(format="json"))
             return [index["index"] for index in indices]
         except Exception as e:
             logger.error(f"Failed to get indices: {str(e)}")
@@ -370,7 +1360,7 @@ class ElasticsearchConnector(BaseConnector):
     async def get_cluster_info(self) -> Dict[str, Any]:
         """Get cluster information"""
         try:
-            info = await self.client.info()
+            info = await instrumentation.timed("elasticsearch", "info", self.client.info())
             return {
                 "version": info.get("version", {}).get("number"),
                 "cluster_name": info.get("cluster_name"),
@@ -379,6 +1369,93 @@ class ElasticsearchConnector(BaseConnector):
         except Exception as e:
             logger.error(f"Failed to get cluster info: {str(e)}")
             return {}
+    
+    async def list_collections(self) -> List[str]:
+        # Hidden/system indices start with a dot
+        return [index for index in await self.get_indices() if not index.startswith(".")]
+    
+    async def sample_records(self, collection: str, size: int) -> List[Dict[str, Any]]:
+        result = await instrumentation.timed("elasticsearch", "search", self.client.search(
+            index=collection, size=size,
+            query={"function_score": {"query": {"match_all": {}}, "random_score": {}}}
+        ))
+        return [dict(hit.get("_source", {}), _id=hit["_id"]) for hit in result["hits"]["hits"]]
+    
+    async def count_records(self, collection: str) -> Optional[int]:
+        result = await instrumentation.timed("elasticsearch", "count", self.client.count(index=collection))
+        return result["count"]
+    
+    async def aggregate_field(self, collection: str, field: str, numeric: bool = False,
+                              where: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        # match also finds the value in analyzed text fields
+        query = {"bool": {"filter": [{"match": {key: value}} for key, value in (where or {}).items()]}}
+        if numeric:
+            result = await instrumentation.timed("elasticsearch", "aggregate", self.client.search(
+                index=collection, size=0, query=query, aggs={"field": {"stats": {"field": field}}}
+            ))
+            stats = result["aggregations"]["field"]
+            return {key: stats.get(key) for key in ("min", "max", "avg", "sum", "count")}
+        # Text fields aggregate through their keyword sub-field
+        for target in (field, f"{field}.keyword"):
+            try:
+                result = await instrumentation.timed("elasticsearch", "aggregate", self.client.search(
+                    index=collection, size=0, query=query, aggs={"field": {"terms": {"field": target, "size": 50}}}
+                ))
+            except Exception as e:
+                logger.info(f"terms aggregation on {collection}.{target} failed: {str(e)}")
+                continue
+            return {"values": {str(bucket["key"]): bucket["doc_count"]
+                               for bucket in result["aggregations"]["field"]["buckets"]}}
+        return {}
+    
+    async def server_stats(self) -> Dict[str, Any]:
+        health = await instrumentation.timed("elasticsearch", "cluster_health", self.client.cluster.health())
+        stats = await instrumentation.timed("elasticsearch", "indices_stats", self.client.indices.stats(metric="docs,store,search"))
+        totals = stats.get("_all", {}).get("total", {})
+        search = totals.get("search", {})
+        return {
+            "status": health.get("status"),
+            "nodes": health.get("number_of_nodes"),
+            "active_shards": health.get("active_shards"),
+            "unassigned_shards": health.get("unassigned_shards"),
+            "documents": totals.get("docs", {}).get("count"),
+            "store_size_bytes": totals.get("store", {}).get("size_in_bytes"),
+            "query_total": search.get("query_total"),
+            "avg_query_ms": round(search.get("query_time_in_millis", 0) / search["query_total"], 3)
+            if search.get("query_total") else None
+        }
+    
+    async def execute_query(self, query: Dict[str, Any], batch_size: int, max_results: int,
+                            timeout_ms: int) -> AsyncIterator[List[Dict[str, Any]]]:
+        """A search ({"index", "query", "sort"}) paged with search_after over a point in time"""
+        index = query.get("index")
+        if not index:
+            raise ValueError("Elasticsearch queries need an index")
+        client = self.client.options(request_timeout=timeout_ms / 1000)
+        pit = await instrumentation.timed("elasticsearch", "open_pit", client.open_point_in_time(index=index, keep_alive="1m"))
+        pit_id = pit["id"]
+        sort = list(query.get("sort") or []) + [{"_shard_doc": "asc"}]
+        search_after = None
+        sent = 0
+        try:
+            while sent < max_results:
+                size = min(batch_size, max_results - sent)
+                params = {"size": size, "query": query.get("query") or {"match_all": {}}, "sort": sort,
+                          "pit": {"id": pit_id, "keep_alive": "1m"}, "timeout": f"{timeout_ms}ms"}
+                if search_after is not None:
+                    params["search_after"] = search_after
+                result = await instrumentation.timed("elasticsearch", "search", client.search(**params))
+                hits = result["hits"]["hits"]
+                if not hits:
+                    return
+                pit_id = result.get("pit_id", pit_id)
+                search_after = hits[-1]["sort"]
+                sent += len(hits)
+                yield [dict(hit.get("_source", {}), _id=hit["_id"]) for hit in hits]
+                if len(hits) < size:
+                    return
+        finally:
+            await self.client.close_point_in_time(id=pit_id)
 
 class DatabaseConnector:
     """Main database connector class that manages different database types"""
@@ -386,53 +1463,83 @@ class DatabaseConnector:
     def __init__(self):
         self.connector = None
         self.connection_info = {}
+        self.connect_args: Optional[Dict[str, Any]] = None  # Arguments of the last successful connect
+        # Identifies the connection across worker processes; kept by reconnect
+        self.connection_id: Optional[str] = None
     
     async def connect(self, db_type: str, connection_string: str, 
                      database_name: Optional[str] = None, keyspace: Optional[str] = None,
                      username: Optional[str] = None, password: Optional[str] = None,
-                     additional_params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        """Connect to a database based on type"""
+                     additional_params: Optional[Dict[str, Any]] = None,
+                     pool: Optional[Dict[str, Any]] = None,
+                     analytics: Optional[Dict[str, Any]] = None,
+                     connection_id: Optional[str] = None) -> Dict[str, Any]:
+        """Connect to a database based on type; pool and analytics settings override the
+        POOL_* and ANALYTICS_* defaults. connection_id adopts a connection another worker opened."""
         
         # Disconnect from existing connection
         await self.disconnect()
         
-        # Create appropriate connector
-        if db_type.lower() == "mongodb":
-            self.connector = MongoDBConnector()
-            connection_result = await self.connector.connect(
-                connection_string=connection_string,
-                database_name=database_name,
-                username=username,
-                password=password,
-                **(additional_params or {})
-            )
-        elif db_type.lower() == "redis":
-            self.connector = RedisConnector()
-            connection_result = await self.connector.connect(
-                connection_string=connection_string,
-                username=username,
-                password=password,
-                **(additional_params or {})
-            )
-        elif db_type.lower() == "cassandra":
-            self.connector = CassandraConnector()
-            connection_result = await self.connector.connect(
-                connection_string=connection_string,
-                keyspace=keyspace or database_name,
-                username=username,
-                password=password,
-                **(additional_params or {})
-            )
-        elif db_type.lower() == "elasticsearch":
-            self.connector = ElasticsearchConnector()
-            connection_result = await self.connector.connect(
-                connection_string=connection_string,
-                **(additional_params or {})
+        connect_args = {
+            "db_type": db_type,
+            "connection_string": connection_string,
+            "database_name": database_name,
+            "keyspace": keyspace,
+            "username": username,
+            "password": password,
+            "additional_params": additional_params,
+            "pool": {**Config.get_pool_settings(), **{k: v for k, v in (pool or {}).items() if v is not None}},
+            "analytics": {**Config.get_analytics_settings(),
+                          **{k: v for k, v in (analytics or {}).items() if v is not None}}
+        }
+        self.connector, connection_result = await self._open(connect_args)
+        self.connection_info = connection_result
+        self.connect_args = connect_args
+        self.connection_id = connection_id or uuid.uuid4().hex
+        return connection_result
+    
+    async def _open(self, connect_args: Dict[str, Any]):
+        """Create and connect the connector registered for the type; returns (connector, info)"""
+        connector_class = get_connector_class(connect_args["db_type"])
+        connector = connector_class()
+        routing = {"analytics": connect_args["analytics"]} if connector_class.capabilities.get("read_routing") else {}
+        try:
+            connection_result = await connector.connect(
+                connection_string=connect_args["connection_string"],
+                **connector_class.connect_arguments(connect_args["database_name"], connect_args["keyspace"],
+                                                    connect_args["username"], connect_args["password"]),
+                pool=connect_args["pool"],
+                **routing,
+                **(connect_args["additional_params"] or {})
             )
-        else:
-            raise ValueError(f"Unsupported database type: {db_type}")
+            # Some drivers connect lazily and only log a failed ping; make sure the backend answers
+            if not await connector.test_connection():
+                raise ConnectionError(f"{connect_args['db_type']} did not answer a ping")
+        except BaseException:
+            # Also on cancellation (e.g. a reconnect that timed out): close the half-opened client
+            # and its pool instead of leaking them
+            try:
+                await asyncio.shield(connector.disconnect())
+            except BaseException as e:
+                logger.warning(f"Closing a failed {connect_args['db_type']} connection failed: {str(e)}")
+            raise
+        return connector, connection_result
+    
+    async def reconnect(self) -> Dict[str, Any]:
+        """Open a fresh connection with the arguments of the last connect.
         
+        The current connector stays in place until the new one answers, so a failed attempt
+        leaves the previous state untouched."""
+        if not self.connect_args:
+            raise RuntimeError("No previous connection to restore")
+        connector, connection_result = await self._open(self.connect_args)
+        previous, self.connector = self.connector, connector
         self.connection_info = connection_result
+        if previous:
+            try:
+                await previous.disconnect()
+            except Exception as e:
+                logger.warning(f"Closing the previous connection failed: {str(e)}")
         return connection_result
     
     async def disconnect(self):
@@ -441,6 +1548,8 @@ class DatabaseConnector:
             await self.connector.disconnect()
             self.connector = None
             self.connection_info = {}
+            self.connect_args = None
+            self.connection_id = None
     
     def is_connected(self) -> bool:
         """Check if connected to a database"""
@@ -450,19 +1559,37 @@ class DatabaseConnector:
         """Get current connection information"""
         return self.connection_info
     
+    def pool_stats(self) -> Dict[str, Any]:
+        """Pool settings and utilization of the current connection; also updates the pool gauges"""
+        if not self.is_connected():
+            raise RuntimeError("No database connected")
+        stats = self.connector.pool_stats()
+        for state in ("open", "in_use", "idle", "waiting"):
+            if state in stats:
+                instrumentation.POOL_CONNECTIONS.set(stats[state], backend=stats["backend"], state=state)
+        return stats
+    
+    def get_capabilities(self) -> Dict[str, Any]:
+        """Capabilities of the connected backend (empty when not connected)"""
+        return dict(self.connector.capabilities) if self.connector else {}
+    
     async def get_client(self):
         """Get the database client"""
         if not self.is_connected():
             raise RuntimeError("No database connected")
         return self.connector
     
-    async def execute_query(self, query: str, params: Optional[Dict[str, Any]] = None) -> Any:
-        """Execute a query on the connected database"""
+    async def execute_query(self, query: Dict[str, Any], batch_size: Optional[int] = None,
+                            max_results: Optional[int] = None,
+                            timeout_ms: Optional[int] = None) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Stream the results of a read-only query in batches.
+        
+        Batch size, result count and server-side timeout are capped by the QUERY_* settings."""
         if not self.is_connected():
             raise RuntimeError("No database connected")
         
-        # This is a simplified version - actual implementation would depend on database type
-        if hasattr(self.connector, 'execute_query'):
-            return await self.connector.execute_query(query, params)
-        else:
-            raise NotImplementedError("Query execution not implemented for this database type") 
\ No newline at end of file
+        batch_size = max(1, min(batch_size or Config.QUERY_BATCH_SIZE, Config.QUERY_BATCH_SIZE))
+        max_results = max(1, min(max_results or Config.QUERY_MAX_RESULTS, Config.QUERY_MAX_RESULTS))
+        timeout_ms = max(1, min(timeout_ms or Config.QUERY_TIMEOUT_MS, Config.QUERY_TIMEOUT_MS))
+        async for batch in self.connector.execute_query(query, batch_size, max_results, timeout_ms):
+            yield batch
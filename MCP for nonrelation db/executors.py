@@ -0,0 +1,135 @@
+import threading
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from typing import Dict, Any
+import logging
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Pings, killOp and shutdowns run here so they still get a thread while a backend's pool is full
+CONTROL = "control"
+# /query stream producers hold a thread for as long as their client reads, so they get their own pool
+STREAM_SUFFIX = "_stream"
+
+
+class ExecutorSaturated(RuntimeError):
+    """Raised instead of queueing more blocking work on a full executor"""
+
+
+class BoundedExecutor(Executor):
+    """Named thread pool that rejects work once max_workers + max_queue calls are pending.
+
+    ThreadPoolExecutor queues without limit, so a burst of analyses would otherwise build an
+    ever-growing backlog that starves every other request on the same backend.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"mcp-{name}")
+        self._lock = threading.Lock()
+        self.active = 0
+        self.queued = 0
+        self.peak_pending = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        with self._lock:
+            if self.active + self.queued >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise ExecutorSaturated(
+                    f"The {self.name} executor is saturated ({self.active} running, {self.queued} queued)"
+                )
+            self.queued += 1
+            self.peak_pending = max(self.peak_pending, self.active + self.queued)
+
+        def run():
+            with self._lock:
+                self.queued -= 1
+                self.active += 1
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self.active -= 1
+                    self.completed += 1
+
+        def release_if_cancelled(future: Future):
+            # A call cancelled while still queued never reaches run()
+            if future.cancelled():
+                with self._lock:
+                    self.queued -= 1
+
+        try:
+            future = self._pool.submit(run)
+        except Exception:
+            with self._lock:
+                self.queued -= 1
+            raise
+        future.add_done_callback(release_if_cancelled)
+        return future
+
+    def is_saturated(self) -> bool:
+        with self._lock:
+            return self.active + self.queued >= self.max_workers + self.max_queue
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False):
+        self._pool.shutdown(wait=wait, cancel_futures=cancel_futures)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "name": self.name,
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "active": self.active,
+                "queued": self.queued,
+                "utilization": round(self.active / self.max_workers, 4) if self.max_workers else None,
+                "peak_pending": self.peak_pending,
+                "completed": self.completed,
+                "rejected": self.rejected
+            }
+
+
+_executors: Dict[str, BoundedExecutor] = {}
+_executors_lock = threading.Lock()
+
+
+def executor_for(name: str) -> BoundedExecutor:
+    """The executor for a backend (or CONTROL), created on first use with its EXECUTOR_* settings"""
+    with _executors_lock:
+        executor = _executors.get(name)
+        if executor is None:
+            settings = Config.get_executor_settings(name)
+            executor = BoundedExecutor(name, settings["max_workers"], settings["max_queue"])
+            _executors[name] = executor
+        return executor
+
+
+def stream_executor_for(backend: str) -> BoundedExecutor:
+    """The executor for a backend's /query streams, sized by QUERY_STREAM_MAX_WORKERS/_QUEUE"""
+    return executor_for(f"{backend}{STREAM_SUFFIX}")
+
+
+def is_saturated(name: str) -> bool:
+    """True while the named executor exists and cannot take more work"""
+    executor = _executors.get(name)
+    return executor is not None and executor.is_saturated()
+
+
+def snapshot() -> Dict[str, Dict[str, Any]]:
+    with _executors_lock:
+        executors = list(_executors.values())
+    return {executor.name: executor.snapshot() for executor in executors}
+
+
+def shutdown():
+    """Stop all executors; queued calls are cancelled, running ones finish"""
+    with _executors_lock:
+        executors = list(_executors.values())
+        _executors.clear()
+    for executor in executors:
+        executor.shutdown(wait=False, cancel_futures=True)
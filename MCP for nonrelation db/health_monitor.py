@@ -0,0 +1,192 @@
+import asyncio
+import random
+import time
+from collections import deque
+from datetime import datetime
+from typing import Dict, Any, Optional
+import logging
+
+import instrumentation
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a backend the health monitor has marked as down"""
+
+
+class CircuitBreaker:
+    """Closed while the backend answers; open (requests fail fast) after repeated failed probes.
+
+    half_open means the monitor is probing or reconnecting; requests are still refused
+    until that succeeds.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 3):
+        self.failure_threshold = failure_threshold
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+
+    def record_success(self):
+        self.failures = 0
+        self.state = self.CLOSED
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state == self.CLOSED:
+                self.opened_at = time.monotonic()
+            self.state = self.OPEN
+
+    def half_open(self):
+        self.state = self.HALF_OPEN
+
+    def is_open(self) -> bool:
+        return self.state != self.CLOSED
+
+    def reset(self):
+        self.record_success()
+
+
+class HealthMonitor:
+    """Background prober for the connected database.
+
+    Every interval it pings the backend and records the latency. After failure_threshold
+    failed pings the circuit opens and the monitor reconnects with the arguments of the last
+    /connect, backing off exponentially (with jitter) up to max_backoff seconds.
+    """
+
+    def __init__(self, db_connector, interval: float = None, timeout: float = None,
+                 failure_threshold: int = None, max_backoff: float = None):
+        self.db_connector = db_connector
+        self.interval = interval or Config.HEALTH_CHECK_INTERVAL
+        self.timeout = timeout or Config.HEALTH_CHECK_TIMEOUT
+        self.max_backoff = max_backoff or Config.RECONNECT_MAX_BACKOFF
+        self.breaker = CircuitBreaker(failure_threshold or Config.CIRCUIT_FAILURE_THRESHOLD)
+        self.latencies = deque(maxlen=20)
+        self.last_check: Optional[datetime] = None
+        self.last_error: Optional[str] = None
+        self.reconnect_attempts = 0
+        self.backoff = self.interval
+        self.next_check: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def reset(self):
+        """Forget failures, e.g. after a successful /connect"""
+        self.breaker.reset()
+        self.latencies.clear()
+        self.last_error = None
+        self.reconnect_attempts = 0
+        self.backoff = self.interval
+
+    def check_available(self):
+        """Raise CircuitOpenError while the backend is known to be down"""
+        if self.breaker.is_open():
+            raise CircuitOpenError(
+                f"Database unavailable ({self.last_error or 'health check failed'}); "
+                f"retrying in {self.retry_after()} s"
+            )
+
+    def retry_after(self) -> int:
+        if self.next_check is None:
+            return max(1, int(self.interval))
+        return max(1, int(self.next_check - time.monotonic()))
+
+    async def _run(self):
+        while True:
+            try:
+                delay = await self.probe()
+            except Exception as e:
+                logger.error(f"Health probe failed unexpectedly: {str(e)}")
+                delay = self.interval
+            self.next_check = time.monotonic() + delay
+            await asyncio.sleep(delay)
+
+    async def probe(self) -> float:
+        """One health check (or reconnect attempt); returns the delay until the next one"""
+        if not self.db_connector.is_connected():
+            return self.interval
+        self.last_check = datetime.now()
+
+        if self.breaker.is_open():
+            return await self._try_reconnect()
+
+        connector = self.db_connector.connector
+        started = time.perf_counter()
+        try:
+            healthy = await asyncio.wait_for(connector.test_connection(), self.timeout)
+            error = None if healthy else "ping failed"
+        except asyncio.TimeoutError:
+            healthy, error = False, f"ping timed out after {self.timeout} s"
+        latency = time.perf_counter() - started
+
+        if healthy:
+            self.latencies.append(latency)
+            self.last_error = None
+            self.breaker.record_success()
+            instrumentation.BACKEND_UP.set(1, backend=self.db_connector.get_connection_info().get("type"))
+            return self.interval
+
+        self.last_error = error
+        self.breaker.record_failure()
+        logger.warning(f"Database health check failed ({self.breaker.failures}/{self.breaker.failure_threshold}): {error}")
+        if self.breaker.is_open():
+            instrumentation.BACKEND_UP.set(0, backend=self.db_connector.get_connection_info().get("type"))
+            self.backoff = self.interval
+            return self._next_backoff()
+        return self.interval
+
+    async def _try_reconnect(self) -> float:
+        self.breaker.half_open()
+        self.reconnect_attempts += 1
+        try:
+            await asyncio.wait_for(self.db_connector.reconnect(), self.timeout * 5)
+        except Exception as e:
+            self.last_error = f"reconnect failed: {str(e) or type(e).__name__}"
+            self.breaker.record_failure()
+            logger.warning(f"Reconnect attempt {self.reconnect_attempts} failed: {self.last_error}")
+            return self._next_backoff()
+        logger.info(f"Reconnected after {self.reconnect_attempts} attempt(s)")
+        self.reset()
+        instrumentation.BACKEND_UP.set(1, backend=self.db_connector.get_connection_info().get("type"))
+        return self.interval
+
+    def _next_backoff(self) -> float:
+        delay = self.backoff
+        self.backoff = min(self.backoff * 2, self.max_backoff)
+        # Jitter keeps several workers from reconnecting in lockstep
+        return delay * random.uniform(0.8, 1.2)
+
+    def status(self) -> Dict[str, Any]:
+        latencies = list(self.latencies)
+        return {
+            "state": self.breaker.state,
+            "last_check": self.last_check.isoformat() if self.last_check else None,
+            "latency_ms": round(latencies[-1] * 1000, 3) if latencies else None,
+            "avg_latency_ms": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else None,
+            "consecutive_failures": self.breaker.failures,
+            "reconnect_attempts": self.reconnect_attempts,
+            "last_error": self.last_error,
+            "retry_after_seconds": self.retry_after() if self.breaker.is_open() else None,
+            "check_interval_seconds": self.interval
+        }
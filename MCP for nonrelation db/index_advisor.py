@@ -0,0 +1,301 @@
+import time
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Tuple
+import logging
+
+import query_governor
+import query_profiler
+
+logger = logging.getLogger(__name__)
+
+RANGE_OPERATORS = {"$gt", "$gte", "$lt", "$lte", "$ne", "$nin", "$regex", "$not", "$type", "$mod"}
+EQUALITY_OPERATORS = {"$eq", "$in"}
+# Presence checks select (almost) all or nothing, so a field tested only with these gets no index key
+IGNORED_OPERATORS = {"$exists"}
+
+# Fields that never benefit from a secondary index of their own
+SKIPPED_FIELDS = {"_id"}
+
+
+class QueryShape:
+    """Normalized filter/sort/projection fields of a query, independent of the values used"""
+
+    def __init__(self, collection: str, equality: List[str], sort: List[Tuple[str, int]], range_fields: List[str],
+                 projection: Optional[List[str]] = None):
+        self.collection = collection
+        self.equality = sorted(set(equality))
+        self.sort = sort
+        self.range = sorted(set(range_fields) - set(equality) - {field for field, _ in sort})
+        self.projection = projection or []
+
+    def key(self) -> Tuple:
+        return (self.collection, tuple(self.equality), tuple(self.sort), tuple(self.range))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "collection": self.collection,
+            "equality": self.equality,
+            "sort": [{"field": field, "direction": direction} for field, direction in self.sort],
+            "range": self.range,
+            "projection": self.projection,
+        }
+
+
+def _filter_fields(filter: Dict[str, Any], equality: List[str], range_fields: List[str], prefix: str = ""):
+    """Split a filter document into equality and range field paths"""
+    for field, condition in (filter or {}).items():
+        if field == "$and":
+            for clause in condition:
+                _filter_fields(clause, equality, range_fields, prefix)
+            continue
+        if field.startswith("$"):
+            # $or/$nor/$expr cannot be served by a single compound index prefix
+            continue
+        path = prefix + field
+        if isinstance(condition, dict) and condition and all(key.startswith("$") for key in condition):
+            operators = set(condition) - IGNORED_OPERATORS
+            if operators & RANGE_OPERATORS:
+                range_fields.append(path)
+            elif operators & EQUALITY_OPERATORS:
+                equality.append(path)
+            elif "$elemMatch" in operators:
+                equality.append(path)
+        else:
+            equality.append(path)
+
+
+def shape_from_query(query: Dict[str, Any]) -> Optional[QueryShape]:
+    """Build a shape from a logged query or a system.profile entry"""
+    filter = query.get("filter") or {}
+    sort = query.get("sort") or {}
+    projection = query.get("projection") or {}
+    pipeline = query.get("pipeline") or []
+    # Only the leading $match (and a $sort right after it) can use an index
+    if pipeline:
+        if "$match" in pipeline[0]:
+            filter = pipeline[0]["$match"]
+            if len(pipeline) > 1 and "$sort" in pipeline[1]:
+                sort = pipeline[1]["$sort"]
+        elif "$sort" in pipeline[0]:
+            sort = pipeline[0]["$sort"]
+    equality, range_fields = [], []
+    _filter_fields(filter, equality, range_fields)
+    sort_fields = [(field, 1 if direction >= 0 else -1) for field, direction in sort.items()
+                   if isinstance(direction, (int, float))]
+    equality = [f for f in equality if f not in SKIPPED_FIELDS]
+    range_fields = [f for f in range_fields if f not in SKIPPED_FIELDS]
+    if not equality and not sort_fields and not range_fields:
+        return None
+    collection = query.get("collection") or (query.get("namespace") or "").split(".", 1)[-1]
+    return QueryShape(collection, equality, sort_fields, range_fields,
+                      [f for f, v in projection.items() if v] if isinstance(projection, dict) else [])
+
+
+def cluster_shapes(shapes: List[QueryShape]) -> List[Dict[str, Any]]:
+    """Group shapes that differ only in their values, widest shapes first"""
+    clusters = OrderedDict()
+    for shape in shapes:
+        cluster = clusters.setdefault(shape.key(), {"shape": shape, "count": 0})
+        cluster["count"] += 1
+    return sorted(clusters.values(),
+                  key=lambda c: -(len(c["shape"].equality) + len(c["shape"].sort) + len(c["shape"].range)))
+
+
+def serves_prefix(parent_keys: List[Tuple[str, int]], shape: QueryShape, keys: List[Tuple[str, int]]) -> bool:
+    """True if an index on parent_keys serves this shape through a key prefix"""
+    head = parent_keys[:len(keys)]
+    equality_count = len(shape.equality)
+    # Equality fields may appear in any order at the front of the index
+    if len(head) < len(keys) or {field for field, _ in head[:equality_count]} != set(shape.equality):
+        return False
+    rest, wanted = head[equality_count:], keys[equality_count:]
+    if [field for field, _ in rest] != [field for field, _ in wanted]:
+        return False
+    # Sort directions must match (or all be reversed); range fields work in either direction
+    sort_count = len(wanted) - len(shape.range)
+    have = [direction for _, direction in rest[:sort_count]]
+    want = [direction for _, direction in wanted[:sort_count]]
+    return have == want or have == [-direction for direction in want]
+
+
+def sample_cardinalities(collection, fields: List[str], sample_size: int) -> Dict[str, Any]:
+    """Distinct-value ratios per field from a $sample (blocking)"""
+    documents = list(collection.aggregate([{"$sample": {"size": sample_size}}],
+                                          **query_governor.current_budget().aggregate_options()))
+    result = {"sample_size": len(documents), "fields": {}}
+    for field in fields:
+        values = set()
+        present = 0
+        for document in documents:
+            value = document
+            for part in field.split("."):
+                value = value.get(part) if isinstance(value, dict) else None
+                if value is None:
+                    break
+            if value is not None:
+                present += 1
+                values.add(repr(value))
+        distinct = len(values)
+        result["fields"][field] = {
+            "distinct": distinct,
+            "present_ratio": round(present / len(documents), 4) if documents else 0.0,
+            # Expected fraction of documents matched by one equality value
+            "selectivity": round(1 / distinct, 6) if distinct else 1.0,
+        }
+    return result
+
+
+def propose_index(shape: QueryShape, cardinalities: Dict[str, Any]) -> List[Tuple[str, int]]:
+    """Order fields by the equality-sort-range rule; most selective equality and range fields first"""
+    fields = cardinalities.get("fields", {})
+
+    def selectivity(field):
+        return fields.get(field, {}).get("selectivity", 1.0)
+
+    keys = [(field, 1) for field in sorted(shape.equality, key=selectivity)]
+    keys += [(field, direction) for field, direction in shape.sort if field not in shape.equality]
+    keys += [(field, 1) for field in sorted(shape.range, key=selectivity)]
+    return keys
+
+
+def estimated_selectivity(shape: QueryShape, cardinalities: Dict[str, Any]) -> float:
+    """Fraction of documents an equality lookup on this shape is expected to touch"""
+    result = 1.0
+    for field in shape.equality:
+        result *= cardinalities.get("fields", {}).get(field, {}).get("selectivity", 1.0)
+    return result
+
+
+def _example_filter(shape: QueryShape, document: Dict[str, Any]) -> Dict[str, Any]:
+    """Concrete filter for a shape, with values taken from a sampled document"""
+    filter = {}
+    for field in shape.equality + shape.range:
+        value = document
+        for part in field.split("."):
+            value = value.get(part) if isinstance(value, dict) else None
+        if value is None:
+            continue
+        filter[field] = value if field in shape.equality else {"$gte": value}
+    return filter
+
+
+def simulate_benefit(source_collection, scratch_database, shape: QueryShape, keys: List[Tuple[str, int]],
+                     sample_size: int) -> Dict[str, Any]:
+    """Copy a sample into a scratch collection, build the candidate index there and compare
+    explain("executionStats") for the shape without and with a hint to it (blocking)"""
+    scratch_name = f"advisor_{shape.collection}_{int(time.time() * 1000)}"
+    scratch = scratch_database[scratch_name]
+    try:
+        documents = list(source_collection.aggregate([{"$sample": {"size": sample_size}}],
+                                                     **query_governor.current_budget().aggregate_options()))
+        if not documents:
+            return {"error": "collection is empty"}
+        scratch.insert_many(documents, ordered=False)
+        index_name = scratch.create_index(keys)
+        command = {"find": scratch_name, "filter": _example_filter(shape, documents[0])}
+        if shape.sort:
+            command["sort"] = dict(shape.sort)
+        baseline = query_profiler.summarize_explain(
+            scratch_database.command("explain", dict(command, hint={"$natural": 1}), verbosity="executionStats")
+        )
+        hinted = query_profiler.summarize_explain(
+            scratch_database.command("explain", dict(command, hint=index_name), verbosity="executionStats")
+        )
+        return {
+            "sample_size": len(documents),
+            "filter": command["filter"],
+            "without_index": baseline,
+            "with_index": hinted,
+            "docs_examined_reduction": round(
+                1 - hinted["docs_examined"] / baseline["docs_examined"], 4) if baseline["docs_examined"] else 0.0,
+        }
+    finally:
+        scratch.drop()
+
+
+class IndexAdvisor:
+    """Derives compound index suggestions from observed MongoDB query shapes"""
+
+    def __init__(self, sample_size: int = 1000, max_suggestions: int = 20):
+        self.sample_size = sample_size
+        self.max_suggestions = max_suggestions
+
+    def collect_shapes(self, database_name: str, profiled: Optional[List[Dict[str, Any]]] = None) -> List[QueryShape]:
+        """Shapes from our own query log plus any system.profile entries"""
+        shapes = []
+        for query in query_profiler.query_log.queries(database_name) + list(profiled or []):
+            shape = shape_from_query(query)
+            if shape and shape.collection and not shape.collection.startswith("system."):
+                shapes.append(shape)
+        return shapes
+
+    def advise(self, database, profiled: Optional[List[Dict[str, Any]]] = None, simulate: bool = False,
+               scratch_database=None) -> Dict[str, Any]:
+        """Cluster shapes and propose ESR-ordered indexes not already covered (blocking)"""
+        clusters = cluster_shapes(self.collect_shapes(database.name, profiled))
+        existing = {}
+        cardinalities = {}
+        suggestions = []
+        for cluster in clusters:
+            shape = cluster["shape"]
+            collection = database[shape.collection]
+            if shape.collection not in existing:
+                existing[shape.collection] = [list(index["key"].items()) for index in collection.list_indexes()]
+                fields = set()
+                for other in clusters:
+                    if other["shape"].collection == shape.collection:
+                        fields.update(other["shape"].equality + other["shape"].range)
+                cardinalities[shape.collection] = sample_cardinalities(collection, sorted(fields), self.sample_size)
+            keys = propose_index(shape, cardinalities[shape.collection])
+
+            # Narrower shapes fold into a wider suggestion whose index already serves them
+            parent = next((s for s in suggestions if s["collection"] == shape.collection
+                           and serves_prefix(list(s["index"].items()), shape, keys)), None)
+            if parent is not None:
+                parent["query_count"] += cluster["count"]
+                parent["covers"].append(shape.to_dict())
+                continue
+
+            suggestion = {
+                "collection": shape.collection,
+                "index": OrderedDict(keys),
+                "shape": shape.to_dict(),
+                "query_count": cluster["count"],
+                "covers": [],
+                "estimated_selectivity": estimated_selectivity(shape, cardinalities[shape.collection]),
+            }
+            existing_index = next((index_keys for index_keys in existing[shape.collection]
+                                   if serves_prefix(index_keys, shape, keys)), None)
+            if existing_index:
+                suggestion["already_covered_by"] = OrderedDict(existing_index)
+            suggestions.append(suggestion)
+
+        if simulate and scratch_database is not None:
+            for suggestion in suggestions[:self.max_suggestions]:
+                if "already_covered_by" in suggestion:
+                    continue
+                shape = next(c["shape"] for c in clusters if c["shape"].to_dict() == suggestion["shape"])
+                try:
+                    suggestion["simulation"] = simulate_benefit(
+                        database[shape.collection], scratch_database, shape, list(suggestion["index"].items()),
+                        self.sample_size)
+                except query_governor.QueryBudgetExceeded:
+                    raise
+                except Exception as e:
+                    suggestion["simulation"] = {"error": str(e)}
+
+        # Most frequent and most selective shapes first
+        suggestions.sort(key=lambda s: ("already_covered_by" in s, -s["query_count"], s["estimated_selectivity"]))
+        new = [s for s in suggestions if "already_covered_by" not in s][:self.max_suggestions]
+        return {
+            "shapes_observed": sum(c["count"] for c in clusters),
+            "clusters": len(clusters),
+            "suggestions": new,
+            "already_covered": [s for s in suggestions if "already_covered_by" in s],
+            "cardinalities": cardinalities,
+            "recommendations": [
+                f"{s['collection']}: create index {dict(s['index'])} "
+                f"(serves {s['query_count']} observed queries, est. selectivity {s['estimated_selectivity']:.4g})"
+                for s in new
+            ],
+        }
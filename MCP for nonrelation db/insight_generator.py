@@ -1,12 +1,13 @@
 import asyncio
 import json
-import pandas as pd
-import numpy as np
 from typing import Dict, List, Any, Optional, Union
 import logging
 from datetime import datetime, timedelta
 import re
+import time
 
+import instrumentation
+from config import Config
 from database_analyzer import DatabaseAnalyzer
 
 logger = logging.getLogger(__name__)
@@ -17,28 +18,38 @@ class InsightGenerator:
     def __init__(self):
         self.db_connector = None
         self.db_analyzer = None
-        self.insights_cache = {}
+        self.insights_cache = {}  # insight_type -> (expires_at, insights)
     
     def set_connector(self, connector):
         """Set the database connector"""
         self.db_connector = connector
+        self.clear_cache()
+    
+    def clear_cache(self):
+        """Drop cached insights"""
+        self.insights_cache.clear()
     
     def set_analyzer(self, analyzer):
         """Set the database analyzer"""
         self.db_analyzer = analyzer
     
-    async def generate_insights(self, insight_type: Optional[str] = None) -> Dict[str, Any]:
-        """Generate insights from the database"""
+    @instrumentation.staged("insights")
+    async def generate_insights(self, insight_type: Optional[str] = None, use_cache: bool = True) -> Dict[str, Any]:
+        """Generate insights from the database; results are cached for ANALYSIS_CACHE_TTL seconds"""
         
         if not self.db_connector or not self.db_connector.is_connected():
             raise RuntimeError("No database connected")
         
+        cached = self.insights_cache.get(insight_type)
+        if use_cache and cached and cached[0] > time.monotonic():
+            return cached[1]
+        
         if not self.db_analyzer:
             self.db_analyzer = DatabaseAnalyzer()
             self.db_analyzer.set_connector(self.db_connector)
         
         # Perform comprehensive analysis first
-        analysis = await self.db_analyzer.comprehensive_analysis()
+        analysis = await self.db_analyzer.analyze("comprehensive", use_cache=use_cache)
         
         # Generate insights based on analysis
         insights = {
@@ -53,8 +64,10 @@ class InsightGenerator:
         }
         
         if insight_type:
-            return {insight_type: insights.get(insight_type, {})}
+            insights = {insight_type: insights.get(insight_type, {})}
         
+        if Config.ANALYSIS_CACHE_TTL > 0:
+            self.insights_cache[insight_type] = (time.monotonic() + Config.ANALYSIS_CACHE_TTL, insights)
         return insights
     
     async def _generate_summary_insights(self, analysis: Dict[str, Any]) -> Dict[str, Any]:
@@ -204,7 +217,11 @@ class InsightGenerator:
                     performance_insights["storage_analysis"]["storage_efficiency"] = round(efficiency, 2)
                 
                 # Optimization opportunities
-                if performance_insights["database_performance"].get("index_count", 0) == 0:
+                index_advice = perf.get("index_advice", {})
+                if index_advice.get("recommendations"):
+                    performance_insights["query_performance"]["index_suggestions"] = index_advice.get("suggestions", [])
+                    performance_insights["optimization_opportunities"].extend(index_advice["recommendations"])
+                elif performance_insights["database_performance"].get("index_count", 0) == 0:
                     performance_insights["optimization_opportunities"].append(
                         "Add indexes to improve query performance"
                     )
@@ -0,0 +1,348 @@
+import asyncio
+import bisect
+import contextvars
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Any, Optional, Tuple
+import logging
+
+import executors
+
+try:
+    import bson
+    BSON_AVAILABLE = True
+except ImportError:
+    BSON_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Result bytes are extrapolated from this many evenly spaced documents, to keep sizing cheap
+SIZE_SAMPLE_DOCUMENTS = 16
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    """Prometheus-style cumulative histogram with labels"""
+
+    def __init__(self, name: str, description: str, label_names: Tuple[str, ...],
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.description = description
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            # Per-bucket counts followed by the +Inf count, sum and total count
+            series = self._series.setdefault(key, [0] * (len(self.buckets) + 1) + [0.0, 0])
+            series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {key: list(values) for key, values in self._series.items()}
+        for key, values in sorted(series.items()):
+            labels = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(self.label_names, key))
+            prefix = labels + "," if labels else ""
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+            cumulative += values[len(self.buckets)]
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{labels}}} {values[-2]}")
+            lines.append(f"{self.name}_count{{{labels}}} {values[-1]}")
+        return lines
+
+
+class Counter:
+    """Prometheus-style monotonic counter with labels"""
+
+    def __init__(self, name: str, description: str, label_names: Tuple[str, ...]):
+        self.name = name
+        self.description = description
+        self.label_names = label_names
+        self._series: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, value: float = 1, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            series = dict(self._series)
+        for key, value in sorted(series.items()):
+            labels = ",".join(f'{name}="{_escape(v)}"' for name, v in zip(self.label_names, key))
+            lines.append(f"{self.name}{{{labels}}} {value}")
+        return lines
+
+
+class Gauge:
+    """Prometheus-style gauge with labels"""
+
+    def __init__(self, name: str, description: str, label_names: Tuple[str, ...]):
+        self.name = name
+        self.description = description
+        self.label_names = label_names
+        self._series: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def set(self, value: float, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        with self._lock:
+            self._series[key] = value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} gauge"]
+        with self._lock:
+            series = dict(self._series)
+        for key, value in sorted(series.items()):
+            labels = ",".join(f'{name}="{_escape(v)}"' for name, v in zip(self.label_names, key))
+            lines.append(f"{self.name}{{{labels}}} {value}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "mcp_http_request_duration_seconds", "HTTP request latency by route", ("method", "route", "status"))
+DB_ROUNDTRIP_SECONDS = Histogram(
+    "mcp_db_roundtrip_seconds", "Database round-trip latency by operation", ("backend", "operation"))
+EXECUTOR_QUEUE_WAIT_SECONDS = Histogram(
+    "mcp_executor_queue_wait_seconds", "Time blocking driver calls waited for an executor thread", ("backend",))
+STAGE_SECONDS = Histogram(
+    "mcp_analysis_stage_duration_seconds", "Analyzer stage latency", ("stage",))
+DB_DOCUMENTS_RETURNED = Counter(
+    "mcp_db_documents_returned_total", "Documents returned by database calls", ("backend", "operation"))
+DB_BYTES_RETURNED = Counter(
+    "mcp_db_bytes_returned_total", "Approximate BSON bytes returned by database calls", ("backend", "operation"))
+BACKEND_UP = Gauge(
+    "mcp_backend_up", "1 while the health monitor can reach the database, 0 while its circuit is open", ("backend",))
+POOL_CHECKOUT_WAIT_SECONDS = Histogram(
+    "mcp_pool_checkout_wait_seconds", "Time spent waiting for a pooled database connection", ("backend",))
+POOL_CONNECTIONS = Gauge(
+    "mcp_pool_connections", "Pooled database connections by state (open, in_use, idle, waiting)", ("backend", "state"))
+EXECUTOR_THREADS = Gauge(
+    "mcp_executor_threads", "Executor calls by state (active, queued) and limits (max_workers, max_queue)",
+    ("executor", "state"))
+EXECUTOR_REJECTED = Counter(
+    "mcp_executor_rejected_total", "Blocking calls rejected because the executor queue was full", ("executor",))
+
+METRICS = [HTTP_REQUEST_SECONDS, DB_ROUNDTRIP_SECONDS, EXECUTOR_QUEUE_WAIT_SECONDS, STAGE_SECONDS,
+           DB_DOCUMENTS_RETURNED, DB_BYTES_RETURNED, BACKEND_UP, POOL_CHECKOUT_WAIT_SECONDS, POOL_CONNECTIONS,
+           EXECUTOR_THREADS, EXECUTOR_REJECTED]
+
+
+def update_executor_gauges():
+    """Copy the executors' current load into EXECUTOR_THREADS"""
+    for name, stats in executors.snapshot().items():
+        for state in ("active", "queued", "max_workers", "max_queue"):
+            EXECUTOR_THREADS.set(stats[state], executor=name, state=state)
+
+
+def render_metrics() -> str:
+    """Render every registered metric in the Prometheus text exposition format"""
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+class Span:
+    """A timed unit of work (analyzer stage or database call) within a trace"""
+
+    __slots__ = ("name", "parent", "kind", "started", "duration", "queue_wait",
+                 "docs_examined", "docs_returned", "bytes_returned", "error")
+
+    def __init__(self, name: str, parent: Optional[str], kind: str):
+        self.name = name
+        self.parent = parent
+        self.kind = kind
+        self.started = time.perf_counter()
+        self.duration = 0.0
+        self.queue_wait = 0.0
+        self.docs_examined: Optional[int] = None
+        self.docs_returned: Optional[int] = None
+        self.bytes_returned: Optional[int] = None
+        self.error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        result = {"name": self.name, "kind": self.kind, "duration_ms": round(self.duration * 1000, 3)}
+        if self.parent:
+            result["parent"] = self.parent
+        if self.kind == "db":
+            result["queue_wait_ms"] = round(self.queue_wait * 1000, 3)
+        for field in ("docs_examined", "docs_returned", "bytes_returned", "error"):
+            value = getattr(self, field)
+            if value is not None:
+                result[field] = value
+        return result
+
+
+class Trace:
+    """Collects the spans recorded while handling one request"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans: List[Span] = []
+
+    def summary(self) -> Dict[str, Any]:
+        db_spans = [span for span in self.spans if span.kind == "db"]
+        summary = {
+            "total_ms": round((time.perf_counter() - self.started) * 1000, 3),
+            "db_round_trips": len(db_spans),
+            "db_time_ms": round(sum(span.duration for span in db_spans) * 1000, 3),
+            "queue_wait_ms": round(sum(span.queue_wait for span in db_spans) * 1000, 3),
+            "bytes_returned": sum(span.bytes_returned or 0 for span in db_spans),
+            "spans": [span.to_dict() for span in self.spans],
+        }
+        # Only known for calls that read a query plan; left out rather than guessed
+        examined = [span.docs_examined for span in db_spans if span.docs_examined is not None]
+        if examined:
+            summary["docs_examined"] = sum(examined)
+        return summary
+
+
+_current_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("mcp_trace", default=None)
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("mcp_span", default=None)
+
+
+@contextmanager
+def trace():
+    """Collect spans for the enclosed work; yields the Trace"""
+    current = Trace()
+    token = _current_trace.set(current)
+    try:
+        yield current
+    finally:
+        _current_trace.reset(token)
+
+
+@contextmanager
+def span(name: str, kind: str = "stage"):
+    """Time a stage; nested spans and database calls record it as their parent"""
+    parent = _current_span.get()
+    current = Span(name, parent.name if parent else None, kind)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except Exception as e:
+        current.error = str(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        if not current.duration:
+            current.duration = time.perf_counter() - current.started
+        if kind == "stage":
+            STAGE_SECONDS.observe(current.duration, stage=name)
+        active = _current_trace.get()
+        if active is not None:
+            active.spans.append(current)
+
+
+def staged(name: str):
+    """Decorator that runs an async analyzer method inside a stage span"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with span(name):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _measure_result(result: Any) -> Tuple[Optional[int], Optional[int], Optional[int]]:
+    """Return (documents, approximate bytes, documents examined) for a driver result.
+
+    Bytes are the mean BSON size of at most SIZE_SAMPLE_DOCUMENTS documents times the count.
+    Documents examined are only known for explain output (executionStats)."""
+    if isinstance(result, dict):
+        documents = [result]
+    elif isinstance(result, list):
+        documents = result
+    else:
+        return None, None, None
+    size = None
+    if BSON_AVAILABLE and documents and isinstance(documents[0], dict):
+        step = max(1, len(documents) // SIZE_SAMPLE_DOCUMENTS)
+        sample = documents[::step][:SIZE_SAMPLE_DOCUMENTS]
+        try:
+            size = round(sum(len(bson.encode(doc)) for doc in sample) / len(sample) * len(documents))
+        except Exception:
+            size = None
+    examined = None
+    if isinstance(result, dict) and isinstance(result.get("executionStats"), dict):
+        examined = result["executionStats"].get("totalDocsExamined")
+    return len(documents), size, examined
+
+
+def _record_db_span(current: Span, backend: str, operation: str, measured: Tuple[Optional[int], ...]):
+    DB_ROUNDTRIP_SECONDS.observe(current.duration, backend=backend, operation=operation)
+    documents, size, examined = measured
+    if documents is not None:
+        current.docs_returned = documents
+        DB_DOCUMENTS_RETURNED.inc(documents, backend=backend, operation=operation)
+    if size is not None:
+        current.bytes_returned = size
+        DB_BYTES_RETURNED.inc(size, backend=backend, operation=operation)
+    if examined is not None:
+        current.docs_examined = examined
+
+
+async def run_in_executor(backend: str, operation: str, func, *args, executor=None):
+    """Run a blocking driver call in an executor (the backend's own by default), timing queue
+    wait and round-trip separately; raises ExecutorSaturated when its queue is full"""
+    if executor is None:
+        executor = executors.executor_for(backend)
+    loop = asyncio.get_running_loop()
+    submitted = time.perf_counter()
+    started = []
+    measured = []
+    # Executor threads do not inherit context variables; carry them over (e.g. the query budget)
+    context = contextvars.copy_context()
+
+    def call():
+        started.append(time.perf_counter())
+        result = context.run(func, *args)
+        finished = time.perf_counter()
+        # Sized on the worker thread, outside the timed round-trip, to keep it off the event loop
+        measured.append((finished, _measure_result(result)))
+        return result
+
+    with span(f"{backend}.{operation}", kind="db") as current:
+        try:
+            result = await loop.run_in_executor(executor, call)
+        except executors.ExecutorSaturated:
+            EXECUTOR_REJECTED.inc(executor=executor.name)
+            raise
+        finally:
+            if started:
+                current.queue_wait = started[0] - submitted
+                EXECUTOR_QUEUE_WAIT_SECONDS.observe(current.queue_wait, backend=backend)
+        finished, measurement = measured[0]
+        current.duration = finished - started[0]
+        _record_db_span(current, backend, operation, measurement)
+    return result
+
+
+async def timed(backend: str, operation: str, awaitable):
+    """Time a native-async driver call (redis.asyncio, AsyncElasticsearch)"""
+    with span(f"{backend}.{operation}", kind="db") as current:
+        result = await awaitable
+        current.duration = time.perf_counter() - current.started
+        _record_db_span(current, backend, operation, _measure_result(result))
+    return result
@@ -1,24 +1,57 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import Dict, List, Any, Optional
 import uvicorn
 import asyncio
 import json
+import logging
 import os
+import time
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 
-from database_connectors import DatabaseConnector
+from config import Config
+from database_connectors import DatabaseConnector, available_backends
 from database_analyzer import DatabaseAnalyzer
 from insight_generator import InsightGenerator
 from chat_interface import ChatInterface
+import analysis_workers
+import executors
+import instrumentation
+import query_governor
+import shared_state
+from health_monitor import HealthMonitor, CircuitOpenError
+from serialization import BSONJSONResponse, ETagMemo, conditional_response, dumps
+
+# Brotli is optional; it falls back to gzip for clients that do not accept br
+try:
+    from brotli_asgi import BrotliMiddleware
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Probe the connected database in the background for the lifetime of the server
+    health_monitor.start()
+    yield
+    await health_monitor.stop()
+    executors.shutdown()
+    analysis_workers.shutdown()
+
 app = FastAPI(
     title="MCP Non-Relational Database Analyzer",
     description="Model Context Protocol for analyzing non-relational databases and providing insights",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=BSONJSONResponse,
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -30,14 +63,150 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Response compression for the large analysis payloads
+COMPRESSION_MINIMUM_SIZE = int(os.getenv("COMPRESSION_MINIMUM_SIZE", 1024))
+if BROTLI_AVAILABLE:
+    app.add_middleware(BrotliMiddleware, minimum_size=COMPRESSION_MINIMUM_SIZE, gzip_fallback=True)
+else:
+    app.add_middleware(GZipMiddleware, minimum_size=COMPRESSION_MINIMUM_SIZE)
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    """Record endpoint latency, labelled by route template to keep cardinality bounded"""
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        instrumentation.HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - started,
+            method=request.method,
+            route=route.path if route else "unmatched",
+            status=status
+        )
+
 # Global instances
 db_connector = DatabaseConnector()
 db_analyzer = DatabaseAnalyzer()
 db_analyzer.set_connector(db_connector)  # Set the connector
 insight_generator = InsightGenerator()
 insight_generator.set_connector(db_connector)  # Set the connector
+insight_generator.set_analyzer(db_analyzer)  # Share the analyzer so one cache is cleared on connect
 chat_interface = ChatInterface()
 chat_interface.set_connector(db_connector)  # Set the connector
+chat_interface.set_analyzer(db_analyzer)
+etag_memo = ETagMemo()  # Encoded bodies and ETags of cached results
+health_monitor = HealthMonitor(db_connector)
+# Connection settings and analysis results shared by the worker processes (None with a single worker)
+shared_store = shared_state.get_store()
+db_analyzer.set_shared_store(shared_store)
+
+def reset_connection_state():
+    """Drop everything cached for the previous connection"""
+    db_analyzer.clear_cache()
+    insight_generator.clear_cache()
+    etag_memo.clear()
+    health_monitor.reset()
+
+# A worker that failed to adopt a shared connection waits this long before trying it again
+SHARED_CONNECTION_RETRY_SECONDS = 5
+_shared_connection_lock = asyncio.Lock()
+_failed_adoption = {"connection_id": None, "at": 0.0}
+
+async def sync_shared_connection():
+    """Adopt the connection another worker opened through /connect (multi-worker mode only)"""
+    if shared_store is None:
+        return
+    try:
+        connection_id, connect_args = shared_store.read_connection()
+    except Exception as e:
+        logger.warning(f"Reading the shared connection failed: {str(e)}")
+        return
+    if connection_id is None or connection_id == db_connector.connection_id:
+        return
+    async with _shared_connection_lock:
+        if connection_id == db_connector.connection_id:
+            return
+        if (_failed_adoption["connection_id"] == connection_id
+                and time.monotonic() - _failed_adoption["at"] < SHARED_CONNECTION_RETRY_SECONDS):
+            return
+        try:
+            await db_connector.connect(**shared_state.restore_credentials(connect_args),
+                                       connection_id=connection_id)
+        except Exception as e:
+            _failed_adoption.update(connection_id=connection_id, at=time.monotonic())
+            logger.error(f"Adopting the shared {connect_args.get('db_type')} connection failed: {str(e)}")
+            return
+        reset_connection_state()
+
+# Retry-After for requests shed because the backend's executor queue is full
+EXECUTOR_RETRY_AFTER_SECONDS = 1
+
+async def require_available_database():
+    """Fail fast with 503 while the health monitor's circuit is open or the backend's executor is saturated"""
+    await sync_shared_connection()
+    try:
+        health_monitor.check_available()
+    except CircuitOpenError as e:
+        raise HTTPException(status_code=503, detail=str(e),
+                            headers={"Retry-After": str(health_monitor.retry_after())})
+    backend = db_connector.get_connection_info().get("type")
+    if backend and executors.is_saturated(backend):
+        raise HTTPException(status_code=503, detail=f"The {backend} executor is saturated; retry shortly",
+                            headers={"Retry-After": str(EXECUTOR_RETRY_AFTER_SECONDS)})
+
+def analysis_http_error(e: Exception) -> HTTPException:
+    """Status for a failed analysis request: 504 when its time budget ran out, 503 while the
+    backend's executor is saturated, 500 otherwise"""
+    if isinstance(e, HTTPException):
+        return e
+    if isinstance(e, query_governor.QueryBudgetExceeded):
+        return HTTPException(status_code=504, detail=str(e))
+    if isinstance(e, executors.ExecutorSaturated):
+        return HTTPException(status_code=503, detail=str(e),
+                             headers={"Retry-After": str(EXECUTOR_RETRY_AFTER_SECONDS)})
+    return HTTPException(status_code=500, detail=str(e))
+
+# How often a long request checks whether its client is still connected
+DISCONNECT_POLL_SECONDS = 0.5
+
+async def cancel_on_disconnect(request: Request, awaitable):
+    """Await the work, cancelling it (and so killing its server-side queries) if the client goes away"""
+    task = asyncio.ensure_future(awaitable)
+    while True:
+        done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_SECONDS)
+        if done:
+            return task.result()
+        if await request.is_disconnected():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+            # Nobody reads this response; 499 marks the request as abandoned in the latency metrics
+            raise HTTPException(status_code=499, detail="Client disconnected")
+
+class PoolSettings(BaseModel):
+    # Unset fields fall back to the POOL_* settings, then to the driver defaults
+    max_pool_size: Optional[int] = None
+    min_pool_size: Optional[int] = None
+    max_idle_seconds: Optional[float] = None
+    connect_timeout_seconds: Optional[float] = None
+    socket_timeout_seconds: Optional[float] = None
+    read_preference: Optional[str] = None  # MongoDB, e.g. "secondaryPreferred"
+    compressors: Optional[List[str]] = None  # MongoDB zstd/snappy/zlib, Cassandra lz4/snappy, Elasticsearch gzip
+
+class AnalyticsSettings(BaseModel):
+    # MongoDB only; unset fields fall back to the ANALYTICS_* settings
+    uri: Optional[str] = None  # Separate analytics node or cluster for analysis reads
+    read_preference: Optional[str] = None  # e.g. "secondary", "secondaryPreferred", "nearest"
+    tag_sets: Optional[List[Dict[str, str]]] = None  # e.g. [{"nodeType": "ANALYTICS"}, {}]
+    max_staleness_seconds: Optional[int] = None  # At least 90
+    read_concern: Optional[str] = None  # e.g. "local", "majority"
+    allow_disk_use: Optional[bool] = None  # Let large aggregations spill to disk
 
 class DatabaseConnectionRequest(BaseModel):
     db_type: str  # mongodb, redis, cassandra, elasticsearch
@@ -46,6 +215,8 @@ class DatabaseConnectionRequest(BaseModel):
     username: Optional[str] = None
     password: Optional[str] = None
     additional_params: Optional[Dict[str, Any]] = None
+    pool: Optional[PoolSettings] = None
+    analytics: Optional[AnalyticsSettings] = None
 
 class ChatRequest(BaseModel):
     message: str
@@ -54,6 +225,18 @@ class ChatRequest(BaseModel):
 class AnalysisRequest(BaseModel):
     analysis_type: str  # "schema", "data_quality", "performance", "business_insights"
     filters: Optional[Dict[str, Any]] = None
+    include_timings: bool = False  # Add per-stage and per-query timings to the response
+    use_cache: bool = True  # Serve from the analysis cache (ANALYSIS_CACHE_TTL) when possible
+    timeout_seconds: Optional[float] = None  # Time budget for all queries, capped by ANALYSIS_TIMEOUT_SECONDS
+    max_docs_scanned: Optional[int] = None  # Per-query scan cap, capped by ANALYSIS_MAX_DOCS_SCANNED
+
+class QueryRequest(BaseModel):
+    # mongodb: collection + filter/projection/sort/limit or pipeline; redis: command + args, or match;
+    # cassandra: cql + params; elasticsearch: index + query/sort
+    query: Dict[str, Any]
+    batch_size: Optional[int] = None  # Capped by QUERY_BATCH_SIZE
+    max_results: Optional[int] = None  # Capped by QUERY_MAX_RESULTS
+    timeout_ms: Optional[int] = None  # Server-side time limit, capped by QUERY_TIMEOUT_MS
 
 @app.get("/")
 async def root():
@@ -65,7 +248,12 @@ async def root():
             "/analyze": "Analyze database structure and content",
             "/insights": "Generate business insights",
             "/chat": "Chat with the database",
-            "/health": "Health check"
+            "/query": "Run a read-only query, streamed as NDJSON",
+            "/health": "Health check",
+            "/metrics": "Prometheus metrics",
+            "/backends": "Supported backends and their capabilities",
+            "/pool": "Connection pool settings and utilization",
+            "/executors": "Executor thread pools and queue depth"
         }
     }
 
@@ -79,8 +267,13 @@ async def connect_database(request: DatabaseConnectionRequest):
             database_name=request.database_name,
             username=request.username,
             password=request.password,
-            additional_params=request.additional_params
+            additional_params=request.additional_params,
+            pool=request.pool.model_dump(exclude_none=True) if request.pool else None,
+            analytics=request.analytics.model_dump(exclude_none=True) if request.analytics else None
         )
+        reset_connection_state()
+        if shared_store is not None:
+            shared_store.publish_connection(db_connector.connection_id, db_connector.connect_args)
         
         return {
             "status": "success",
@@ -90,102 +283,211 @@ async def connect_database(request: DatabaseConnectionRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/analyze")
-async def analyze_database(request: AnalysisRequest):
-    """Analyze the connected database"""
+@app.post("/analyze", dependencies=[Depends(require_available_database)])
+async def analyze_database(request: AnalysisRequest, http_request: Request):
+    """Analyze the connected database; answers 304 when If-None-Match matches the cached result"""
     try:
         if not db_connector.is_connected():
             raise HTTPException(status_code=400, detail="No database connected")
         
-        analysis_result = await db_analyzer.analyze(
-            analysis_type=request.analysis_type,
-            filters=request.filters
-        )
+        with instrumentation.trace() as trace, \
+                query_governor.budget(request.timeout_seconds, request.max_docs_scanned):
+            analysis_result = await cancel_on_disconnect(http_request, db_analyzer.analyze(
+                analysis_type=request.analysis_type,
+                filters=request.filters,
+                use_cache=request.use_cache
+            ))
         
-        return {
+        response = {
             "status": "success",
             "analysis_type": request.analysis_type,
             "results": analysis_result
         }
+        if request.include_timings:
+            response["timings"] = trace.summary()
+            return BSONJSONResponse(response)
+        key = f"/analyze:{request.analysis_type}:{json.dumps(request.filters or {}, sort_keys=True, default=str)}"
+        body, etag = etag_memo.encode(key, response, identity=analysis_result)
+        return conditional_response(http_request, body, etag)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise analysis_http_error(e)
 
-@app.get("/insights")
-async def generate_insights():
-    """Generate business insights from the database"""
+@app.get("/insights", dependencies=[Depends(require_available_database)])
+async def generate_insights(request: Request, timings: bool = False):
+    """Generate business insights from the database; supports If-None-Match"""
     try:
         if not db_connector.is_connected():
             raise HTTPException(status_code=400, detail="No database connected")
         
-        insights = await insight_generator.generate_insights()
+        with instrumentation.trace() as trace, query_governor.budget():
+            insights = await cancel_on_disconnect(request, insight_generator.generate_insights())
         
-        return {
+        response = {
             "status": "success",
             "insights": insights
         }
+        if timings:
+            response["timings"] = trace.summary()
+            return BSONJSONResponse(response)
+        body, etag = etag_memo.encode("/insights", response, identity=insights)
+        return conditional_response(request, body, etag)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise analysis_http_error(e)
 
-@app.post("/chat")
-async def chat_with_database(request: ChatRequest):
+@app.post("/chat", dependencies=[Depends(require_available_database)])
+async def chat_with_database(request: ChatRequest, http_request: Request):
     """Chat with the database using natural language"""
     try:
         if not db_connector.is_connected():
             raise HTTPException(status_code=400, detail="No database connected")
         
-        response = await chat_interface.chat(
-            message=request.message,
-            session_id=request.session_id
-        )
+        with query_governor.budget():
+            response = await cancel_on_disconnect(http_request, chat_interface.chat(
+                message=request.message,
+                session_id=request.session_id
+            ))
         
-        return {
+        return BSONJSONResponse({
             "status": "success",
             "response": response,
             "session_id": response.get("session_id")
-        }
+        })
+    except Exception as e:
+        raise analysis_http_error(e)
+
+@app.post("/query", dependencies=[Depends(require_available_database)])
+async def run_query(request: QueryRequest):
+    """Run a read-only query and stream the results as NDJSON, one record per line"""
+    if not db_connector.is_connected():
+        raise HTTPException(status_code=400, detail="No database connected")
+    
+    batches = db_connector.execute_query(request.query, request.batch_size, request.max_results, request.timeout_ms)
+    # Pull the first batch here so invalid queries get a proper status code instead of a broken stream
+    try:
+        first = await batches.__anext__()
+    except StopAsyncIteration:
+        first = None
+    except (ValueError, NotImplementedError) as e:
+        await batches.aclose()
+        raise HTTPException(status_code=400, detail=str(e))
+    except executors.ExecutorSaturated as e:
+        await batches.aclose()
+        raise HTTPException(status_code=503, detail=str(e),
+                            headers={"Retry-After": str(EXECUTOR_RETRY_AFTER_SECONDS)})
     except Exception as e:
+        await batches.aclose()
         raise HTTPException(status_code=500, detail=str(e))
+    
+    async def ndjson():
+        try:
+            if first is None:
+                return
+            yield b"".join(dumps(record) + b"\n" for record in first)
+            async for batch in batches:
+                yield b"".join(dumps(record) + b"\n" for record in batch)
+        except Exception as e:
+            # Headers are already sent; report the failure as the last line
+            yield dumps({"error": str(e)}) + b"\n"
+        finally:
+            await batches.aclose()
+    
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
 
 @app.get("/health")
 async def health_check():
-    """Health check endpoint"""
+    """Health check endpoint: connection state, circuit breaker and measured ping latency"""
+    await sync_shared_connection()
+    connected = db_connector.is_connected()
+    return {
+        "status": "unhealthy" if connected and health_monitor.breaker.is_open() else "healthy",
+        "database_connected": connected,
+        "database_type": db_connector.get_connection_info().get("type") if connected else None,
+        "connection": health_monitor.status() if connected else None
+    }
+
+@app.get("/backends")
+async def get_backends():
+    """Registered database backends, whether their driver is installed, and their capabilities"""
+    await sync_shared_connection()
     return {
-        "status": "healthy",
-        "database_connected": db_connector.is_connected(),
-        "database_type": db_connector.get_connection_info().get("type") if db_connector.is_connected() else None
+        "backends": available_backends(),
+        "connected": db_connector.get_connection_info().get("type") if db_connector.is_connected() else None
     }
 
-@app.get("/schema")
-async def get_schema():
-    """Get database schema information"""
+@app.get("/pool")
+async def get_pool_stats():
+    """Pool settings, driver options and utilization of the current connection"""
+    await sync_shared_connection()
+    if not db_connector.is_connected():
+        raise HTTPException(status_code=400, detail="No database connected")
+    return {
+        "status": "success",
+        "pool": db_connector.pool_stats()
+    }
+
+@app.get("/executors")
+async def get_executor_stats():
+    """Thread pools for blocking driver calls: size, queue limit, active and queued calls, rejections"""
+    return {
+        "status": "success",
+        "executors": executors.snapshot()
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus metrics: endpoint latency, database round-trips, executor queue wait, pool usage"""
+    await sync_shared_connection()
+    if db_connector.is_connected():
+        db_connector.pool_stats()  # Refresh the pool gauges
+    instrumentation.update_executor_gauges()
+    return PlainTextResponse(instrumentation.render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.get("/schema", dependencies=[Depends(require_available_database)])
+async def get_schema(request: Request, timings: bool = False, include_samples: bool = False):
+    """Get database schema information; sample documents are opt-in and truncated"""
     try:
         if not db_connector.is_connected():
             raise HTTPException(status_code=400, detail="No database connected")
         
-        schema = await db_analyzer.get_schema()
+        with instrumentation.trace() as trace, query_governor.budget():
+            schema = await cancel_on_disconnect(request, db_analyzer.get_schema(include_samples=include_samples))
         
-        return {
+        response = {
             "status": "success",
             "schema": schema
         }
+        if timings:
+            response["timings"] = trace.summary()
+            return BSONJSONResponse(response)
+        body, etag = etag_memo.encode(f"/schema:{include_samples}", response, identity=schema)
+        return conditional_response(request, body, etag)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise analysis_http_error(e)
 
-@app.get("/collections")
-async def get_collections():
-    """Get list of collections/tables"""
+@app.get("/collections", dependencies=[Depends(require_available_database)])
+async def get_collections(request: Request):
+    """Get list of collections/tables; supports If-None-Match"""
     try:
         if not db_connector.is_connected():
             raise HTTPException(status_code=400, detail="No database connected")
         
         collections = await db_analyzer.get_collections()
         
-        return {
+        body, etag = etag_memo.encode("/collections", {
             "status": "success",
             "collections": collections
-        }
+        }, identity=collections)
+        return conditional_response(request, body, etag)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise analysis_http_error(e)
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
+    if shared_store is not None:
+        # Start without the connection and results of a previous run
+        shared_store.clear(shared_state.CONNECTION_NAMESPACE)
+        shared_store.clear(shared_state.ANALYSIS_NAMESPACE)
+    if Config.WORKERS > 1:
+        # Each worker process imports the app itself and adopts the connection from the shared store
+        uvicorn.run("main:app", host=Config.HOST, port=Config.PORT, workers=Config.WORKERS)
+    else:
+        uvicorn.run(app, host=Config.HOST, port=Config.PORT) 
\ No newline at end of file
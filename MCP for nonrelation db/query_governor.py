@@ -0,0 +1,154 @@
+import contextvars
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, List, Any, Optional
+import logging
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(TimeoutError):
+    """Raised when an analysis has used up its time budget"""
+
+
+class QueryBudget:
+    """Time and scan limits shared by all queries of one analysis request.
+
+    Every query gets maxTimeMS from the time left until the deadline, reads at most
+    max_docs_scanned documents per collection, fetches batch_size documents per round trip
+    and is tagged with comment so the server-side operations can be found and killed (no tag
+    when ANALYSIS_QUERY_COMMENT is empty). Requested values can only tighten the ANALYSIS_* limits.
+    """
+
+    def __init__(self, timeout_seconds: Optional[float] = None, max_docs_scanned: Optional[int] = None,
+                 batch_size: Optional[int] = None):
+        self.timeout_seconds = min(timeout_seconds or Config.ANALYSIS_TIMEOUT_SECONDS, Config.ANALYSIS_TIMEOUT_SECONDS)
+        self.max_docs_scanned = min(max_docs_scanned or Config.ANALYSIS_MAX_DOCS_SCANNED,
+                                    Config.ANALYSIS_MAX_DOCS_SCANNED)
+        self.batch_size = min(batch_size or Config.ANALYSIS_BATCH_SIZE, Config.ANALYSIS_BATCH_SIZE)
+        self.deadline = time.monotonic() + self.timeout_seconds
+        prefix = Config.ANALYSIS_QUERY_COMMENT
+        self.comment = f"{prefix}:{uuid.uuid4().hex[:16]}" if prefix else None
+        self.capped = set()  # Collections whose counts or aggregations were cut off at max_docs_scanned
+
+    def remaining_seconds(self) -> float:
+        remaining = self.deadline - time.monotonic()
+        if remaining <= 0:
+            raise QueryBudgetExceeded(f"Analysis exceeded its {self.timeout_seconds:g} s time budget")
+        return remaining
+
+    def max_time_ms(self) -> int:
+        return max(1, int(self.remaining_seconds() * 1000))
+
+    def _tagged(self, options: Dict[str, Any]) -> Dict[str, Any]:
+        if self.comment:
+            options["comment"] = self.comment
+        return options
+
+    def find_options(self, limit: Optional[int] = None) -> Dict[str, Any]:
+        """Keyword arguments for Collection.find"""
+        return self._tagged({
+            "max_time_ms": self.max_time_ms(),
+            "batch_size": self.batch_size,
+            "limit": min(limit, self.max_docs_scanned) if limit else self.max_docs_scanned
+        })
+
+    def count_options(self) -> Dict[str, Any]:
+        """Keyword arguments for count_documents / estimated_document_count"""
+        return self._tagged({"maxTimeMS": self.max_time_ms()})
+
+    def aggregate_options(self) -> Dict[str, Any]:
+        """Keyword arguments for Collection.aggregate"""
+        return self._tagged({"maxTimeMS": self.max_time_ms(), "batchSize": self.batch_size})
+
+    def command_options(self) -> Dict[str, Any]:
+        """Keyword arguments for Database.command (explain, collStats, dbStats)"""
+        return self._tagged({"maxTimeMS": self.max_time_ms()})
+
+    def cap_pipeline(self, pipeline: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Insert a $limit after the leading $match stages so at most max_docs_scanned documents flow on"""
+        position = 0
+        while position < len(pipeline) and "$match" in pipeline[position]:
+            position += 1
+        if position < len(pipeline) and ("$sample" in pipeline[position] or "$limit" in pipeline[position]):
+            return list(pipeline)
+        return list(pipeline[:position]) + [{"$limit": self.max_docs_scanned}] + list(pipeline[position:])
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "timeout_seconds": self.timeout_seconds,
+            "max_docs_scanned": self.max_docs_scanned,
+            "batch_size": self.batch_size,
+            "comment": self.comment,
+            "capped": sorted(self.capped)
+        }
+
+
+def count_documents(collection, filter: Dict[str, Any]) -> int:
+    """count_documents under the current budget, counting at most max_docs_scanned (blocking).
+    A count that reaches the cap marks the collection as capped."""
+    current = current_budget()
+    count = collection.count_documents(filter, limit=current.max_docs_scanned, **current.count_options())
+    if count >= current.max_docs_scanned:
+        current.capped.add(collection.name)
+    return count
+
+
+def aggregate(collection, pipeline: List[Dict[str, Any]], **options) -> List[Dict[str, Any]]:
+    """Run an aggregation under the current budget with the scan cap (blocking).
+
+    When a $limit was inserted and the collection holds more documents than the cap, the
+    results cover only part of it and the collection is marked as capped."""
+    current = current_budget()
+    capped_pipeline = current.cap_pipeline(pipeline)
+    if (len(capped_pipeline) > len(pipeline)
+            and collection.estimated_document_count(**current.count_options()) > current.max_docs_scanned):
+        current.capped.add(collection.name)
+    return list(collection.aggregate(capped_pipeline, **current.aggregate_options(), **options))
+
+
+_current_budget: contextvars.ContextVar[Optional[QueryBudget]] = contextvars.ContextVar("mcp_query_budget", default=None)
+
+
+@contextmanager
+def budget(timeout_seconds: Optional[float] = None, max_docs_scanned: Optional[int] = None,
+           batch_size: Optional[int] = None):
+    """Run the enclosed analysis under one budget; yields it. An enclosing budget is reused."""
+    active = _current_budget.get()
+    if active is not None:
+        yield active
+        return
+    current = QueryBudget(timeout_seconds, max_docs_scanned, batch_size)
+    token = _current_budget.set(current)
+    try:
+        yield current
+    finally:
+        _current_budget.reset(token)
+
+
+def current_budget() -> QueryBudget:
+    """The active budget, or a default one for queries issued outside an analysis request"""
+    return _current_budget.get() or QueryBudget()
+
+
+def kill_tagged_operations(admin_database, comment: str) -> int:
+    """killOp every operation tagged with comment (blocking); returns how many were killed.
+
+    getMore operations carry the comment of the command that opened the cursor."""
+    pipeline = [
+        {"$currentOp": {"allUsers": True, "idleConnections": False}},
+        {"$match": {"$or": [{"command.comment": comment}, {"cursor.originatingCommand.comment": comment}]}},
+        {"$project": {"opid": 1}},
+    ]
+    killed = 0
+    for op in admin_database.aggregate(pipeline):
+        try:
+            admin_database.command("killOp", op=op["opid"], read_preference=admin_database.read_preference)
+            killed += 1
+        except Exception as e:
+            # The operation may have finished in the meantime
+            logger.info(f"killOp {op.get('opid')} failed: {str(e)}")
+    return killed
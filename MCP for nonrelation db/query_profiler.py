@@ -0,0 +1,219 @@
+import threading
+from collections import deque
+from typing import Dict, List, Any, Optional
+import logging
+
+import query_governor
+
+logger = logging.getLogger(__name__)
+
+# A docsExamined/nReturned ratio above this means the plan reads far more than it returns
+EXAMINED_RATIO_THRESHOLD = 10
+
+
+class QueryLog:
+    """Bounded log of the MongoDB queries the analyzer (and the chat layer through it) issues"""
+
+    def __init__(self, max_entries: int = 500):
+        self._entries = deque(maxlen=max_entries)
+        self._lock = threading.Lock()
+
+    def record(self, database: str, collection: str, kind: str, filter: Optional[Dict[str, Any]] = None,
+               sort: Optional[Dict[str, Any]] = None, projection: Optional[Dict[str, Any]] = None,
+               pipeline: Optional[List[Dict[str, Any]]] = None):
+        entry = {"database": database, "collection": collection, "kind": kind, "filter": filter or {},
+                 "sort": sort, "projection": projection, "pipeline": pipeline}
+        with self._lock:
+            # Keep one entry per distinct query, most recent last
+            if entry in self._entries:
+                self._entries.remove(entry)
+            self._entries.append(entry)
+
+    def queries(self, database: Optional[str] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [dict(entry) for entry in self._entries if database is None or entry["database"] == database]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+query_log = QueryLog()
+
+
+def _plan_stages(plan: Dict[str, Any]) -> List[str]:
+    """Flatten a winningPlan tree into its stage names"""
+    stages = []
+    stack = [plan]
+    while stack:
+        node = stack.pop()
+        if not isinstance(node, dict):
+            continue
+        if "stage" in node:
+            stages.append(node["stage"])
+        for key in ("inputStage", "queryPlan"):
+            if key in node:
+                stack.append(node[key])
+        stack.extend(node.get("inputStages", []))
+    return stages
+
+
+def _plan_index_names(plan: Dict[str, Any]) -> List[str]:
+    names = []
+    stack = [plan]
+    while stack:
+        node = stack.pop()
+        if not isinstance(node, dict):
+            continue
+        if node.get("indexName"):
+            names.append(node["indexName"])
+        for key in ("inputStage", "queryPlan"):
+            if key in node:
+                stack.append(node[key])
+        stack.extend(node.get("inputStages", []))
+    return names
+
+
+def summarize_explain(explain: Dict[str, Any]) -> Dict[str, Any]:
+    """Reduce explain("executionStats") output (find, count or aggregate) to the fields we report"""
+    # Aggregations wrap the query layer in the first $cursor stage
+    if "stages" in explain and explain["stages"] and "$cursor" in explain["stages"][0]:
+        explain = explain["stages"][0]["$cursor"]
+    planner = explain.get("queryPlanner", {})
+    execution = explain.get("executionStats", {})
+    winning_plan = planner.get("winningPlan", {})
+    stages = _plan_stages(winning_plan)
+    docs_examined = execution.get("totalDocsExamined", 0)
+    returned = execution.get("nReturned", 0)
+    return {
+        "stages": stages,
+        "collscan": "COLLSCAN" in stages,
+        "indexes_used": _plan_index_names(winning_plan),
+        "docs_examined": docs_examined,
+        "keys_examined": execution.get("totalKeysExamined", 0),
+        "n_returned": returned,
+        "examined_to_returned": round(docs_examined / max(returned, 1), 2),
+        "execution_time_ms": execution.get("executionTimeMillis", 0),
+    }
+
+
+def explain_query(database, query: Dict[str, Any]) -> Dict[str, Any]:
+    """Run explain("executionStats") for a logged query (blocking; call from an executor)"""
+    collection = query["collection"]
+    if query["kind"] == "aggregate":
+        command = {"aggregate": collection, "pipeline": query["pipeline"] or [], "cursor": {}}
+    elif query["kind"] == "count":
+        command = {"count": collection, "query": query["filter"]}
+    else:
+        command = {"find": collection, "filter": query["filter"]}
+        if query.get("sort"):
+            command["sort"] = query["sort"]
+        if query.get("projection"):
+            command["projection"] = query["projection"]
+    # Commands ignore the handle's read preference unless it is passed explicitly. executionStats runs
+    # the query, so it is bounded by the query budget like any other analyzer query.
+    return database.command("explain", command, verbosity="executionStats", read_preference=database.read_preference,
+                            **query_governor.current_budget().command_options())
+
+
+def read_system_profile(database, limit: int = 100) -> List[Dict[str, Any]]:
+    """Most recent profiled operations, newest first (blocking)"""
+    entries = database["system.profile"].find(
+        {"ns": {"$not": {"$regex": r"\.system\.profile$"}}},
+        {"ns": 1, "op": 1, "millis": 1, "planSummary": 1, "docsExamined": 1, "keysExamined": 1,
+         "nreturned": 1, "command": 1, "ts": 1},
+        **query_governor.current_budget().find_options(limit),
+    ).sort("ts", -1)
+    operations = []
+    for entry in entries:
+        command = entry.get("command", {})
+        operations.append({
+            "namespace": entry.get("ns"),
+            "op": entry.get("op"),
+            "millis": entry.get("millis", 0),
+            "plan_summary": entry.get("planSummary", ""),
+            "docs_examined": entry.get("docsExamined", 0),
+            "keys_examined": entry.get("keysExamined", 0),
+            "n_returned": entry.get("nreturned", 0),
+            "filter": command.get("filter") or command.get("query"),
+            "sort": command.get("sort"),
+            "pipeline": command.get("pipeline"),
+        })
+    return operations
+
+
+def read_current_ops(client, min_seconds: int = 1) -> List[Dict[str, Any]]:
+    """Active operations running for at least min_seconds (blocking)"""
+    pipeline = [
+        {"$currentOp": {"allUsers": True, "idleConnections": False}},
+        {"$match": {"active": True, "secs_running": {"$gte": min_seconds}}},
+        {"$project": {"opid": 1, "ns": 1, "op": 1, "secs_running": 1, "planSummary": 1, "command": 1}},
+    ]
+    return [
+        {
+            "opid": op.get("opid"),
+            "namespace": op.get("ns"),
+            "op": op.get("op"),
+            "secs_running": op.get("secs_running"),
+            "plan_summary": op.get("planSummary", ""),
+        }
+        for op in client.admin.aggregate(pipeline)
+    ]
+
+
+def read_index_stats(collection) -> List[Dict[str, Any]]:
+    """Per-index access counts since server start (blocking)"""
+    return [
+        {
+            "name": stat.get("name"),
+            "keys": stat.get("key"),
+            "ops": stat.get("accesses", {}).get("ops", 0),
+            "since": stat.get("accesses", {}).get("since"),
+        }
+        for stat in collection.aggregate([{"$indexStats": {}}], **query_governor.current_budget().aggregate_options())
+    ]
+
+
+def build_recommendations(explained: List[Dict[str, Any]], slow_ops: List[Dict[str, Any]],
+                          index_stats: Dict[str, List[Dict[str, Any]]]) -> List[str]:
+    """Turn plans, profiler entries and index usage into concrete recommendations"""
+    recommendations = []
+    seen = set()
+    for item in explained:
+        plan = item.get("plan")
+        if not plan:
+            continue
+        fields = list((item["query"].get("filter") or {}).keys())
+        fields = [f for f in fields if not f.startswith("$")]
+        if plan["collscan"] and fields:
+            key = (item["query"]["collection"], tuple(fields))
+            if key not in seen:
+                seen.add(key)
+                recommendations.append(
+                    f"{item['query']['collection']}: {item['query']['kind']} on {fields} does a COLLSCAN "
+                    f"({plan['docs_examined']} docs examined for {plan['n_returned']} returned); "
+                    f"create an index on {{{', '.join(f'{f}: 1' for f in fields)}}}"
+                )
+        elif plan["examined_to_returned"] > EXAMINED_RATIO_THRESHOLD and plan["indexes_used"]:
+            recommendations.append(
+                f"{item['query']['collection']}: index {plan['indexes_used'][0]} is not selective for "
+                f"{fields} (examined/returned ratio {plan['examined_to_returned']}); extend it with more "
+                "equality fields"
+            )
+    for op in slow_ops:
+        if "COLLSCAN" in (op.get("plan_summary") or "") and op.get("namespace"):
+            key = (op["namespace"], "slow")
+            if key not in seen:
+                seen.add(key)
+                recommendations.append(
+                    f"{op['namespace']}: slow {op['op']} ({op['millis']} ms) used a COLLSCAN with filter "
+                    f"{op.get('filter')}"
+                )
+    for collection, stats in index_stats.items():
+        for stat in stats:
+            if stat["name"] != "_id_" and stat["ops"] == 0:
+                recommendations.append(
+                    f"{collection}: index {stat['name']} has not been used since {stat['since']}; "
+                    "consider dropping it"
+                )
+    return recommendations
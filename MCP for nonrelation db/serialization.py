@@ -0,0 +1,161 @@
+import base64
+import hashlib
+import json
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Optional, Tuple
+
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    from bson import ObjectId, Decimal128, Binary, Timestamp, Regex, DBRef
+    BSON_AVAILABLE = True
+except ImportError:
+    BSON_AVAILABLE = False
+
+# Defaults for sample documents returned with include_samples
+MAX_SAMPLE_STRING = 200
+MAX_SAMPLE_ITEMS = 20
+MAX_SAMPLE_DEPTH = 4
+
+
+def bson_default(obj: Any) -> Any:
+    """Serialize BSON and other driver types that JSON encoders do not know about"""
+    if BSON_AVAILABLE:
+        if isinstance(obj, ObjectId):
+            return str(obj)
+        if isinstance(obj, Decimal128):
+            return str(obj.to_decimal())
+        if isinstance(obj, Binary):
+            return {"$binary": base64.b64encode(bytes(obj)).decode("ascii"), "subtype": obj.subtype}
+        if isinstance(obj, Timestamp):
+            return {"t": obj.time, "i": obj.inc}
+        if isinstance(obj, Regex):
+            return obj.pattern
+        if isinstance(obj, DBRef):
+            return {"$ref": obj.collection, "$id": bson_default(obj.id) if not isinstance(obj.id, (str, int)) else obj.id}
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, Decimal):
+        return str(obj)
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    if isinstance(obj, bytes):
+        return base64.b64encode(obj).decode("ascii")
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    if hasattr(obj, "tolist"):
+        # numpy arrays and scalars
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """Encode to compact JSON bytes, using orjson when it is installed"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(content, default=bson_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=bson_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class BSONJSONResponse(JSONResponse):
+    """JSON response that understands BSON types and skips FastAPI's jsonable_encoder pass.
+
+    Endpoints return it directly so large analysis payloads are encoded once, by orjson
+    when available.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def truncate_document(value: Any, max_string: int = MAX_SAMPLE_STRING, max_items: int = MAX_SAMPLE_ITEMS,
+                      max_depth: int = MAX_SAMPLE_DEPTH, _depth: int = 0) -> Any:
+    """Shrink a sample document for display: long strings, long arrays and deep nesting are cut"""
+    if isinstance(value, dict):
+        if _depth >= max_depth:
+            return f"{{...{len(value)} fields}}"
+        items = list(value.items())
+        truncated = {
+            str(key): truncate_document(item, max_string, max_items, max_depth, _depth + 1)
+            for key, item in items[:max_items]
+        }
+        if len(items) > max_items:
+            truncated["..."] = f"{len(items) - max_items} more fields"
+        return truncated
+    if isinstance(value, (list, tuple)):
+        if _depth >= max_depth:
+            return f"[...{len(value)} items]"
+        truncated = [truncate_document(item, max_string, max_items, max_depth, _depth + 1) for item in value[:max_items]]
+        if len(value) > max_items:
+            truncated.append(f"...{len(value) - max_items} more items")
+        return truncated
+    if isinstance(value, str) and len(value) > max_string:
+        return value[:max_string] + f"...({len(value)} chars)"
+    if isinstance(value, bytes):
+        return f"<{len(value)} bytes>"
+    return value
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+class ETagMemo:
+    """Remembers the encoded body and ETag of the last payload served per key.
+
+    identity is the cached result object the payload was built from; while the
+    analysis cache returns the same object, the body is reused instead of being
+    encoded and hashed again.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def encode(self, key: str, payload: Any, identity: Any = None) -> Tuple[bytes, str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and identity is not None and entry[0] is identity:
+                self._entries.move_to_end(key)
+                return entry[1], entry[2]
+        body = dumps(payload)
+        etag = make_etag(body)
+        with self._lock:
+            self._entries[key] = (identity, body, etag)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return body, etag
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Compression middleware may hand back weak validators (W/"...")
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return etag in candidates
+
+
+def conditional_response(request: Request, body: bytes, etag: str) -> Response:
+    """200 with the body and its ETag, or 304 when the client already has it"""
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,176 @@
+import copy
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Dict, Any, Optional, Tuple
+from urllib.parse import quote, urlsplit, urlunsplit
+import logging
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Rows removed from the store after this many writes, so expired analyses do not pile up
+PURGE_EVERY_WRITES = 100
+
+CONNECTION_NAMESPACE = "connection"
+ANALYSIS_NAMESPACE = "analysis"
+
+# additional_params keys containing one of these are treated as secrets
+SECRET_PARAM_MARKERS = ("password", "secret", "token", "api_key", "apikey")
+
+
+def _strip_uri_password(uri: Optional[str]) -> Tuple[Optional[str], bool]:
+    """The URI without the password of its user info, and whether it had one"""
+    if not uri:
+        return uri, False
+    parts = urlsplit(uri)
+    userinfo, at, hosts = parts.netloc.rpartition("@")
+    if not at or ":" not in userinfo:
+        return uri, False
+    return urlunsplit(parts._replace(netloc=f"{userinfo.split(':', 1)[0]}@{hosts}")), True
+
+
+def _with_uri_password(uri: str, password: str) -> str:
+    parts = urlsplit(uri)
+    user, _, hosts = parts.netloc.rpartition("@")
+    return urlunsplit(parts._replace(netloc=f"{user}:{quote(password, safe='')}@{hosts}"))
+
+
+def redact_connect_args(connect_args: Dict[str, Any]) -> Dict[str, Any]:
+    """A copy of the connect arguments without credentials; "redacted" lists what was removed"""
+    public = copy.deepcopy(connect_args)
+    redacted = []
+    if public.get("password"):
+        public["password"] = None
+        redacted.append("password")
+    public["connection_string"], stripped = _strip_uri_password(public.get("connection_string"))
+    if stripped:
+        redacted.append("connection_string")
+    analytics = public.get("analytics") or {}
+    analytics["uri"], stripped = _strip_uri_password(analytics.get("uri"))
+    if stripped:
+        redacted.append("analytics.uri")
+    for key in list(public.get("additional_params") or {}):
+        if any(marker in key.lower() for marker in SECRET_PARAM_MARKERS):
+            del public["additional_params"][key]
+            redacted.append(f"additional_params.{key}")
+    public["redacted"] = redacted
+    return public
+
+
+def restore_credentials(connect_args: Dict[str, Any]) -> Dict[str, Any]:
+    """Fill the credentials removed by redact_connect_args back in from the configuration.
+
+    A URI that matches the configured one (DEFAULT_CONNECTION_STRING, ANALYTICS_URI) is taken
+    from the configuration as is; otherwise DATABASE_PASSWORD is inserted."""
+    restored = copy.deepcopy(connect_args)
+    missing = []
+    for item in restored.pop("redacted", None) or []:
+        if item == "password":
+            restored["password"] = Config.DATABASE_PASSWORD or None
+            if not Config.DATABASE_PASSWORD:
+                missing.append("DATABASE_PASSWORD")
+        elif item in ("connection_string", "analytics.uri"):
+            configured = Config.DEFAULT_CONNECTION_STRING if item == "connection_string" else Config.ANALYTICS_URI
+            target = restored if item == "connection_string" else restored["analytics"]
+            key = "connection_string" if item == "connection_string" else "uri"
+            if configured and _strip_uri_password(configured)[0] == target[key]:
+                target[key] = configured
+            elif Config.DATABASE_PASSWORD:
+                target[key] = _with_uri_password(target[key], Config.DATABASE_PASSWORD)
+            else:
+                missing.append("DATABASE_PASSWORD")
+        elif item.startswith("additional_params."):
+            param = item.split(".", 1)[1]
+            value = os.getenv(f"DATABASE_{param.upper()}")
+            if value is None:
+                missing.append(f"DATABASE_{param.upper()}")
+            else:
+                restored["additional_params"][param] = value
+    if missing:
+        raise RuntimeError(f"The shared connection needs credentials from the environment: "
+                           f"{', '.join(sorted(set(missing)))}")
+    return restored
+
+
+class SharedStore:
+    """Key/value entries with optional expiry in a SQLite file shared by all worker processes.
+
+    WAL mode lets workers read while another one writes. Each thread keeps its own
+    sqlite3 connection, as the module requires. Times are wall-clock, so they can be
+    compared across processes.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        if not os.path.exists(path):
+            # Analysis results may contain sampled documents
+            os.close(os.open(path, os.O_CREAT | os.O_WRONLY, 0o600))
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS entries (namespace TEXT NOT NULL, key TEXT NOT NULL, "
+                "value BLOB, expires_at REAL, PRIMARY KEY (namespace, key))"
+            )
+            self._local.connection = connection
+        return connection
+
+    def get(self, namespace: str, key: str) -> Optional[Tuple[bytes, Optional[float]]]:
+        """(value, expires_at) for a live entry, else None"""
+        row = self._connection().execute(
+            "SELECT value, expires_at FROM entries WHERE namespace = ? AND key = ?", (namespace, key)
+        ).fetchone()
+        if row is None or (row[1] is not None and row[1] <= time.time()):
+            return None
+        return row[0], row[1]
+
+    def set(self, namespace: str, key: str, value: bytes, ttl: Optional[float] = None):
+        expires_at = time.time() + ttl if ttl else None
+        connection = self._connection()
+        connection.execute(
+            "INSERT OR REPLACE INTO entries (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+            (namespace, key, value, expires_at)
+        )
+        self._writes += 1
+        if self._writes % PURGE_EVERY_WRITES == 0:
+            connection.execute("DELETE FROM entries WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),))
+
+    def delete(self, namespace: str, key: str):
+        self._connection().execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (namespace, key))
+
+    def clear(self, namespace: str):
+        self._connection().execute("DELETE FROM entries WHERE namespace = ?", (namespace,))
+
+    def publish_connection(self, connection_id: Optional[str], connect_args: Optional[Dict[str, Any]]):
+        """Record the connection every worker should use (connect_args None after a disconnect).
+        Credentials are removed first; see restore_credentials."""
+        public = redact_connect_args(connect_args) if connect_args else None
+        self.set(CONNECTION_NAMESPACE, "current",
+                 json.dumps({"connection_id": connection_id, "connect_args": public}).encode("utf-8"))
+
+    def read_connection(self) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        """(connection_id, connect_args) of the last published connection, still without credentials"""
+        entry = self.get(CONNECTION_NAMESPACE, "current")
+        if entry is None:
+            return None, None
+        current = json.loads(entry[0])
+        return current["connection_id"], current["connect_args"]
+
+
+def get_store() -> Optional[SharedStore]:
+    """The shared store, or None in single-process mode (no SHARED_STATE_PATH and WORKERS == 1)"""
+    path = Config.SHARED_STATE_PATH
+    if not path and Config.WORKERS <= 1:
+        return None
+    return SharedStore(path or os.path.join(tempfile.gettempdir(), "mcp_shared_state.sqlite"))
@@ -6,31 +6,30 @@ Startup script for MCP Non-Relational Database Analyzer
 import os
 import sys
 import asyncio
+import importlib.util
 import uvicorn
 from pathlib import Path
 
 def check_dependencies():
-    """Check if all required dependencies are installed"""
-    required_packages = [
-        'fastapi',
-        'uvicorn',
-        'pymongo',
-        'redis',
-        'cassandra-driver',
-        'elasticsearch',
-        'pandas',
-        'numpy',
-        'python-dotenv',
-        'pydantic'
-    ]
-    
-    missing_packages = []
-    
-    for package in required_packages:
-        try:
-            __import__(package.replace('-', '_'))
-        except ImportError:
-            missing_packages.append(package)
+    """Check if all required dependencies are installed (without importing them)"""
+    # Distribution name -> importable module name
+    required_packages = {
+        'fastapi': 'fastapi',
+        'uvicorn': 'uvicorn',
+        'python-dotenv': 'dotenv',
+        'pydantic': 'pydantic'
+    }
+    driver_packages = {
+        'pymongo': 'pymongo',
+        'redis': 'redis',
+        'cassandra-driver': 'cassandra',
+        'elasticsearch': 'elasticsearch'
+    }
+    
+    missing_packages = [package for package, module in required_packages.items()
+                        if importlib.util.find_spec(module) is None]
+    missing_drivers = [package for package, module in driver_packages.items()
+                       if importlib.util.find_spec(module) is None]
     
     if missing_packages:
         print("❌ Missing required packages:")
@@ -40,6 +39,13 @@ def check_dependencies():
         print("   pip install -r requirements.txt")
         return False
     
+    if len(missing_drivers) == len(driver_packages):
+        print("❌ No database driver is installed (pymongo, redis, cassandra-driver or elasticsearch)")
+        return False
+    
+    if missing_drivers:
+        print(f"⚠️  Optional database drivers not installed: {', '.join(missing_drivers)}")
+    
     print("✅ All required packages are installed")
     return True
 
@@ -0,0 +1,34 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+# The analyzer modules are imported by their flat names, as main.py does
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def mongo_connector(monkeypatch):
+    """A DatabaseConnector on a mongomock database seeded with 100 synthetic bookings"""
+    import benchmark
+    import query_profiler
+    from config import Config
+    from database_connectors import DatabaseConnector
+
+    # Undone after the test: benchmark.connect_mongodb clears the query comment for mongomock
+    monkeypatch.setattr(Config, "ANALYSIS_QUERY_COMMENT", Config.ANALYSIS_QUERY_COMMENT)
+    query_profiler.query_log.clear()
+    db_connector = DatabaseConnector()
+    asyncio.run(benchmark.connect_mongodb(db_connector, 100, None))
+    yield db_connector
+    query_profiler.query_log.clear()
+
+
+@pytest.fixture
+def mongo_analyzer(mongo_connector):
+    from database_analyzer import DatabaseAnalyzer
+
+    analyzer = DatabaseAnalyzer()
+    analyzer.set_connector(mongo_connector)
+    return analyzer
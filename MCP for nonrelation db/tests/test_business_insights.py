@@ -0,0 +1,39 @@
+import asyncio
+
+import pytest
+
+
+def revenue(analyzer, strategy, **filters):
+    result = asyncio.run(getattr(analyzer, strategy)(filters))
+    return result["revenue_insights"]
+
+
+@pytest.fixture
+def confirmed_revenue(mongo_connector):
+    bookings = list(mongo_connector.connector.database["bookings"].find({"status": "confirmed"}))
+    amounts = [booking["totalAmount"] for booking in bookings]
+    assert amounts and len(amounts) < mongo_connector.connector.database["bookings"].count_documents({})
+    return sum(amounts), sum(amounts) / len(amounts)
+
+
+def test_mongodb_revenue_counts_confirmed_bookings(mongo_analyzer, confirmed_revenue):
+    insights = revenue(mongo_analyzer, "_analyze_mongodb_business_insights")
+    assert insights["total_revenue"] == pytest.approx(confirmed_revenue[0])
+    assert insights["average_booking_amount"] == pytest.approx(confirmed_revenue[1])
+
+
+def test_server_side_sampled_revenue_counts_confirmed_bookings(mongo_analyzer, confirmed_revenue):
+    insights = revenue(mongo_analyzer, "_analyze_sampled_business_insights")
+    assert insights["total_revenue"] == pytest.approx(confirmed_revenue[0])
+    assert insights["average_booking_amount"] == pytest.approx(confirmed_revenue[1])
+
+
+def test_estimated_revenue_extrapolates_only_confirmed_bookings(mongo_analyzer, mongo_connector, confirmed_revenue,
+                                                                monkeypatch):
+    # Without native aggregation the figures come from the sampled records; a sample of the
+    # whole collection must reproduce the exact totals
+    monkeypatch.setitem(mongo_connector.connector.capabilities, "native_aggregation", False)
+    insights = revenue(mongo_analyzer, "_analyze_sampled_business_insights", sample_size=100000)
+    assert insights["estimated_from_sample"] > 0
+    assert insights["total_revenue"] == pytest.approx(confirmed_revenue[0])
+    assert insights["average_booking_amount"] == pytest.approx(confirmed_revenue[1])
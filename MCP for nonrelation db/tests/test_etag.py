@@ -0,0 +1,63 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from serialization import ETagMemo, etag_matches
+
+
+def test_etag_matches_lists_wildcards_and_weak_validators():
+    assert etag_matches('"a", "b"', '"b"')
+    assert etag_matches('W/"b"', '"b"')
+    assert etag_matches("*", '"b"')
+    assert not etag_matches(None, '"b"')
+    assert not etag_matches('"a"', '"b"')
+
+
+def test_memo_reuses_the_body_while_the_cached_result_is_the_same_object():
+    memo = ETagMemo(max_entries=1)
+    result = {"value": 1}
+    body, etag = memo.encode("/k", {"result": result}, identity=result)
+    result["value"] = 2  # Mutations are invisible while the identity is unchanged
+    assert memo.encode("/k", {"result": result}, identity=result) == (body, etag)
+    assert memo.encode("/k", {"result": {"value": 2}}, identity={"value": 2})[1] != etag
+    memo.encode("/other", {}, identity=result)
+    assert memo.encode("/k", {"result": result}, identity=result)[1] != etag
+
+
+@pytest.fixture
+def client(mongo_connector):
+    import main
+
+    main.db_connector.connector = mongo_connector.connector
+    main.db_connector.connection_info = mongo_connector.connection_info
+    main.db_connector.connection_id = mongo_connector.connection_id
+    main.reset_connection_state()
+    with TestClient(main.app) as client:
+        yield client
+    main.db_connector.connector = None
+    main.db_connector.connection_info = {}
+    main.db_connector.connection_id = None
+    main.reset_connection_state()
+
+
+@pytest.mark.parametrize("path", ["/collections", "/schema", "/insights"])
+def test_revalidation_returns_304_without_a_body(client, path):
+    first = client.get(path)
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert first.headers["cache-control"] == "no-cache"
+
+    again = client.get(path, headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.content == b""
+    assert again.headers["etag"] == etag
+
+    assert client.get(path, headers={"If-None-Match": f"W/{etag}"}).status_code == 304
+    assert client.get(path, headers={"If-None-Match": '"stale"'}).status_code == 200
+
+
+def test_analysis_etag_changes_with_the_analysis(client):
+    schema = client.post("/analyze", json={"analysis_type": "schema"})
+    quality = client.post("/analyze", json={"analysis_type": "data_quality"})
+    assert schema.headers["etag"] != quality.headers["etag"]
+    repeat = client.post("/analyze", json={"analysis_type": "schema"}, headers={"If-None-Match": schema.headers["etag"]})
+    assert repeat.status_code == 304
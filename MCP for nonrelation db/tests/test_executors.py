@@ -0,0 +1,85 @@
+import asyncio
+import threading
+
+import mongomock
+import pytest
+
+import executors
+import instrumentation
+from config import Config
+from database_connectors import MongoDBConnector
+from executors import BoundedExecutor, ExecutorSaturated
+
+
+@pytest.fixture
+def executor():
+    executor = BoundedExecutor("test", max_workers=1, max_queue=1)
+    yield executor
+    executor.shutdown(wait=True, cancel_futures=True)
+
+
+def test_rejects_work_beyond_workers_plus_queue(executor):
+    release = threading.Event()
+    running = executor.submit(release.wait)
+    queued = executor.submit(lambda: "queued")
+    assert executor.is_saturated()
+    with pytest.raises(ExecutorSaturated):
+        executor.submit(lambda: "rejected")
+    assert executor.snapshot()["rejected"] == 1
+
+    release.set()
+    assert running.result(timeout=5) is True
+    assert queued.result(timeout=5) == "queued"
+    assert not executor.is_saturated()
+    assert executor.submit(lambda: "accepted").result(timeout=5) == "accepted"
+
+
+def test_cancelled_queued_call_frees_its_slot(executor):
+    release = threading.Event()
+    executor.submit(release.wait)
+    queued = executor.submit(lambda: None)
+    assert queued.cancel()
+    assert executor.snapshot()["queued"] == 0
+    assert not executor.is_saturated()
+    release.set()
+
+
+def test_snapshot_counts_completed_calls(executor):
+    executor.submit(lambda: None).result(timeout=5)
+    stats = executor.snapshot()
+    assert stats["completed"] == 1
+    assert stats["active"] == 0 and stats["queued"] == 0
+    assert stats["peak_pending"] == 1
+
+
+@pytest.fixture
+def stream_pool(monkeypatch):
+    """One stream thread per backend and no waiting streams, on fresh executors"""
+    monkeypatch.setattr(Config, "QUERY_STREAM_MAX_WORKERS", 1)
+    monkeypatch.setattr(Config, "QUERY_STREAM_MAX_QUEUE", 0)
+    monkeypatch.setattr(Config, "QUERY_BUFFER_BATCHES", 1)
+    monkeypatch.setattr(executors, "_executors", {})
+    yield
+    executors.shutdown()
+
+
+def test_query_streams_run_on_their_own_bounded_executor(stream_pool):
+    connector = MongoDBConnector()
+    connector.client = mongomock.MongoClient()
+    connector.database = connector.client["db"]
+    connector.database["items"].insert_many([{"n": i} for i in range(100)])
+
+    async def run():
+        # A slow client: the first stream is read once and then left open
+        slow = connector.execute_query({"collection": "items"}, 1, 100, 5000)
+        await slow.__anext__()
+        assert executors.snapshot()["mongodb_stream"]["active"] == 1
+        second = connector.execute_query({"collection": "items"}, 1, 100, 5000)
+        with pytest.raises(ExecutorSaturated):
+            await second.__anext__()
+        # Analyses still get threads on the backend's executor
+        assert not executors.is_saturated("mongodb")
+        assert await instrumentation.run_in_executor("mongodb", "ping", lambda: "pong") == "pong"
+        await slow.aclose()
+
+    asyncio.run(run())
@@ -0,0 +1,35 @@
+from health_monitor import CircuitBreaker
+
+
+def test_opens_after_failure_threshold():
+    breaker = CircuitBreaker(failure_threshold=3)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED and not breaker.is_open()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN and breaker.is_open()
+    assert breaker.opened_at is not None
+
+
+def test_failed_probe_while_half_open_reopens_immediately():
+    breaker = CircuitBreaker(failure_threshold=3)
+    for _ in range(3):
+        breaker.record_failure()
+    opened_at = breaker.opened_at
+    breaker.half_open()
+    assert breaker.state == CircuitBreaker.HALF_OPEN and breaker.is_open()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.opened_at == opened_at  # Still counts from the first outage
+
+
+def test_success_closes_and_resets():
+    breaker = CircuitBreaker(failure_threshold=1)
+    breaker.record_failure()
+    breaker.half_open()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.failures == 0 and breaker.opened_at is None
+    breaker.record_failure()
+    breaker.reset()
+    assert not breaker.is_open()
@@ -0,0 +1,33 @@
+import asyncio
+
+import query_profiler
+from index_advisor import shape_from_query
+
+
+def test_esr_fields_are_split_from_the_filter_and_sort():
+    shape = shape_from_query({"collection": "bookings", "filter": {"status": "confirmed", "totalAmount": {"$gt": 100}},
+                              "sort": {"checkIn": -1}})
+    assert shape.equality == ["status"]
+    assert shape.sort == [("checkIn", -1)]
+    assert shape.range == ["totalAmount"]
+
+
+def test_exists_only_predicates_give_no_shape():
+    assert shape_from_query({"collection": "bookings", "filter": {"name": {"$exists": False}}}) is None
+    shape = shape_from_query({"collection": "bookings", "filter": {"name": {"$exists": True}, "status": "paid"}})
+    assert shape.equality == ["status"] and shape.range == []
+    # $exists next to a real range operator still leaves the range
+    shape = shape_from_query({"collection": "bookings", "filter": {"rating": {"$exists": True, "$gte": 4}}})
+    assert shape.range == ["rating"]
+
+
+def test_data_quality_probes_are_not_logged(mongo_analyzer):
+    asyncio.run(mongo_analyzer.analyze("data_quality", use_cache=False))
+    assert query_profiler.query_log.queries() == []
+
+
+def test_performance_gives_index_advice_only_on_request(mongo_analyzer):
+    result = asyncio.run(mongo_analyzer.analyze("performance", use_cache=False))
+    assert "index_advice" not in result
+    result = asyncio.run(mongo_analyzer.analyze("performance", {"advise_indexes": True}, use_cache=False))
+    assert "error" not in result["index_advice"]
@@ -0,0 +1,53 @@
+import time
+
+import mongomock
+import pytest
+
+import query_governor
+from config import Config
+from query_governor import QueryBudget, QueryBudgetExceeded
+
+
+def test_cap_pipeline_inserts_limit_after_leading_matches():
+    budget = QueryBudget(max_docs_scanned=100)
+    pipeline = [{"$match": {"a": 1}}, {"$match": {"b": 2}}, {"$group": {"_id": "$a"}}]
+    capped = budget.cap_pipeline(pipeline)
+    assert capped == pipeline[:2] + [{"$limit": 100}] + pipeline[2:]
+    assert len(pipeline) == 3  # The caller's pipeline is not modified
+
+
+def test_cap_pipeline_limits_from_the_start_without_match():
+    budget = QueryBudget(max_docs_scanned=10)
+    assert budget.cap_pipeline([{"$unwind": "$tags"}]) == [{"$limit": 10}, {"$unwind": "$tags"}]
+    assert budget.cap_pipeline([]) == [{"$limit": 10}]
+
+
+@pytest.mark.parametrize("stage", [{"$sample": {"size": 5}}, {"$limit": 5}])
+def test_cap_pipeline_leaves_already_bounded_pipelines_alone(stage):
+    budget = QueryBudget(max_docs_scanned=10)
+    pipeline = [{"$match": {"a": 1}}, stage]
+    assert budget.cap_pipeline(pipeline) == pipeline
+
+
+def test_requested_limits_only_tighten_the_configured_ones():
+    budget = QueryBudget(timeout_seconds=10 ** 9, max_docs_scanned=10 ** 12)
+    assert budget.timeout_seconds == Config.ANALYSIS_TIMEOUT_SECONDS
+    assert budget.max_docs_scanned == Config.ANALYSIS_MAX_DOCS_SCANNED
+
+
+def test_expired_budget_raises():
+    budget = QueryBudget(timeout_seconds=1)
+    budget.deadline = time.monotonic() - 1
+    with pytest.raises(QueryBudgetExceeded):
+        budget.max_time_ms()
+
+
+def test_aggregate_marks_capped_collections(monkeypatch):
+    # mongomock rejects the comment option the query governor tags analyzer queries with
+    monkeypatch.setattr(Config, "ANALYSIS_QUERY_COMMENT", "")
+    collection = mongomock.MongoClient().db.items
+    collection.insert_many([{"n": i} for i in range(20)])
+    with query_governor.budget(max_docs_scanned=5) as budget:
+        results = list(query_governor.aggregate(collection, [{"$group": {"_id": None, "n": {"$sum": 1}}}]))
+    assert results[0]["n"] == 5
+    assert "items" in budget.capped
@@ -0,0 +1,113 @@
+import asyncio
+
+import fakeredis
+import mongomock
+import pytest
+
+from database_connectors import MongoDBConnector, RedisConnector, _pipeline_writes
+
+
+def collect(connector, query, batch_size=10, max_results=5):
+    async def run():
+        return [batch async for batch in connector.execute_query(query, batch_size, max_results, 5000)]
+    return asyncio.run(run())
+
+
+def records(connector, query, **kwargs):
+    return [record for batch in collect(connector, query, **kwargs) for record in batch]
+
+
+@pytest.mark.parametrize("pipeline, writes", [
+    ([{"$match": {}}], False),
+    ([{"$match": {}}, {"$out": "copy"}], True),
+    ([{"$facet": {"a": [{"$count": "n"}], "b": [{"$merge": {"into": "copy"}}]}}], True),
+    ([{"$lookup": {"from": "x", "as": "y", "pipeline": [{"$out": "copy"}]}}], True),
+    ([{"$unionWith": {"coll": "x", "pipeline": [{"$facet": {"a": [{"$merge": "copy"}]}}]}}], True),
+    ([{"$lookup": {"from": "x", "as": "y", "localField": "a", "foreignField": "b"}}], False),
+])
+def test_pipeline_writes_finds_nested_write_stages(pipeline, writes):
+    assert _pipeline_writes(pipeline) is writes
+
+
+def test_pipeline_writes_rejects_malformed_pipelines():
+    with pytest.raises(ValueError):
+        _pipeline_writes({"$out": "copy"})
+    with pytest.raises(ValueError):
+        _pipeline_writes(["$out"])
+
+
+@pytest.fixture
+def redis():
+    connector = RedisConnector()
+    connector.client = fakeredis.FakeAsyncRedis()
+
+    async def seed():
+        await connector.client.hset("hash", mapping={f"f{i}": i for i in range(50)})
+        await connector.client.sadd("set", *range(50))
+        await connector.client.rpush("list", *range(50))
+        await connector.client.zadd("zset", {f"m{i}": i for i in range(50)})
+        for i in range(50):
+            await connector.client.xadd("stream", {"n": i})
+        await connector.client.mset({f"key{i}": i for i in range(50)})
+    asyncio.run(seed())
+    return connector
+
+
+@pytest.mark.parametrize("command, key", [("HKEYS", "hash"), ("HVALS", "hash"), ("SMEMBERS", "set")])
+def test_whole_hash_and_set_reads_stop_at_max_results(redis, command, key):
+    assert len(records(redis, {"command": command, "args": [key]})) == 5
+
+
+def test_hgetall_returns_one_record_with_at_most_max_results_fields(redis):
+    assert [len(record) for record in records(redis, {"command": "HGETALL", "args": ["hash"]})] == [5]
+
+
+@pytest.mark.parametrize("args, expected", [
+    (["list", 0, -1], [0, 1, 2, 3, 4]),
+    (["list", -10, -1], [40, 41, 42, 43, 44]),
+    (["list", 48, 100], [48, 49]),
+])
+def test_lrange_is_clamped_on_the_server(redis, args, expected):
+    assert [record["value"] for record in records(redis, {"command": "LRANGE", "args": args})] == expected
+
+
+@pytest.mark.parametrize("command, args", [
+    ("ZRANGE", ["zset", 0, -1]),
+    ("ZREVRANGE", ["zset", 0, -1, "WITHSCORES"]),
+    ("ZRANGE", ["zset", "-inf", "+inf", "BYSCORE"]),
+    ("ZRANGEBYSCORE", ["zset", "-inf", "+inf"]),
+    ("ZRANGEBYSCORE", ["zset", "-inf", "+inf", "LIMIT", 0, -1]),
+    ("ZREVRANGEBYSCORE", ["zset", "+inf", "-inf", "LIMIT", 0, 1000]),
+    ("XRANGE", ["stream", "-", "+"]),
+    ("XREVRANGE", ["stream", "+", "-", "COUNT", 1000]),
+    ("MGET", [f"key{i}" for i in range(50)]),
+    ("HMGET", ["hash"] + [f"f{i}" for i in range(50)]),
+    ("SRANDMEMBER", ["set", -1000]),
+])
+def test_range_and_multi_key_reads_send_at_most_max_results(redis, command, args, monkeypatch):
+    replies = []
+    original = redis.client.execute_command
+
+    async def spy(*command_args, **kwargs):
+        reply = await original(*command_args, **kwargs)
+        replies.append(reply)
+        return reply
+
+    monkeypatch.setattr(redis.client, "execute_command", spy)
+    assert 0 < len(records(redis, {"command": command, "args": args})) <= 5
+    # The server already replied with no more than max_results items
+    assert len(replies[-1]) <= 5
+
+
+def test_mongodb_limit_must_be_positive():
+    connector = MongoDBConnector()
+    connector.client = mongomock.MongoClient()
+    connector.database = connector.client["db"]
+    connector.database["items"].insert_many([{"n": i} for i in range(20)])
+    assert len(records(connector, {"collection": "items", "limit": 3}, max_results=10)) == 3
+    assert len(records(connector, {"collection": "items", "limit": 100}, max_results=10)) == 10
+    for limit in (0, -5):
+        with pytest.raises(ValueError):
+            records(connector, {"collection": "items", "limit": limit})
+        with pytest.raises(ValueError):
+            records(connector, {"collection": "items", "limit": limit, "pipeline": [{"$match": {}}]})
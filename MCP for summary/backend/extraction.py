@@ -0,0 +1,101 @@
+import asyncio
+import os
+import tempfile
+import zipfile
+
+from PyPDF2 import PdfReader
+from docx import Document
+
+# Pages are joined with a form feed so downstream chunking can split on page boundaries
+PAGE_SEPARATOR = "\f"
+
+SUPPORTED_EXTENSIONS = {"pdf", "docx", "txt"}
+
+
+class DocumentTooLargeError(ValueError):
+    """Raised when a document exceeds the configured size or page limits."""
+
+
+def get_extension(filename):
+    return filename.lower().split(".")[-1]
+
+# Helper: Count pages without extracting any text
+def count_pdf_pages(file_path):
+    with open(file_path, "rb") as f:
+        return len(PdfReader(f).pages)
+
+# Helper: Extract text from a range of PDF pages (runs inside a worker process)
+def extract_pdf_pages(file_path, start, end):
+    with open(file_path, "rb") as f:
+        reader = PdfReader(f)
+        return PAGE_SEPARATOR.join(reader.pages[i].extract_text() or "" for i in range(start, end))
+
+# Helper: Extract text from PDF
+def extract_text_pdf(file_path):
+    return extract_pdf_pages(file_path, 0, count_pdf_pages(file_path))
+
+# Helper: Extract text from DOCX
+def extract_text_docx(file_path):
+    doc = Document(file_path)
+    return "\n".join([para.text for para in doc.paragraphs])
+
+# Helper: Extract text from TXT
+def extract_text_txt(file_path):
+    with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
+        return f.read()
+
+# Helper: Route to correct extractor
+def extract_text(file_path, filename):
+    ext = get_extension(filename)
+    if ext == "pdf":
+        return extract_text_pdf(file_path)
+    elif ext == "docx":
+        return extract_text_docx(file_path)
+    elif ext == "txt":
+        return extract_text_txt(file_path)
+    else:
+        raise ValueError("Unsupported file type")
+
+
+# Helper: Unpack supported documents from a zip archive into temp files
+def expand_zip(zip_path, max_files, max_member_bytes):
+    documents = []
+    try:
+        with zipfile.ZipFile(zip_path) as archive:
+            for member in archive.infolist():
+                name = os.path.basename(member.filename)
+                if member.is_dir() or not name or get_extension(name) not in SUPPORTED_EXTENSIONS:
+                    continue
+                if len(documents) >= max_files:
+                    raise DocumentTooLargeError(f"Archive contains more than {max_files} documents.")
+                if member.file_size > max_member_bytes:
+                    raise DocumentTooLargeError(f"{name} exceeds the {max_member_bytes} byte limit.")
+                with archive.open(member) as src, tempfile.NamedTemporaryFile(
+                        delete=False, suffix="." + get_extension(name)) as dst:
+                    documents.append((name, dst.name, member.file_size))
+                    while True:
+                        chunk = src.read(1024 * 1024)
+                        if not chunk:
+                            break
+                        dst.write(chunk)
+    except Exception:
+        for _, path, _ in documents:
+            os.unlink(path)
+        raise
+    return documents
+
+
+async def extract_text_async(executor, file_path, filename, max_pages, pages_per_task):
+    """Extract text in the given process pool, fanning large PDFs out by page range."""
+    loop = asyncio.get_running_loop()
+    if get_extension(filename) != "pdf":
+        return await loop.run_in_executor(executor, extract_text, file_path, filename)
+    page_count = await loop.run_in_executor(executor, count_pdf_pages, file_path)
+    if page_count > max_pages:
+        raise DocumentTooLargeError(f"PDF has {page_count} pages; the limit is {max_pages}.")
+    ranges = [(start, min(start + pages_per_task, page_count))
+              for start in range(0, page_count, pages_per_task)]
+    parts = await asyncio.gather(
+        *(loop.run_in_executor(executor, extract_pdf_pages, file_path, start, end) for start, end in ranges)
+    )
+    return PAGE_SEPARATOR.join(parts)
@@ -0,0 +1,95 @@
+import asyncio
+import logging
+import random
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Status codes worth retrying: rate limiting and transient server errors
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class LLMClient:
+    """Async chat-completions client with a shared keep-alive connection pool.
+
+    One instance is shared by every request in the worker. Calls are bounded by
+    a semaphore so bursts queue locally instead of flooding the provider, and
+    429/5xx responses are retried with exponential backoff and jitter.
+    """
+
+    def __init__(self, api_url, api_key, model, timeout=60.0, connect_timeout=10.0,
+                 max_retries=3, backoff_base=0.5, backoff_max=8.0,
+                 max_concurrency=8, max_connections=20, max_keepalive_connections=10):
+        self.api_url = api_url
+        self.api_key = api_key
+        self.model = model
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+        )
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_concurrency = max_concurrency
+        self._semaphore = None
+        self._client = None
+
+    def _get_client(self):
+        # Created lazily so the pool and semaphore bind to the running event loop
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(timeout=self.timeout, limits=self.limits)
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._client
+
+    def _backoff_delay(self, attempt, retry_after=None):
+        if retry_after:
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                pass
+        delay = min(self.backoff_base * (2 ** attempt), self.backoff_max)
+        return delay * (0.5 + random.random() / 2)
+
+    async def chat(self, messages, system_prompt):
+        """Send a chat completion request and return the assistant message content."""
+        client = self._get_client()
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {self.api_key}",
+        }
+        data = {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                *messages
+            ]
+        }
+        async with self._semaphore:
+            for attempt in range(self.max_retries + 1):
+                last_attempt = attempt == self.max_retries
+                try:
+                    response = await client.post(self.api_url, headers=headers, json=data)
+                except (httpx.TimeoutException, httpx.TransportError) as e:
+                    if last_attempt:
+                        return f"[ERROR] Groq API request failed: {str(e)}"
+                    logger.warning(f"Groq request failed ({e!r}), retrying")
+                    await asyncio.sleep(self._backoff_delay(attempt))
+                    continue
+                if response.status_code in RETRYABLE_STATUS_CODES and not last_attempt:
+                    logger.warning(f"Groq API returned {response.status_code}, retrying")
+                    await asyncio.sleep(self._backoff_delay(attempt, response.headers.get("retry-after")))
+                    continue
+                if response.status_code != 200:
+                    return f"[ERROR] Groq API error: {response.text}"
+                try:
+                    return response.json()["choices"][0]["message"]["content"]
+                except Exception:
+                    return "[ERROR] Unexpected Groq API response."
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
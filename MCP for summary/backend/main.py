@@ -1,14 +1,25 @@
 from fastapi import FastAPI, File, UploadFile, HTTPException, Form
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi import Request
+from typing import List
 import os
+import json
 import tempfile
-from PyPDF2 import PdfReader
-from docx import Document
-import requests
-import uuid
 import time
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+
+from extraction import (
+    SUPPORTED_EXTENSIONS, DocumentTooLargeError, expand_zip, extract_text_async, get_extension
+)
+from llm_client import LLMClient
+from response_cache import ResponseCache
+from retrieval import ChunkRetriever, HashingEmbedder
+from search_index import BM25Index
+from session_store import SessionStore
+from summarizer import ChunkedSummarizer, split_text
+from token_budget import PromptBudget
 
 app = FastAPI()
 
@@ -21,167 +32,388 @@ app.add_middleware(
 )
 
 GROQ_API_KEY = os.getenv("GROQ_API_KEY", "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")
-GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"
-GROQ_MODEL = "meta-llama/llama-4-scout-17b-16e-instruct"
-
-# In-memory session store: {session_id: {metadata, text, summary, note, chat_history}}
-sessions = {}
-
-# Helper: Extract text from PDF
-def extract_text_pdf(file_path):
-    text = ""
-    with open(file_path, "rb") as f:
-        reader = PdfReader(f)
-        for page in reader.pages:
-            text += page.extract_text() or ""
-    return text
-
-# Helper: Extract text from DOCX
-def extract_text_docx(file_path):
-    doc = Document(file_path)
-    return "\n".join([para.text for para in doc.paragraphs])
-
-# Helper: Extract text from TXT
-def extract_text_txt(file_path):
-    with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-        return f.read()
-
-# Helper: Route to correct extractor
-def extract_text(file_path, filename):
-    ext = filename.lower().split(".")[-1]
-    if ext == "pdf":
-        return extract_text_pdf(file_path)
-    elif ext == "docx":
-        return extract_text_docx(file_path)
-    elif ext == "txt":
-        return extract_text_txt(file_path)
-    else:
-        raise ValueError("Unsupported file type")
+GROQ_API_URL = os.getenv("GROQ_API_URL", "https://api.groq.com/openai/v1/chat/completions")
+GROQ_MODEL = os.getenv("GROQ_MODEL", "meta-llama/llama-4-scout-17b-16e-instruct")
+
+# Shared async LLM client: one keep-alive pool and concurrency limit per worker
+llm_client = LLMClient(
+    api_url=GROQ_API_URL,
+    api_key=GROQ_API_KEY,
+    model=GROQ_MODEL,
+    timeout=float(os.getenv("GROQ_TIMEOUT", 60)),
+    connect_timeout=float(os.getenv("GROQ_CONNECT_TIMEOUT", 10)),
+    max_retries=int(os.getenv("GROQ_MAX_RETRIES", 3)),
+    max_concurrency=int(os.getenv("GROQ_MAX_CONCURRENCY", 8)),
+    max_connections=int(os.getenv("GROQ_MAX_CONNECTIONS", 20)),
+)
+
+# Prompt-size budget applied to every LLM call
+prompt_budget = PromptBudget(
+    max_prompt_tokens=int(os.getenv("MAX_PROMPT_TOKENS", 8000)),
+    reserve_tokens=int(os.getenv("PROMPT_RESERVE_TOKENS", 1500)),
+    max_history_message_tokens=int(os.getenv("MAX_HISTORY_MESSAGE_TOKENS", 400)),
+)
+
+# Persistent LLM response cache shared by all workers on this host
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+response_cache = ResponseCache(
+    path=os.getenv("LLM_CACHE_PATH", os.path.join(tempfile.gettempdir(), "summary_llm_cache.sqlite3")),
+    max_bytes=int(os.getenv("LLM_CACHE_MAX_BYTES", 256 * 1024 * 1024)),
+) if LLM_CACHE_ENABLED else None
+
+# Retrieval settings for /ask: chunks are embedded once at upload time
+RETRIEVAL_CHUNK_TOKENS = int(os.getenv("RETRIEVAL_CHUNK_TOKENS", 250))
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", 4))
+embedder = HashingEmbedder(dim=int(os.getenv("EMBEDDING_DIM", 4096)))
+
+# Disk-backed session store, shareable by all workers on this host
+session_store = SessionStore(
+    root_dir=os.getenv("SESSION_DIR", os.path.join(tempfile.gettempdir(), "summary_sessions")),
+    max_hot_sessions=int(os.getenv("MAX_HOT_SESSIONS", 64)),
+    idle_ttl=int(os.getenv("SESSION_IDLE_TTL", 86400)),
+    max_history_messages=int(os.getenv("MAX_HISTORY_MESSAGES", 100)),
+)
+SESSION_PURGE_INTERVAL = int(os.getenv("SESSION_PURGE_INTERVAL", 600))
+
+# Upload and extraction limits
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", 50 * 1024 * 1024))
+MAX_PDF_PAGES = int(os.getenv("MAX_PDF_PAGES", 2000))
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", 50))
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Batch limits: documents per request and concurrent summarizations per batch
+MAX_BATCH_FILES = int(os.getenv("MAX_BATCH_FILES", 500))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", 8))
+
+# Process pool for CPU-bound text extraction, created on first upload
+extraction_pool = None
+
+def get_extraction_pool():
+    global extraction_pool
+    if extraction_pool is None:
+        extraction_pool = ProcessPoolExecutor(max_workers=int(os.getenv("EXTRACTION_WORKERS", os.cpu_count() or 2)))
+    return extraction_pool
+
+# Helper: Stream an upload to a temp file in chunks, enforcing the size limit
+async def save_upload(file: UploadFile):
+    if file.size is not None and file.size > MAX_UPLOAD_BYTES:
+        raise DocumentTooLargeError(f"File exceeds the {MAX_UPLOAD_BYTES} byte limit.")
+    size = 0
+    tmp = tempfile.NamedTemporaryFile(delete=False, suffix="." + get_extension(file.filename))
+    try:
+        with tmp:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > MAX_UPLOAD_BYTES:
+                    raise DocumentTooLargeError(f"File exceeds the {MAX_UPLOAD_BYTES} byte limit.")
+                tmp.write(chunk)
+    except Exception:
+        os.unlink(tmp.name)
+        raise
+    return tmp.name, size
 
 # Helper: Get file metadata
-def get_metadata(file: UploadFile, text: str):
+def get_metadata(filename: str, content_type: str, text: str, size: int):
     return {
-        "filename": file.filename,
-        "size": file.spool_max_size if hasattr(file, 'spool_max_size') else None,
+        "filename": filename,
+        "size": size,
         "upload_time": int(time.time()),
-        "type": file.content_type,
+        "type": content_type,
         "char_count": len(text),
         "word_count": len(text.split()),
     }
 
 # Groq API call
-def groq_chat(messages, role="summarizer"):
+async def groq_chat(messages, role="summarizer", use_cache=True):
     if not GROQ_API_KEY or GROQ_API_KEY.startswith("YOUR_"):
         return "[ERROR] Groq API key not set."
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {GROQ_API_KEY}",
-    }
     system_prompt = {
         "summarizer": "You are a helpful document summarizer. Provide a concise, clear summary in markdown.",
         "explainer": "You are a helpful explainer. Explain the document in detail, in markdown.",
         "qa": "You are a helpful assistant. Answer the user's question about the document in markdown."
     }.get(role, "You are a helpful assistant. Respond in markdown.")
-    data = {
-        "model": GROQ_MODEL,
-        "messages": [
-            {"role": "system", "content": system_prompt},
-            *messages
-        ]
-    }
-    response = requests.post(GROQ_API_URL, headers=headers, json=data)
-    if response.status_code != 200:
-        return f"[ERROR] Groq API error: {response.text}"
-    result = response.json()
-    try:
-        return result["choices"][0]["message"]["content"]
-    except Exception:
-        return "[ERROR] Unexpected Groq API response."
+    messages = prompt_budget.fit(messages)
+    if response_cache is None:
+        return await llm_client.chat(messages, system_prompt)
+    # With use_cache=False the lookup is skipped but the fresh response is still stored
+    key = ResponseCache.make_key(GROQ_MODEL, system_prompt, messages)
+    if use_cache:
+        cached = await asyncio.to_thread(response_cache.get, key)
+        if cached is not None:
+            return cached
+    result = await llm_client.chat(messages, system_prompt)
+    if not result.startswith("[ERROR]"):
+        await asyncio.to_thread(response_cache.put, key, result)
+    return result
+
+# Map-reduce summarizer for documents too large for a single prompt
+summarizer = ChunkedSummarizer(
+    chat_fn=groq_chat,
+    model=GROQ_MODEL,
+    single_pass_tokens=int(os.getenv("SUMMARY_SINGLE_PASS_TOKENS", 6000)),
+    chunk_tokens=int(os.getenv("SUMMARY_CHUNK_TOKENS", 3000)),
+    reduce_tokens=int(os.getenv("SUMMARY_REDUCE_TOKENS", 6000)),
+    max_parallel=int(os.getenv("SUMMARY_MAX_PARALLEL", 4)),
+)
+
+# Helper: Load a session's mutable state, or 404
+async def load_session(session_id):
+    session = await asyncio.to_thread(session_store.get, session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found.")
+    return session
+
+# Helper: Search index for a session, rebuilt from the stored text if not hot in this worker
+async def get_search_index(session_id):
+    return await asyncio.to_thread(
+        session_store.get_derived, session_id, "index",
+        lambda: BM25Index.from_text(session_store.load_text(session_id))
+    )
+
+# Helper: Retriever for a session, reusing the memory-mapped embedding matrix when present
+async def get_retriever(session_id):
+    def build():
+        text = session_store.load_text(session_id)
+        chunks = split_text(text, RETRIEVAL_CHUNK_TOKENS)
+        matrix = session_store.load_embeddings(session_id)
+        if matrix is None or matrix.shape != (len(chunks), embedder.dim):
+            return ChunkRetriever.build(text, embedder, RETRIEVAL_CHUNK_TOKENS)
+        return ChunkRetriever(chunks, matrix, embedder)
+    return await asyncio.to_thread(session_store.get_derived, session_id, "retriever", build)
+
+async def purge_expired_sessions():
+    while True:
+        await asyncio.sleep(SESSION_PURGE_INTERVAL)
+        try:
+            await asyncio.to_thread(session_store.purge_expired)
+        except Exception as e:
+            print(f"Session purge failed: {e}")
+
+@app.on_event("startup")
+async def start_session_purger():
+    app.state.session_purger = asyncio.create_task(purge_expired_sessions())
+
+@app.on_event("shutdown")
+async def close_llm_client():
+    await llm_client.aclose()
+    if extraction_pool is not None:
+        extraction_pool.shutdown(wait=False, cancel_futures=True)
+    if response_cache is not None:
+        response_cache.close()
+    app.state.session_purger.cancel()
+    session_store.close()
+
+# Helper: Extract, index and persist one document saved at path; returns (session_id, metadata)
+async def ingest_document(path, filename, content_type, size):
+    text = await extract_text_async(
+        get_extraction_pool(), path, filename,
+        max_pages=MAX_PDF_PAGES, pages_per_task=PDF_PAGES_PER_TASK
+    )
+    if not text.strip():
+        raise HTTPException(status_code=400, detail="No text found in document.")
+    loop = asyncio.get_running_loop()
+    index, retriever = await asyncio.gather(
+        loop.run_in_executor(None, BM25Index.from_text, text),
+        loop.run_in_executor(None, ChunkRetriever.build, text, embedder, RETRIEVAL_CHUNK_TOKENS),
+    )
+    metadata = get_metadata(filename, content_type, text, size)
+    session_id = await asyncio.to_thread(session_store.create, metadata, text, retriever.matrix)
+    session_store.put_derived(session_id, "index", index)
+    session_store.put_derived(session_id, "retriever", retriever)
+    return session_id, metadata, text
 
 @app.post("/upload")
 async def upload(file: UploadFile = File(...)):
     try:
-        with tempfile.NamedTemporaryFile(delete=False) as tmp:
-            tmp.write(await file.read())
-            tmp_path = tmp.name
-        text = extract_text(tmp_path, file.filename)
-        os.unlink(tmp_path)
-        if not text.strip():
-            raise HTTPException(status_code=400, detail="No text found in document.")
-        session_id = str(uuid.uuid4())
-        metadata = get_metadata(file, text)
-        sessions[session_id] = {
-            "metadata": metadata,
-            "text": text,
-            "summary": None,
-            "note": None,
-            "chat_history": []
-        }
+        if get_extension(file.filename) not in SUPPORTED_EXTENSIONS:
+            raise ValueError("Unsupported file type")
+        tmp_path, size = await save_upload(file)
+        try:
+            session_id, metadata, _ = await ingest_document(tmp_path, file.filename, file.content_type, size)
+        finally:
+            os.unlink(tmp_path)
         return {"session_id": session_id, "metadata": metadata}
+    except HTTPException:
+        raise
+    except DocumentTooLargeError as te:
+        raise HTTPException(status_code=413, detail=str(te))
     except ValueError as ve:
         raise HTTPException(status_code=400, detail=str(ve))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing file: {str(e)}")
 
+def remove_file(path):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+# Helper: Ingest and summarize one batch document, returning a per-document result line
+async def process_batch_document(filename, path, size, content_type, note, role, use_cache, semaphore):
+    started = time.perf_counter()
+    result = {"filename": filename, "size": size}
+    try:
+        session_id, metadata, text = await ingest_document(path, filename, content_type, size)
+        extracted = time.perf_counter()
+        async with semaphore:
+            queued = time.perf_counter()
+            summary = await summarizer.summarize(text, metadata, note=note, role=role, use_cache=use_cache)
+        finished = time.perf_counter()
+        await asyncio.to_thread(session_store.update, session_id, summary, note)
+        result.update({
+            "status": "error" if summary.startswith("[ERROR]") else "ok",
+            "session_id": session_id,
+            "metadata": metadata,
+            "summary": summary,
+            "timings": {
+                "extract_seconds": round(extracted - started, 3),
+                "queue_seconds": round(queued - extracted, 3),
+                "summarize_seconds": round(finished - queued, 3),
+                "total_seconds": round(finished - started, 3),
+            },
+        })
+    except HTTPException as he:
+        result.update({"status": "error", "error": he.detail})
+    except Exception as e:
+        result.update({"status": "error", "error": str(e)})
+    finally:
+        remove_file(path)
+    return result
+
+@app.post("/batch/summarize")
+async def batch_summarize(files: List[UploadFile] = File(...), note: str = Form(None),
+                          role: str = Form("summarizer"), no_cache: bool = Form(False)):
+    """Summarize many documents (or zips of documents), streaming NDJSON results as they complete."""
+    documents = []
+    try:
+        # Everything is spooled to disk up front: upload handles close once the response starts streaming
+        for file in files:
+            ext = get_extension(file.filename)
+            if ext != "zip" and ext not in SUPPORTED_EXTENSIONS:
+                raise ValueError(f"Unsupported file type: {file.filename}")
+            tmp_path, size = await save_upload(file)
+            if ext == "zip":
+                try:
+                    members = await asyncio.to_thread(
+                        expand_zip, tmp_path, MAX_BATCH_FILES - len(documents), MAX_UPLOAD_BYTES
+                    )
+                finally:
+                    os.unlink(tmp_path)
+                documents.extend((name, path, member_size, None) for name, path, member_size in members)
+            else:
+                documents.append((file.filename, tmp_path, size, file.content_type))
+            if len(documents) > MAX_BATCH_FILES:
+                raise DocumentTooLargeError(f"Batch exceeds the {MAX_BATCH_FILES} document limit.")
+    except Exception as e:
+        for _, path, _, _ in documents:
+            remove_file(path)
+        if isinstance(e, DocumentTooLargeError):
+            raise HTTPException(status_code=413, detail=str(e))
+        if isinstance(e, ValueError):
+            raise HTTPException(status_code=400, detail=str(e))
+        raise HTTPException(status_code=500, detail=f"Error processing batch: {str(e)}")
+
+    async def stream_results():
+        started = time.perf_counter()
+        semaphore = asyncio.Semaphore(BATCH_MAX_CONCURRENCY)
+        tasks = [
+            asyncio.create_task(process_batch_document(
+                name, path, size, content_type, note, role, not no_cache, semaphore
+            ))
+            for name, path, size, content_type in documents
+        ]
+        succeeded = 0
+        total_bytes = 0
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                result = await next_done
+                succeeded += result["status"] == "ok"
+                total_bytes += result["size"]
+                yield json.dumps(result) + "\n"
+        finally:
+            # On client disconnect, stop outstanding work and drop files of tasks that never started
+            for task in tasks:
+                task.cancel()
+            for _, path, _, _ in documents:
+                remove_file(path)
+        elapsed = time.perf_counter() - started
+        yield json.dumps({
+            "type": "aggregate",
+            "documents": len(tasks),
+            "succeeded": succeeded,
+            "failed": len(tasks) - succeeded,
+            "elapsed_seconds": round(elapsed, 3),
+            "documents_per_second": round(len(tasks) / elapsed, 3) if elapsed else None,
+            "bytes_per_second": round(total_bytes / elapsed, 1) if elapsed else None,
+        }) + "\n"
+
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
 @app.post("/summarize")
-async def summarize(session_id: str = Form(...), note: str = Form(None), role: str = Form("summarizer")):
-    if session_id not in sessions:
-        raise HTTPException(status_code=404, detail="Session not found.")
-    session = sessions[session_id]
-    text = session["text"]
+async def summarize(session_id: str = Form(...), note: str = Form(None), role: str = Form("summarizer"),
+                    no_cache: bool = Form(False)):
+    session = await load_session(session_id)
+    text = await asyncio.to_thread(session_store.load_text, session_id)
     metadata = session["metadata"]
-    prompt = f"Document metadata: {metadata}\n\nDocument text:\n{text}"
+    summary = await summarizer.summarize(text, metadata, note=note, role=role, use_cache=not no_cache)
+    await asyncio.to_thread(session_store.update, session_id, summary, note)
+    # Record a compact request in history; the document itself is never replayed
+    request = f"Summarize the document {metadata['filename']} (role: {role})."
     if note and note.strip():
-        prompt += f"\n\nAdditional note: {note.strip()}"
-    messages = [
-        {"role": "user", "content": prompt}
-    ]
-    summary = groq_chat(messages, role=role)
-    session["summary"] = summary
-    session["note"] = note
-    session["chat_history"].append({"role": "user", "content": prompt})
-    session["chat_history"].append({"role": "assistant", "content": summary})
+        request += f" Note: {note.strip()}"
+    await asyncio.to_thread(session_store.append_history, session_id, [
+        {"role": "user", "content": request},
+        {"role": "assistant", "content": summary},
+    ])
     return {"summary": summary, "metadata": metadata, "session_id": session_id}
 
 @app.post("/ask")
-async def ask(session_id: str = Form(...), question: str = Form(...), role: str = Form("qa")):
-    if session_id not in sessions:
-        raise HTTPException(status_code=404, detail="Session not found.")
-    session = sessions[session_id]
+async def ask(session_id: str = Form(...), question: str = Form(...), role: str = Form("qa"),
+              no_cache: bool = Form(False)):
+    session = await load_session(session_id)
     chat_history = session["chat_history"]
-    # Use last summary as context
-    context = session["summary"] or ""
-    messages = chat_history[-6:] if len(chat_history) > 6 else chat_history[:]
-    messages = messages + [{"role": "user", "content": f"Context: {context}\n\nQuestion: {question}"}]
-    answer = groq_chat(messages, role=role)
-    session["chat_history"].append({"role": "user", "content": question})
-    session["chat_history"].append({"role": "assistant", "content": answer})
-    return {"answer": answer, "session_id": session_id, "chat_history": session["chat_history"]}
+    # Use the most relevant document chunks, plus the last summary, as context
+    retriever = await get_retriever(session_id)
+    retrieved = retriever.top_k(question, k=RETRIEVAL_TOP_K)
+    # Excerpts are packed best-first, then the summary, then as much history as fits
+    context_parts = [f"Excerpt {rank}:\n{chunk}" for rank, (_, chunk, _) in enumerate(retrieved, 1)]
+    if session["summary"]:
+        context_parts.append(f"Document summary:\n{session['summary']}")
+    messages, budget_stats = prompt_budget.pack(question, context_parts, chat_history)
+    answer = await groq_chat(messages, role=role, use_cache=not no_cache)
+    chat_history = await asyncio.to_thread(session_store.append_history, session_id, [
+        {"role": "user", "content": question},
+        {"role": "assistant", "content": answer},
+    ])
+    sources = [{"chunk_index": i, "score": round(score, 4)} for i, _, score in retrieved]
+    return {"answer": answer, "session_id": session_id, "chat_history": chat_history, "sources": sources,
+            "prompt": budget_stats}
 
 @app.post("/search")
-async def search(session_id: str = Form(...), query: str = Form(...)):
-    # Stub: In a real system, use embeddings to find relevant context
-    if session_id not in sessions:
-        raise HTTPException(status_code=404, detail="Session not found.")
-    session = sessions[session_id]
-    text = session["text"]
-    # For now, just return the first chunk containing the query
-    idx = text.lower().find(query.lower())
-    if idx == -1:
-        return {"result": "No relevant context found."}
-    start = max(0, idx - 100)
-    end = min(len(text), idx + 300)
-    chunk = text[start:end]
-    return {"result": chunk}
+async def search(session_id: str = Form(...), query: str = Form(...), top_k: int = Form(5)):
+    await load_session(session_id)
+    index = await get_search_index(session_id)
+    results = index.search(query, top_k=max(1, min(top_k, 50)))
+    if not results:
+        return {"result": "No relevant context found.", "results": []}
+    return {"result": results[0]["passage"], "results": results}
 
 @app.get("/session/{session_id}")
 async def get_session(session_id: str):
-    if session_id not in sessions:
-        raise HTTPException(status_code=404, detail="Session not found.")
-    session = sessions[session_id]
+    session = await load_session(session_id)
     return {
         "metadata": session["metadata"],
         "summary": session["summary"],
         "note": session["note"],
         "chat_history": session["chat_history"]
-    } 
\ No newline at end of file
+    }
+
+@app.get("/cache/stats")
+async def cache_stats():
+    if response_cache is None:
+        return {"enabled": False}
+    stats = await asyncio.to_thread(response_cache.stats)
+    return {"enabled": True, **stats}
@@ -0,0 +1,66 @@
+import zlib
+
+import numpy as np
+
+from search_index import tokenize
+from summarizer import split_text
+
+
+class HashingEmbedder:
+    """Stateless hashing vectorizer: unigrams and bigrams hashed into a fixed-size space.
+
+    crc32 is used instead of hash() so vectors are identical across worker
+    processes. Term counts are sublinearly scaled and rows are L2-normalized,
+    so a dot product is the cosine similarity.
+    """
+
+    def __init__(self, dim=4096, use_bigrams=True):
+        self.dim = dim
+        self.use_bigrams = use_bigrams
+
+    def _features(self, text):
+        tokens = tokenize(text)
+        features = tokens
+        if self.use_bigrams:
+            features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        hashes = np.fromiter((zlib.crc32(f.encode("utf-8")) for f in features), dtype=np.uint32, count=len(features))
+        indices = (hashes % self.dim).astype(np.intp)
+        # The top bit picks a sign so colliding features tend to cancel out
+        signs = np.where(hashes >> 31, -1.0, 1.0)
+        return indices, signs
+
+    def embed(self, texts):
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            indices, signs = self._features(text)
+            if len(indices):
+                matrix[row] = np.bincount(indices, weights=signs, minlength=self.dim)
+        np.copysign(np.log1p(np.abs(matrix)), matrix, out=matrix)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        matrix /= norms
+        return matrix
+
+
+class ChunkRetriever:
+    """Holds one document's chunks and their embedding matrix for top-k lookup."""
+
+    def __init__(self, chunks, matrix, embedder):
+        self.chunks = chunks
+        self.matrix = matrix
+        self.embedder = embedder
+
+    @classmethod
+    def build(cls, text, embedder, chunk_tokens=250):
+        chunks = split_text(text, chunk_tokens)
+        return cls(chunks, embedder.embed(chunks), embedder)
+
+    def top_k(self, query, k=4):
+        """Return up to k (chunk_index, chunk, score) tuples, best first, skipping zero scores."""
+        if not self.chunks:
+            return []
+        scores = self.matrix @ self.embedder.embed([query])[0]
+        k = min(k, len(self.chunks))
+        candidates = np.argpartition(-scores, k - 1)[:k]
+        ranked = candidates[np.argsort(-scores[candidates])]
+        return [(int(i), self.chunks[i], float(scores[i])) for i in ranked if scores[i] > 0]
@@ -0,0 +1,70 @@
+import heapq
+import math
+import re
+from collections import defaultdict
+
+from summarizer import split_text
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text):
+    return [match.group().lower() for match in TOKEN_PATTERN.finditer(text)]
+
+
+class BM25Index:
+    """Per-document inverted index over passages with BM25 ranking.
+
+    Postings map each term to {passage_id: [char offsets]}, so a query only
+    touches the postings of its own terms, and the stored offsets double as
+    highlight spans for the returned passages.
+    """
+
+    def __init__(self, passages, k1=1.5, b=0.75):
+        self.passages = passages
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(dict)
+        self.lengths = []
+        for passage_id, passage in enumerate(passages):
+            length = 0
+            for match in TOKEN_PATTERN.finditer(passage):
+                self.postings[match.group().lower()].setdefault(passage_id, []).append(match.start())
+                length += 1
+            self.lengths.append(length)
+        self.postings = dict(self.postings)
+        self.avg_length = sum(self.lengths) / len(self.lengths) if self.lengths else 0.0
+
+    @classmethod
+    def from_text(cls, text, passage_tokens=120):
+        return cls(split_text(text, passage_tokens))
+
+    def _idf(self, document_frequency):
+        n = len(self.passages)
+        return math.log(1 + (n - document_frequency + 0.5) / (document_frequency + 0.5))
+
+    def search(self, query, top_k=5):
+        """Return the top_k passages for query, each with its score and highlight spans."""
+        terms = set(tokenize(query))
+        scores = defaultdict(float)
+        matches = defaultdict(list)
+        for term in terms:
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = self._idf(len(postings))
+            for passage_id, offsets in postings.items():
+                tf = len(offsets)
+                norm = 1 - self.b + self.b * self.lengths[passage_id] / self.avg_length
+                scores[passage_id] += idf * tf * (self.k1 + 1) / (tf + self.k1 * norm)
+                matches[passage_id].extend((offset, offset + len(term)) for offset in offsets)
+        top = heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+        return [
+            {
+                "passage": self.passages[passage_id],
+                "passage_index": passage_id,
+                "score": round(score, 4),
+                "highlights": sorted(matches[passage_id]),
+            }
+            for passage_id, score in top
+        ]
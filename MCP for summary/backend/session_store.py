@@ -0,0 +1,172 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class SessionStore:
+    """Disk-backed document sessions that can be shared by several worker processes.
+
+    Mutable session state (summary, note, chat history) lives in a SQLite file in
+    WAL mode. Document text is written once as a zlib-compressed blob (always read
+    whole) and the embedding matrix as a .npy file, memory-mapped when read. Only
+    immutable, expensive-to-rebuild objects (metadata, search index, retriever)
+    are kept in process memory, under an LRU cap, and sessions idle for longer
+    than idle_ttl seconds are purged.
+    """
+
+    def __init__(self, root_dir, max_hot_sessions=64, idle_ttl=86400, max_history_messages=100):
+        self.root_dir = root_dir
+        self.blob_dir = os.path.join(root_dir, "blobs")
+        self.max_hot_sessions = max_hot_sessions
+        self.idle_ttl = idle_ttl
+        self.max_history_messages = max_history_messages
+        os.makedirs(self.blob_dir, exist_ok=True)
+        self._hot = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            os.path.join(root_dir, "sessions.sqlite3"), check_same_thread=False, timeout=30,
+            isolation_level=None,
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "session_id TEXT PRIMARY KEY, metadata TEXT NOT NULL, summary TEXT, note TEXT, "
+            "chat_history TEXT NOT NULL, created_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_last_access ON sessions(last_access)")
+
+    def _blob_path(self, session_id, suffix):
+        return os.path.join(self.blob_dir, f"{session_id}{suffix}")
+
+    @staticmethod
+    def _write_atomic(path, write):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            write(f)
+        os.replace(tmp_path, path)
+
+    def create(self, metadata, text, embeddings=None):
+        """Persist a new session and return its id."""
+        session_id = str(uuid.uuid4())
+        compressed = zlib.compress(text.encode("utf-8"), 6)
+        self._write_atomic(self._blob_path(session_id, ".txt.z"), lambda f: f.write(compressed))
+        if embeddings is not None:
+            self._write_atomic(self._blob_path(session_id, ".npy"), lambda f: np.save(f, embeddings))
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO sessions (session_id, metadata, summary, note, chat_history, created_at, last_access) "
+                "VALUES (?, ?, NULL, NULL, '[]', ?, ?)",
+                (session_id, json.dumps(metadata), now, now),
+            )
+        return session_id
+
+    def get(self, session_id):
+        """Return {metadata, summary, note, chat_history}, or None if missing or expired."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT metadata, summary, note, chat_history, last_access FROM sessions WHERE session_id = ?",
+                (session_id,),
+            ).fetchone()
+            if row is None or now - row[4] > self.idle_ttl:
+                return None
+            self._conn.execute("UPDATE sessions SET last_access = ? WHERE session_id = ?", (now, session_id))
+        metadata, summary, note, chat_history, _ = row
+        return {
+            "metadata": json.loads(metadata),
+            "summary": summary,
+            "note": note,
+            "chat_history": json.loads(chat_history),
+        }
+
+    def load_text(self, session_id):
+        with open(self._blob_path(session_id, ".txt.z"), "rb") as f:
+            return zlib.decompress(f.read()).decode("utf-8")
+
+    def load_embeddings(self, session_id):
+        path = self._blob_path(session_id, ".npy")
+        if not os.path.exists(path):
+            return None
+        return np.load(path, mmap_mode="r")
+
+    def update(self, session_id, summary, note):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE sessions SET summary = ?, note = ?, last_access = ? WHERE session_id = ?",
+                (summary, note, time.time(), session_id),
+            )
+
+    def append_history(self, session_id, messages):
+        """Append messages atomically (across processes) and return the capped history."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT chat_history FROM sessions WHERE session_id = ?", (session_id,)
+                ).fetchone()
+                history = json.loads(row[0]) if row else []
+                history.extend(messages)
+                history = history[-self.max_history_messages:]
+                self._conn.execute(
+                    "UPDATE sessions SET chat_history = ?, last_access = ? WHERE session_id = ?",
+                    (json.dumps(history), time.time(), session_id),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return history
+
+    def get_derived(self, session_id, name, factory):
+        """Return a cached per-session object (index, retriever...), building it on a miss."""
+        with self._lock:
+            entry = self._hot.get(session_id)
+            if entry is not None and name in entry:
+                self._hot.move_to_end(session_id)
+                return entry[name]
+        value = factory()
+        self.put_derived(session_id, name, value)
+        return value
+
+    def put_derived(self, session_id, name, value):
+        with self._lock:
+            self._hot.setdefault(session_id, {})[name] = value
+            self._hot.move_to_end(session_id)
+            while len(self._hot) > self.max_hot_sessions:
+                self._hot.popitem(last=False)
+
+    def purge_expired(self):
+        """Delete sessions idle for longer than idle_ttl; returns how many were removed."""
+        cutoff = time.time() - self.idle_ttl
+        with self._lock:
+            expired = [row[0] for row in self._conn.execute(
+                "SELECT session_id FROM sessions WHERE last_access < ?", (cutoff,)
+            )]
+            self._conn.executemany("DELETE FROM sessions WHERE session_id = ?", [(sid,) for sid in expired])
+            for session_id in expired:
+                self._hot.pop(session_id, None)
+        for session_id in expired:
+            for suffix in (".txt.z", ".npy"):
+                try:
+                    os.unlink(self._blob_path(session_id, suffix))
+                except FileNotFoundError:
+                    pass
+        if expired:
+            logger.info(f"Purged {len(expired)} expired sessions")
+        return len(expired)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,176 @@
+import asyncio
+import hashlib
+import re
+from collections import OrderedDict
+
+from token_budget import CHARS_PER_TOKEN, estimate_tokens
+
+# Page breaks (form feeds) and blank lines are the preferred split points
+BLOCK_BOUNDARY = re.compile(r"\f|\n\s*\n")
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+|\n")
+
+MAP_PROMPT = (
+    "Summarize the following section of a larger document. Keep key facts, "
+    "names, numbers and obligations; omit filler.\n\nSection:\n{text}"
+)
+REDUCE_PROMPT = (
+    "Combine the following partial summaries of consecutive sections of one "
+    "document into a single coherent summary.\n\nPartial summaries:\n{text}"
+)
+
+
+# Reduce rounds before giving up on summaries that do not fit one prompt
+MAX_REDUCE_ROUNDS = 8
+
+
+def _hard_split(text, max_chars):
+    return [text[i:i + max_chars] for i in range(0, len(text), max_chars)]
+
+
+def _split_oversized(block, max_tokens):
+    """Split a block that exceeds the budget on sentences, then by characters."""
+    # estimate_tokens rounds up by one, so a full max_tokens * CHARS_PER_TOKEN would overshoot
+    max_chars = max(1, (max_tokens - 1) * CHARS_PER_TOKEN)
+    pieces = []
+    for sentence in SENTENCE_BOUNDARY.split(block):
+        if not sentence:
+            continue
+        if len(sentence) > max_chars:
+            pieces.extend(_hard_split(sentence, max_chars))
+        else:
+            pieces.append(sentence)
+    return pieces
+
+
+def split_text(text, max_tokens):
+    """Split text into chunks of at most max_tokens, on page/paragraph boundaries where possible."""
+    chunks = []
+    current = []
+    current_tokens = 0
+    for block in BLOCK_BOUNDARY.split(text):
+        block = block.strip()
+        if not block:
+            continue
+        tokens = estimate_tokens(block)
+        pieces = [block] if tokens <= max_tokens else _split_oversized(block, max_tokens)
+        for piece in pieces:
+            piece_tokens = estimate_tokens(piece)
+            if current and current_tokens + piece_tokens > max_tokens:
+                chunks.append("\n\n".join(current))
+                current = []
+                current_tokens = 0
+            current.append(piece)
+            current_tokens += piece_tokens
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+def _is_error(result):
+    return result.startswith("[ERROR]")
+
+
+class ChunkedSummarizer:
+    """Map-reduce summarization for documents that do not fit in one prompt.
+
+    Chunks are summarized concurrently (bounded by max_parallel) and the partial
+    summaries are reduced hierarchically until they fit a single final prompt.
+    Map and intermediate reduce results are cached by content hash, so calling
+    summarize again with a different note or role only redoes the final step.
+    The final prompt always fits reduce_tokens; summaries that cannot be reduced that
+    far give an [ERROR] result instead of a silently truncated prompt.
+    """
+
+    def __init__(self, chat_fn, model, single_pass_tokens=6000, chunk_tokens=3000,
+                 reduce_tokens=6000, max_parallel=4, cache_size=2048):
+        self.chat_fn = chat_fn
+        self.model = model
+        self.single_pass_tokens = single_pass_tokens
+        self.chunk_tokens = chunk_tokens
+        self.reduce_tokens = reduce_tokens
+        self.max_parallel = max_parallel
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+
+    def _cache_key(self, kind, text):
+        return hashlib.sha256(f"{self.model}\0{kind}\0{text}".encode("utf-8")).hexdigest()
+
+    def _cache_get(self, key):
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+        return None
+
+    def _cache_put(self, key, value):
+        self._cache[key] = value
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    async def _summarize_piece(self, kind, template, text, semaphore, use_cache):
+        key = self._cache_key(kind, text)
+        cached = self._cache_get(key) if use_cache else None
+        if cached is not None:
+            return cached
+        async with semaphore:
+            result = await self.chat_fn(
+                [{"role": "user", "content": template.format(text=text)}], role="summarizer", use_cache=use_cache
+            )
+        if not _is_error(result):
+            self._cache_put(key, result)
+        return result
+
+    async def _map(self, kind, template, pieces, semaphore, use_cache):
+        return await asyncio.gather(
+            *(self._summarize_piece(kind, template, piece, semaphore, use_cache) for piece in pieces)
+        )
+
+    def _group(self, summaries):
+        groups = []
+        current = []
+        current_tokens = 0
+        for summary in summaries:
+            tokens = estimate_tokens(summary)
+            if current and current_tokens + tokens > self.reduce_tokens:
+                groups.append("\n\n".join(current))
+                current = []
+                current_tokens = 0
+            current.append(summary)
+            current_tokens += tokens
+        if current:
+            groups.append("\n\n".join(current))
+        return groups
+
+    async def summarize(self, text, metadata, note=None, role="summarizer", use_cache=True):
+        """Summarize text, returning the final LLM response (or an [ERROR] string)."""
+        if estimate_tokens(text) <= self.single_pass_tokens:
+            body = f"Document text:\n{text}"
+        else:
+            semaphore = asyncio.Semaphore(self.max_parallel)
+            summaries = await self._map("map", MAP_PROMPT, split_text(text, self.chunk_tokens), semaphore, use_cache)
+            previous_tokens = None
+            rounds = 0
+            while True:
+                errors = [s for s in summaries if _is_error(s)]
+                if errors:
+                    return errors[0]
+                groups = self._group(summaries)
+                if len(groups) == 1 and estimate_tokens(groups[0]) <= self.reduce_tokens:
+                    break
+                total_tokens = sum(estimate_tokens(summary) for summary in summaries)
+                # Give up when summarizing no longer shrinks the text, rather than cut the final prompt
+                if rounds >= MAX_REDUCE_ROUNDS or (previous_tokens is not None and total_tokens >= previous_tokens):
+                    return (f"[ERROR] Section summaries could not be reduced to {self.reduce_tokens} tokens; "
+                            f"raise SUMMARY_REDUCE_TOKENS")
+                previous_tokens = total_tokens
+                rounds += 1
+                if len(groups) >= len(summaries):
+                    # No two summaries fit one reduce prompt: condense each in pieces of half the
+                    # budget so neighbours can be merged pairwise in the next round
+                    groups = [piece for summary in summaries for piece in split_text(summary, self.reduce_tokens // 2)]
+                summaries = await self._map("reduce", REDUCE_PROMPT, groups, semaphore, use_cache)
+            body = "Section summaries:\n" + "\n\n".join(groups)
+        prompt = f"Document metadata: {metadata}\n\n{body}"
+        if note and note.strip():
+            prompt += f"\n\nAdditional note: {note.strip()}"
+        return await self.chat_fn([{"role": "user", "content": prompt}], role=role, use_cache=use_cache)
@@ -0,0 +1,84 @@
+import importlib
+import io
+import json
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture(scope="module")
+def main(tmp_path_factory):
+    with pytest.MonkeyPatch.context() as patch, ThreadPoolExecutor(max_workers=2) as pool:
+        # main configures its stores from the environment at import time
+        patch.setenv("SESSION_DIR", str(tmp_path_factory.mktemp("sessions")))
+        patch.setenv("LLM_CACHE_ENABLED", "false")
+        module = importlib.import_module("main")
+        # Threads instead of worker processes keep extraction inside the test process
+        patch.setattr(module, "get_extraction_pool", lambda: pool)
+        yield module
+
+
+@pytest.fixture
+def client(main, monkeypatch):
+    async def fake_chat(messages, role="summarizer", use_cache=True):
+        if "FAIL" in messages[-1]["content"]:
+            return "[ERROR] Groq API error: boom"
+        return f"summary ({role})"
+
+    monkeypatch.setattr(main.summarizer, "chat_fn", fake_chat)
+    return TestClient(main.app)
+
+
+def post_batch(client, files, **data):
+    response = client.post("/batch/summarize", files=files, data=data)
+    return response, [json.loads(line) for line in response.text.splitlines()]
+
+
+def zip_of(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, text in members.items():
+            archive.writestr(name, text)
+    return buffer.getvalue()
+
+
+def test_streams_one_result_per_document_then_an_aggregate(client, main):
+    response, lines = post_batch(client, [
+        ("files", ("a.txt", b"First document.", "text/plain")),
+        ("files", ("b.txt", b"Second document FAIL.", "text/plain")),
+        ("files", ("docs.zip", zip_of({"c.txt": "Third.", "skip.bin": "ignored"}), "application/zip")),
+    ], role="explainer")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    results = {line["filename"]: line for line in lines[:-1]}
+    assert set(results) == {"a.txt", "b.txt", "c.txt"}
+    assert results["a.txt"]["status"] == "ok" and results["a.txt"]["summary"] == "summary (explainer)"
+    assert set(results["a.txt"]["timings"]) >= {"extract_seconds", "summarize_seconds", "total_seconds"}
+    assert results["b.txt"]["status"] == "error"
+    aggregate = lines[-1]
+    assert aggregate["type"] == "aggregate"
+    assert (aggregate["documents"], aggregate["succeeded"], aggregate["failed"]) == (3, 2, 1)
+    # Each document gets a session holding its summary
+    assert main.session_store.get(results["a.txt"]["session_id"])["summary"] == "summary (explainer)"
+
+
+def test_per_document_failures_do_not_stop_the_batch(client):
+    _, lines = post_batch(client, [
+        ("files", ("empty.txt", b"   ", "text/plain")),
+        ("files", ("ok.txt", b"Some text.", "text/plain")),
+    ])
+    statuses = {line["filename"]: line["status"] for line in lines[:-1]}
+    assert statuses == {"empty.txt": "error", "ok.txt": "ok"}
+
+
+def test_rejects_unsupported_files_and_oversized_batches(client, main, monkeypatch):
+    response, _ = post_batch(client, [("files", ("image.png", b"png", "image/png"))])
+    assert response.status_code == 400
+    monkeypatch.setattr(main, "MAX_BATCH_FILES", 1)
+    response, _ = post_batch(client, [
+        ("files", ("a.txt", b"a", "text/plain")),
+        ("files", ("b.txt", b"b", "text/plain")),
+    ])
+    assert response.status_code == 413
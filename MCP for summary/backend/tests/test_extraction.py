@@ -0,0 +1,55 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from PyPDF2 import PdfWriter
+
+import extraction
+from extraction import PAGE_SEPARATOR, DocumentTooLargeError, extract_text_async
+
+
+@pytest.fixture
+def executor():
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        yield executor
+
+
+def write_pdf(path, pages):
+    writer = PdfWriter()
+    for _ in range(pages):
+        writer.add_blank_page(width=72, height=72)
+    with open(path, "wb") as f:
+        writer.write(f)
+    return str(path)
+
+
+def extract(executor, path, filename, max_pages=100, pages_per_task=4):
+    return asyncio.run(extract_text_async(executor, path, filename, max_pages, pages_per_task))
+
+
+def test_pdf_over_page_limit_is_rejected_before_extraction(tmp_path, executor, monkeypatch):
+    path = write_pdf(tmp_path / "big.pdf", 5)
+    calls = []
+    monkeypatch.setattr(extraction, "extract_pdf_pages", lambda *args: calls.append(args) or "")
+    with pytest.raises(DocumentTooLargeError):
+        extract(executor, path, "big.pdf", max_pages=4)
+    assert calls == []
+
+
+def test_pdf_pages_are_extracted_in_ranges_and_joined_in_order(tmp_path, executor, monkeypatch):
+    path = write_pdf(tmp_path / "doc.pdf", 10)
+    monkeypatch.setattr(extraction, "extract_pdf_pages", lambda file_path, start, end: f"{start}-{end}")
+    assert extract(executor, path, "doc.pdf", max_pages=10, pages_per_task=4) == PAGE_SEPARATOR.join(
+        ["0-4", "4-8", "8-10"]
+    )
+
+
+def test_pdf_text_keeps_page_boundaries(tmp_path, executor):
+    path = write_pdf(tmp_path / "blank.pdf", 3)
+    assert extract(executor, path, "blank.pdf").count(PAGE_SEPARATOR) == 2
+
+
+def test_other_formats_are_extracted_whole(tmp_path, executor):
+    path = tmp_path / "notes.txt"
+    path.write_text("plain text")
+    assert extract(executor, str(path), "notes.txt", max_pages=0) == "plain text"
@@ -0,0 +1,113 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from llm_client import LLMClient
+
+
+class MockProvider:
+    """Local chat-completions endpoint answering with a scripted list of (status, headers) responses"""
+
+    def __init__(self, script):
+        self.script = list(script)
+        self.requests = []
+        self.client_ports = set()
+        provider = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # Keep-alive, so connection reuse is observable
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                provider.requests.append(body)
+                provider.client_ports.add(self.client_address[1])
+                status, headers = provider.script.pop(0) if provider.script else (200, {})
+                payload = json.dumps(
+                    {"choices": [{"message": {"content": "ok"}}]} if status == 200 else {"error": status}
+                ).encode()
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/chat"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def provider_factory():
+    providers = []
+
+    def make(script=()):
+        provider = MockProvider(script)
+        providers.append(provider)
+        return provider
+
+    yield make
+    for provider in providers:
+        provider.close()
+
+
+def chat(client, calls=1):
+    async def run():
+        try:
+            return [await client.chat([{"role": "user", "content": "hi"}], "system") for _ in range(calls)]
+        finally:
+            await client.aclose()
+    return asyncio.run(run())
+
+
+def make_client(provider, **kwargs):
+    return LLMClient(provider.url, "key", "model", backoff_base=0.0, **kwargs)
+
+
+def test_retries_rate_limit_honouring_retry_after(provider_factory):
+    provider = provider_factory([(429, {"Retry-After": "0"}), (503, {})])
+    assert chat(make_client(provider)) == ["ok"]
+    assert len(provider.requests) == 3
+
+
+def test_gives_up_after_max_retries(provider_factory):
+    provider = provider_factory([(500, {})] * 10)
+    result = chat(make_client(provider, max_retries=2))[0]
+    assert result.startswith("[ERROR] Groq API error")
+    assert len(provider.requests) == 3
+
+
+def test_client_errors_are_not_retried(provider_factory):
+    provider = provider_factory([(400, {})])
+    assert chat(make_client(provider))[0].startswith("[ERROR]")
+    assert len(provider.requests) == 1
+
+
+def test_sequential_calls_reuse_one_pooled_connection(provider_factory):
+    provider = provider_factory()
+    assert chat(make_client(provider), calls=5) == ["ok"] * 5
+    assert len(provider.client_ports) == 1
+
+
+def test_transport_errors_are_retried_then_reported():
+    # Nothing listens on this port, so every attempt fails to connect
+    client = LLMClient("http://127.0.0.1:9/chat", "key", "model", backoff_base=0.0, max_retries=1)
+    assert chat(client)[0].startswith("[ERROR] Groq API request failed")
+
+
+def test_request_carries_system_prompt_and_model(provider_factory):
+    provider = provider_factory()
+    chat(make_client(provider))
+    assert provider.requests[0]["model"] == "model"
+    assert provider.requests[0]["messages"][0] == {"role": "system", "content": "system"}
@@ -0,0 +1,60 @@
+import itertools
+import types
+
+import pytest
+
+import response_cache
+from response_cache import ResponseCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # Strictly increasing timestamps, so access order is never a tie
+    ticks = itertools.count(1)
+    monkeypatch.setattr(response_cache, "time", types.SimpleNamespace(time=lambda: float(next(ticks))))
+
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path / "responses.sqlite3"), max_bytes=1000)
+    yield cache
+    cache.close()
+
+
+def test_key_depends_on_model_prompt_and_messages():
+    messages = [{"role": "user", "content": "hi"}]
+    key = ResponseCache.make_key("model", "system", messages)
+    assert key == ResponseCache.make_key("model", "system", [{"content": "hi", "role": "user"}])
+    assert key != ResponseCache.make_key("other", "system", messages)
+    assert key != ResponseCache.make_key("model", "other", messages)
+
+
+def test_get_and_put_count_hits_and_misses(cache):
+    assert cache.get("k") is None
+    cache.put("k", "response")
+    assert cache.get("k") == "response"
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+
+
+def test_evicts_least_recently_used_once_over_size(cache):
+    for key in "abc":
+        cache.put(key, "x" * 300)
+    # a is read again, so b is now the least recently used
+    cache.get("a")
+    cache.put("d", "x" * 300)
+    stats = cache.stats()
+    assert stats["size_bytes"] <= cache.max_bytes * 0.9
+    assert stats["evictions"] == 1
+    assert cache.get("b") is None
+    assert all(cache.get(key) is not None for key in "acd")
+
+
+def test_entries_persist_across_instances(tmp_path, clock):
+    path = str(tmp_path / "responses.sqlite3")
+    first = ResponseCache(path)
+    first.put("k", "response")
+    first.close()
+    second = ResponseCache(path)
+    assert second.get("k") == "response"
+    second.close()
@@ -0,0 +1,42 @@
+import numpy as np
+
+from retrieval import ChunkRetriever, HashingEmbedder
+
+
+SECTIONS = [
+    "The tenant pays rent on the first day of every month by bank transfer.",
+    "Pets are not allowed in the apartment without written permission.",
+    "The landlord repairs the heating system within five working days.",
+]
+
+
+def test_embeddings_are_normalized_and_deterministic():
+    embedder = HashingEmbedder(dim=256)
+    matrix = embedder.embed(SECTIONS + [""])
+    assert matrix.shape == (4, 256)
+    assert np.allclose(np.linalg.norm(matrix[:3], axis=1), 1.0, atol=1e-5)
+    assert not matrix[3].any()
+    assert np.array_equal(matrix[:3], HashingEmbedder(dim=256).embed(SECTIONS))
+
+
+def test_top_k_ranks_the_matching_chunk_first():
+    retriever = ChunkRetriever.build("\n\n".join(SECTIONS), HashingEmbedder(), chunk_tokens=20)
+    assert len(retriever.chunks) == 3
+    results = retriever.top_k("when is the rent paid", k=2)
+    assert results[0][0] == 0 and results[0][1] == SECTIONS[0]
+    assert len(results) <= 2
+    assert [score for _, _, score in results] == sorted((score for _, _, score in results), reverse=True)
+
+
+def test_top_k_skips_unrelated_chunks_and_handles_empty_documents():
+    retriever = ChunkRetriever.build("\n\n".join(SECTIONS), HashingEmbedder(), chunk_tokens=20)
+    assert retriever.top_k("zzz qqq", k=3) == []
+    assert len(retriever.top_k("the", k=10)) <= 3
+    assert ChunkRetriever.build("", HashingEmbedder()).top_k("rent") == []
+
+
+def test_retriever_can_be_rebuilt_from_a_stored_matrix():
+    embedder = HashingEmbedder()
+    built = ChunkRetriever.build("\n\n".join(SECTIONS), embedder, chunk_tokens=20)
+    restored = ChunkRetriever(built.chunks, built.matrix.copy(), embedder)
+    assert restored.top_k("heating repairs") == built.top_k("heating repairs")
@@ -0,0 +1,39 @@
+from search_index import BM25Index
+
+
+PASSAGES = [
+    "The invoice is due within thirty days of delivery.",
+    "Delivery happens by truck. The truck leaves at noon.",
+    "Payment terms: late payment incurs a penalty of two percent.",
+]
+
+
+def test_ranks_passages_with_query_terms_first():
+    results = BM25Index(PASSAGES).search("late payment penalty")
+    assert results[0]["passage_index"] == 2
+    assert all(result["score"] > 0 for result in results)
+
+
+def test_higher_term_frequency_scores_higher():
+    results = BM25Index(PASSAGES).search("truck delivery", top_k=3)
+    assert results[0]["passage_index"] == 1
+
+
+def test_highlights_point_at_matched_terms_case_insensitively():
+    index = BM25Index(PASSAGES)
+    result = index.search("DELIVERY")[0]
+    for start, end in result["highlights"]:
+        assert result["passage"][start:end].lower() == "delivery"
+
+
+def test_top_k_and_unknown_terms():
+    index = BM25Index(PASSAGES)
+    assert len(index.search("the", top_k=1)) == 1
+    assert index.search("nonexistentterm") == []
+    assert BM25Index([]).search("anything") == []
+
+
+def test_from_text_splits_into_passages():
+    index = BM25Index.from_text("\n\n".join(PASSAGES * 20), passage_tokens=30)
+    assert len(index.passages) > 1
+    assert index.search("penalty")
@@ -0,0 +1,79 @@
+import os
+import types
+
+import numpy as np
+import pytest
+
+import session_store
+from session_store import SessionStore
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(session_store, "time", types.SimpleNamespace(time=clock.time))
+    return clock
+
+
+@pytest.fixture
+def store(tmp_path, clock):
+    store = SessionStore(str(tmp_path), max_hot_sessions=2, idle_ttl=60, max_history_messages=4)
+    yield store
+    store.close()
+
+
+def test_round_trips_text_embeddings_and_state(store):
+    matrix = np.eye(3, dtype=np.float32)
+    session_id = store.create({"filename": "a.txt"}, "document text é", matrix)
+    assert store.load_text(session_id) == "document text é"
+    assert np.array_equal(store.load_embeddings(session_id), matrix)
+    store.update(session_id, "summary", "note")
+    assert store.get(session_id) == {
+        "metadata": {"filename": "a.txt"}, "summary": "summary", "note": "note", "chat_history": [],
+    }
+    assert store.load_embeddings(store.create({}, "no embeddings")) is None
+
+
+def test_history_is_appended_and_capped(store):
+    session_id = store.create({}, "text")
+    for i in range(3):
+        history = store.append_history(session_id, [{"role": "user", "content": f"q{i}"},
+                                                    {"role": "assistant", "content": f"a{i}"}])
+    assert [m["content"] for m in history] == ["q1", "a1", "q2", "a2"]
+    assert store.get(session_id)["chat_history"] == history
+
+
+def test_idle_sessions_expire_and_access_extends_them(store, clock, tmp_path):
+    kept = store.create({}, "kept")
+    dropped = store.create({}, "dropped")
+    clock.now += 50
+    assert store.get(kept) is not None
+    clock.now += 50
+    assert store.get(dropped) is None
+    assert store.purge_expired() == 1
+    assert store.get(kept) is not None
+    assert not os.path.exists(os.path.join(str(tmp_path), "blobs", f"{dropped}.txt.z"))
+
+
+def test_derived_objects_are_built_once_and_lru_capped(store):
+    built = []
+
+    def factory(name):
+        return lambda: built.append(name) or name
+
+    assert store.get_derived("s1", "index", factory("s1")) == "s1"
+    assert store.get_derived("s1", "index", factory("again")) == "s1"
+    store.get_derived("s2", "index", factory("s2"))
+    store.get_derived("s1", "index", factory("again"))
+    store.get_derived("s3", "index", factory("s3"))
+    # s2 was least recently used, so it was dropped and is rebuilt
+    store.get_derived("s2", "index", factory("s2 rebuilt"))
+    assert built == ["s1", "s2", "s3", "s2 rebuilt"]
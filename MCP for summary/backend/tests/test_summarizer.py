@@ -0,0 +1,101 @@
+import asyncio
+
+from summarizer import ChunkedSummarizer, split_text
+from token_budget import estimate_tokens
+
+
+class FakeChat:
+    """Records prompts and answers with a short summary of each"""
+
+    def __init__(self, answer=None):
+        self.prompts = []
+        self.answer = answer or (lambda prompt: f"summary {len(self.prompts)}")
+
+    async def __call__(self, messages, role="summarizer", use_cache=True):
+        prompt = messages[-1]["content"]
+        self.prompts.append((role, prompt))
+        return self.answer(prompt)
+
+
+def document(paragraphs=40, words=200):
+    return "\n\n".join(f"Paragraph {i}. " + "lorem ipsum " * words for i in range(paragraphs))
+
+
+def summarize(summarizer, text, **kwargs):
+    return asyncio.run(summarizer.summarize(text, {"filename": "doc.txt"}, **kwargs))
+
+
+def test_split_text_respects_budget_and_paragraphs():
+    chunks = split_text(document(), max_tokens=1000)
+    assert len(chunks) > 1
+    assert all(estimate_tokens(chunk) <= 1000 for chunk in chunks)
+    assert chunks[0].startswith("Paragraph 0.")
+
+
+def test_split_text_breaks_oversized_blocks():
+    chunks = split_text("x" * 10000, max_tokens=100)
+    assert all(estimate_tokens(chunk) <= 100 for chunk in chunks)
+    assert "".join(chunks) == "x" * 10000
+
+
+def test_short_document_takes_a_single_pass():
+    chat = FakeChat()
+    summarize(ChunkedSummarizer(chat, "model"), "A short document.", note="focus on dates")
+    assert len(chat.prompts) == 1
+    role, prompt = chat.prompts[0]
+    assert "A short document." in prompt and "focus on dates" in prompt
+
+
+def test_long_document_is_mapped_then_reduced():
+    chat = FakeChat()
+    summarizer = ChunkedSummarizer(chat, "model", single_pass_tokens=1000, chunk_tokens=1000)
+    result = summarize(summarizer, document())
+    map_prompts = [prompt for role, prompt in chat.prompts if prompt.startswith("Summarize the following section")]
+    assert len(map_prompts) == len(split_text(document(), 1000))
+    assert result == f"summary {len(chat.prompts)}"
+    assert chat.prompts[-1][0] == "summarizer"
+    assert "Section summaries:" in chat.prompts[-1][1]
+
+
+def test_oversized_summaries_are_reduced_hierarchically():
+    # Every section summary is large, so they need a reduce round before the final prompt
+    chat = FakeChat(answer=lambda prompt: "s " * (200 if prompt.startswith("Summarize") else 20))
+    summarizer = ChunkedSummarizer(chat, "model", single_pass_tokens=1000, chunk_tokens=1000, reduce_tokens=300)
+    summarize(summarizer, document())
+    assert any(prompt.startswith("Combine the following") for role, prompt in chat.prompts)
+    assert estimate_tokens(chat.prompts[-1][1]) <= 300 + 50
+
+
+def test_unreducible_summaries_give_an_error_instead_of_a_cut_prompt():
+    chat = FakeChat(answer=lambda prompt: "s " * 2000)
+    summarizer = ChunkedSummarizer(chat, "model", single_pass_tokens=1000, chunk_tokens=1000, reduce_tokens=300)
+    assert summarize(summarizer, document()).startswith("[ERROR]")
+
+
+def test_map_errors_are_returned_and_not_cached():
+    chat = FakeChat(answer=lambda prompt: "[ERROR] rate limited")
+    summarizer = ChunkedSummarizer(chat, "model", single_pass_tokens=1000, chunk_tokens=1000)
+    assert summarize(summarizer, document()) == "[ERROR] rate limited"
+    assert not summarizer._cache
+
+
+def test_section_summaries_are_cached_by_content_hash():
+    chat = FakeChat()
+    summarizer = ChunkedSummarizer(chat, "model", single_pass_tokens=1000, chunk_tokens=1000)
+    summarize(summarizer, document())
+    first_run = len(chat.prompts)
+    summarize(summarizer, document(), note="different note", role="analyst")
+    # Only the final prompt is sent again
+    assert len(chat.prompts) == first_run + 1
+    assert chat.prompts[-1][0] == "analyst"
+    summarize(summarizer, document(), use_cache=False)
+    assert len(chat.prompts) > first_run + 2
+
+
+def test_cache_is_keyed_on_model_and_bounded():
+    chat = FakeChat()
+    summarizer = ChunkedSummarizer(chat, "model", single_pass_tokens=1000, chunk_tokens=1000, cache_size=3)
+    summarize(summarizer, document())
+    assert len(summarizer._cache) == 3
+    other = ChunkedSummarizer(chat, "other-model")
+    assert other._cache_key("map", "text") != summarizer._cache_key("map", "text")
@@ -0,0 +1,52 @@
+from token_budget import PromptBudget, estimate_tokens, message_tokens, truncate_to_tokens, TRUNCATION_MARKER
+
+
+def test_truncate_to_tokens_keeps_short_text_and_marks_cuts():
+    assert truncate_to_tokens("short", 10) == "short"
+    cut = truncate_to_tokens("x" * 1000, 10)
+    assert cut.endswith(TRUNCATION_MARKER)
+    assert estimate_tokens(cut) <= 10
+
+
+def test_pack_keeps_question_and_stays_within_budget():
+    budget = PromptBudget(max_prompt_tokens=600, reserve_tokens=100)
+    context = [f"passage {i} " + "word " * 60 for i in range(20)]
+    history = [{"role": "user" if i % 2 == 0 else "assistant", "content": "turn " * 80} for i in range(10)]
+    messages, stats = budget.pack("What is the answer?", context, history)
+    assert "What is the answer?" in messages[-1]["content"]
+    assert stats["estimated_prompt_tokens"] <= budget.available_tokens
+    assert 0 < stats["context_parts_used"] < len(context)
+
+
+def test_pack_uses_context_best_first_and_history_newest_first():
+    budget = PromptBudget(max_prompt_tokens=400, reserve_tokens=0, context_ratio=0.5,
+                          max_history_message_tokens=20)
+    history = [{"role": "user", "content": f"old turn {i} " * 5} for i in range(50)] + [{"role": "user", "content": "newest"}]
+    messages, stats = budget.pack("q", ["best passage", "second passage"], history)
+    assert "best passage" in messages[-1]["content"]
+    assert messages[-2]["content"] == "newest"
+    assert stats["history_messages_used"] < len(history)
+
+
+def test_pack_never_starts_history_with_assistant_reply():
+    budget = PromptBudget(max_prompt_tokens=200, reserve_tokens=0, context_ratio=0.0)
+    history = [{"role": "user", "content": "u " * 100}, {"role": "assistant", "content": "a"}]
+    messages, _ = budget.pack("q", [], history)
+    assert messages[0]["role"] != "assistant"
+
+
+def test_fit_keeps_last_message_and_drops_oldest():
+    budget = PromptBudget(max_prompt_tokens=100, reserve_tokens=0)
+    messages = [{"role": "user", "content": "m" * 200} for _ in range(5)] + [{"role": "user", "content": "last"}]
+    fitted = budget.fit(messages)
+    assert fitted[-1]["content"] == "last"
+    assert len(fitted) < len(messages)
+    assert sum(message_tokens(m) for m in fitted) <= budget.available_tokens
+
+
+def test_fit_truncates_an_oversized_last_message():
+    budget = PromptBudget(max_prompt_tokens=50, reserve_tokens=0)
+    fitted = budget.fit([{"role": "user", "content": "z" * 1000}])
+    assert len(fitted) == 1
+    assert message_tokens(fitted[0]) <= budget.available_tokens
+    assert budget.fit([]) == []
@@ -0,0 +1,113 @@
+# Rough heuristic for English prose; good enough to keep prompts under budget
+CHARS_PER_TOKEN = 4
+
+# Per-message framing overhead (role markers etc.) in chat-completion prompts
+MESSAGE_OVERHEAD_TOKENS = 4
+
+TRUNCATION_MARKER = " [...]"
+
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def truncate_to_tokens(text, max_tokens):
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    # estimate_tokens rounds up by one, so leave a token's worth of slack
+    keep = max(0, (max_tokens - 1) * CHARS_PER_TOKEN - len(TRUNCATION_MARKER))
+    return text[:keep] + TRUNCATION_MARKER
+
+
+def message_tokens(message):
+    return estimate_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+
+
+class PromptBudget:
+    """Packs question, context and chat history into a fixed prompt-token budget.
+
+    Priority: the question is always kept; context parts are added in the order
+    given (callers pass them best-first) up to context_ratio of what is left;
+    history fills the remainder newest-first, each turn capped at
+    max_history_message_tokens. reserve_tokens is held back for the system
+    prompt and the model's answer.
+    """
+
+    def __init__(self, max_prompt_tokens=8000, reserve_tokens=1500, context_ratio=0.7,
+                 max_history_message_tokens=400):
+        self.max_prompt_tokens = max_prompt_tokens
+        self.reserve_tokens = reserve_tokens
+        self.context_ratio = context_ratio
+        self.max_history_message_tokens = max_history_message_tokens
+
+    @property
+    def available_tokens(self):
+        return max(0, self.max_prompt_tokens - self.reserve_tokens)
+
+    def _pack_context(self, context_parts, budget):
+        packed = []
+        used = 0
+        for part in context_parts:
+            tokens = estimate_tokens(part)
+            if used + tokens > budget:
+                # Truncate the part that crosses the line, unless too little room is left
+                remaining = budget - used
+                if remaining >= 64:
+                    packed.append(truncate_to_tokens(part, remaining))
+                    used += remaining
+                break
+            packed.append(part)
+            used += tokens
+        return packed, used
+
+    def _pack_history(self, history, budget):
+        packed = []
+        used = 0
+        for message in reversed(history):
+            content = truncate_to_tokens(message["content"], self.max_history_message_tokens)
+            tokens = estimate_tokens(content) + MESSAGE_OVERHEAD_TOKENS
+            if used + tokens > budget:
+                break
+            packed.append({"role": message["role"], "content": content})
+            used += tokens
+        packed.reverse()
+        # Never open the window on a dangling assistant reply
+        if packed and packed[0]["role"] == "assistant":
+            packed.pop(0)
+        return packed
+
+    def pack(self, question, context_parts, history, template="Context: {context}\n\nQuestion: {question}"):
+        """Build the message list for a question; returns (messages, stats)."""
+        question = truncate_to_tokens(question, self.available_tokens // 4)
+        overhead = estimate_tokens(template.format(context="", question=question)) + MESSAGE_OVERHEAD_TOKENS
+        remaining = max(0, self.available_tokens - overhead)
+        context, context_tokens = self._pack_context(context_parts, int(remaining * self.context_ratio))
+        messages = self._pack_history(history, remaining - context_tokens)
+        messages.append({
+            "role": "user",
+            "content": template.format(context="\n\n".join(context), question=question),
+        })
+        stats = {
+            "estimated_prompt_tokens": sum(message_tokens(m) for m in messages),
+            "context_parts_used": len(context),
+            "history_messages_used": len(messages) - 1,
+        }
+        return messages, stats
+
+    def fit(self, messages):
+        """Trim an arbitrary message list to the budget: keep the last message, drop the oldest."""
+        if not messages:
+            return messages
+        budget = self.available_tokens
+        last = dict(messages[-1])
+        last["content"] = truncate_to_tokens(last["content"], budget - MESSAGE_OVERHEAD_TOKENS)
+        fitted = [last]
+        used = message_tokens(last)
+        for message in reversed(messages[:-1]):
+            tokens = message_tokens(message)
+            if used + tokens > budget:
+                break
+            fitted.append(message)
+            used += tokens
+        fitted.reverse()
+        return fitted